@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线基准测试
+启动本地模拟服务（stub_servers.py），在独立子进程中用合成的批量任务运行
+process_batch 和数据合并，记录吞吐量、各阶段 p50/p99 耗时和峰值内存。
+所有数据写入临时目录，不会修改 data/ 和 frontend/public/images/。
+用法: python benchmark.py [--sizes 1,100,1000] [--llm-latency 0.5] [--failure-rate 0.01] [--output 结果.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from store import STORE_BACKENDS
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+DEFAULT_SIZES = "1,100,1000"
+
+# 基准测试中放宽的限流和并发（模拟服务没有真实配额）
+BENCH_QPS = 1000
+BENCH_CONCURRENCY = 64
+
+
+def make_items(size, with_covers=True, base_url=""):
+    """生成合成的批量任务（带标题和描述，覆盖文本分析路径）"""
+    items = []
+    for i in range(size):
+        video_info = {
+            "title": f"基准测试视频 {i}",
+            "description": f"第{i}家店，招牌菜值得一试 #美食探店",
+        }
+        if with_covers:
+            video_info["cover_url"] = f"{base_url}/images/{i}.jpg"
+        items.append({"url": f"https://v.douyin.com/bench{i:07d}/", "video_info": video_info})
+    return items
+
+
+def peak_rss_mb():
+    """本进程的峰值常驻内存（MB），不支持的平台返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_child(config_path):
+    """子进程：运行一轮基准测试并把结果写入 config 中的 report 文件"""
+    config = json.loads(Path(config_path).read_text(encoding="utf-8"))
+
+    from extractor import DouyinExtractor, compact_store
+    from metrics import Metrics
+
+    metrics = Metrics()
+    extractor = DouyinExtractor(non_interactive=True, metrics=metrics, strategy=config["strategy"])
+    items = make_items(config["size"], config["covers"], config["base_url"])
+
+    start = time.perf_counter()
+    places, failures = extractor.process_batch(items, workers=config["workers"], text_batch=config["text_batch"])
+    batch_elapsed = time.perf_counter() - start
+    compact_start = time.perf_counter()
+    compact_store(extractor.store)
+    compact_elapsed = time.perf_counter() - compact_start
+    elapsed = time.perf_counter() - start
+    extractor.close()
+
+    report = {
+        "size": config["size"],
+        "places": len(places),
+        "failures": len(failures),
+        "elapsed": round(elapsed, 3),
+        "batch_elapsed": round(batch_elapsed, 3),
+        "compact_elapsed": round(compact_elapsed, 3),
+        "throughput": round(len(places) / elapsed, 2) if elapsed else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": metrics.stage_stats(),
+    }
+    Path(config["report"]).write_text(json.dumps(report, ensure_ascii=False), encoding="utf-8")
+
+
+def run_size(size, args, base_url, workdir):
+    """在干净的子进程中运行一个规模，返回结果"""
+    run_dir = Path(workdir) / f"size-{size}"
+    (run_dir / "data").mkdir(parents=True)
+    config_path = run_dir / "config.json"
+    report_path = run_dir / "report.json"
+    config_path.write_text(json.dumps({
+        "size": size,
+        "workers": args.workers,
+        "text_batch": args.text_batch,
+        "strategy": args.strategy,
+        "covers": not args.no_covers,
+        "base_url": base_url,
+        "report": str(report_path),
+    }), encoding="utf-8")
+
+    # 去掉真实密钥，全部指向模拟服务
+    env = {key: value for key, value in os.environ.items() if not key.endswith("_KEY")}
+    env.update({
+        "EXTRACTOR_DATA_DIR": str(run_dir / "data"),
+        "EXTRACTOR_IMAGE_DIR": str(run_dir / "images"),
+        "AMAP_WEB_SERVICE_KEY": "bench",
+        "AMAP_BASE_URL": base_url,
+        "PLACE_STORE": args.store,
+    })
+    for provider in args.providers:
+        env[f"{provider.upper()}_API_KEY"] = "bench"
+        env[f"{provider.upper()}_BASE_URL"] = f"{base_url}/v1"
+    for name in ("qwen", "openai", "deepseek", "amap", "cover"):
+        env[f"{name.upper()}_QPS"] = str(BENCH_QPS)
+        env[f"{name.upper()}_BURST"] = str(BENCH_QPS)
+        env[f"{name.upper()}_CONCURRENCY"] = str(BENCH_CONCURRENCY)
+
+    subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--child", str(config_path)],
+        cwd=BACKEND_DIR, env=env, check=True,
+        stdout=None if args.verbose else subprocess.DEVNULL,
+    )
+    return json.loads(report_path.read_text(encoding="utf-8"))
+
+
+def load_fixtures(path):
+    """读取录制的模型回复（JSONL，每行 {"content": "..."}）"""
+    fixtures = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                fixtures.append(json.loads(line)["content"])
+    return fixtures
+
+
+def print_report(results):
+    print(f"\n{'规模':>8} {'成功':>8} {'失败':>6} {'耗时(s)':>9} {'合并(s)':>8} {'吞吐(条/s)':>11} {'峰值内存(MB)':>13}")
+    for r in results:
+        rss = f"{r['peak_rss_mb']:.0f}" if r['peak_rss_mb'] is not None else "-"
+        print(f"{r['size']:>8} {r['places']:>8} {r['failures']:>6} {r['elapsed']:>9.2f} "
+              f"{r['compact_elapsed']:>8.2f} {r['throughput'] or 0:>11.1f} {rss:>13}")
+
+    for r in results:
+        print(f"\n📊 规模 {r['size']} 各阶段耗时:")
+        for stage, stats in r['stages'].items():
+            print(f"  {stage:<28} {stats['calls']:>7}次  p50 {stats['p50'] * 1000:>8.1f}ms  "
+                  f"p99 {stats['p99'] * 1000:>8.1f}ms  错误 {stats['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='使用本地模拟服务离线测试批量处理的吞吐量和延迟')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help=f'逗号分隔的任务规模（默认 {DEFAULT_SIZES}）')
+    parser.add_argument('--workers', type=int, default=16, help='process_batch 线程池大小（默认16）')
+    parser.add_argument('--strategy', default='sequential', help='模型调度策略（默认 sequential）')
+    parser.add_argument('--text-batch', type=int, default=1, help='每次文本提取请求合并的视频数（默认1，不合并）')
+    parser.add_argument('--providers', default='qwen',
+                        help='启用的模型服务商，逗号分隔（qwen/openai/deepseek，默认 qwen）')
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='模型接口延迟中位数（秒，默认0.5）')
+    parser.add_argument('--amap-latency', type=float, default=0.05, help='高德接口延迟中位数（秒，默认0.05）')
+    parser.add_argument('--image-latency', type=float, default=0.1, help='封面下载延迟中位数（秒，默认0.1）')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='各接口的失败率（429/5xx，默认0）')
+    parser.add_argument('--distinct-images', type=int, default=64, help='不同封面图片的数量（默认64）')
+    parser.add_argument('--llm-fixtures', help='录制的模型回复 JSONL（每行 {"content": ...}），默认生成合成数据')
+    parser.add_argument('--no-covers', action='store_true', help='不下载封面')
+    parser.add_argument('--store', choices=STORE_BACKENDS, default='journal', help='地点存储类型（默认 journal）')
+    parser.add_argument('--seed', type=int, default=0, help='延迟和失败的随机种子')
+    parser.add_argument('--output', help='把结果写入 JSON 文件')
+    parser.add_argument('--verbose', action='store_true', help='显示提取器的输出')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+
+    from stub_servers import start_stub_process
+
+    args.providers = [p.strip() for p in args.providers.split(',') if p.strip()]
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    stub_config = {
+        "llm": {"latency": args.llm_latency, "failure_rate": args.failure_rate},
+        "amap": {"latency": args.amap_latency, "failure_rate": args.failure_rate},
+        "image": {"latency": args.image_latency, "failure_rate": args.failure_rate},
+        "distinct_images": args.distinct_images,
+        "llm_fixtures": load_fixtures(args.llm_fixtures) if args.llm_fixtures else [],
+        "seed": args.seed,
+    }
+    process, base_url = start_stub_process(stub_config)
+    print(f"✓ 模拟服务已启动: {base_url}")
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="road-bench-") as workdir:
+            for size in sizes:
+                print(f"⏱️  运行规模 {size} ...")
+                results.append(run_size(size, args, base_url, workdir))
+    finally:
+        process.terminate()
+        process.join()
+
+    print_report(results)
+    if args.output:
+        Path(args.output).write_text(
+            json.dumps({"config": {**vars(args), "stub": stub_config}, "results": results},
+                       ensure_ascii=False, indent=2),
+            encoding="utf-8"
+        )
+        print(f"\n✓ 结果已保存到: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
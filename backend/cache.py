@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地磁盘缓存
+基于 SQLite 的键值缓存，支持过期时间（TTL）和按条数上限的 LRU 淘汰，
+用于避免重复调用付费的远程模型
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# 未命中标记（缓存值本身可能是 None）
+MISS = object()
+
+
+def make_key(*parts):
+    """根据任意可JSON序列化的内容生成稳定的缓存键"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class DiskCache:
+    """SQLite 键值缓存
+
+    Args:
+        path: 数据库文件路径
+        ttl: 默认过期时间（秒），None 表示永不过期
+        max_entries: 最多保留的条目数，超出后淘汰最久未访问的条目
+        enabled: False 时既不读也不写（--no-cache）
+        refresh: True 时跳过读取但仍写入新结果（--refresh）
+        name: 缓存名称，用于指标统计
+        metrics: 可选的 Metrics 实例，记录命中/未命中次数
+    """
+
+    def __init__(self, path, ttl=None, max_entries=10000, enabled=True, refresh=False,
+                 name=None, metrics=None):
+        self.path = Path(path)
+        self.name = name or self.path.stem
+        self.metrics = metrics
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed_at)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key):
+        """读取缓存，未命中或已过期时返回 MISS"""
+        if not self.enabled or self.refresh:
+            return MISS
+
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self._record(hit=False)
+                return MISS
+
+            value, expires_at = row
+            if expires_at is not None and expires_at < now:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                conn.commit()
+                self._record(hit=False)
+                return MISS
+
+            conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self._record(hit=True)
+
+        return json.loads(value)
+
+    def _record(self, hit):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        if self.metrics is not None:
+            name = "cache_hits_total" if hit else "cache_misses_total"
+            self.metrics.count(name, cache=self.name)
+
+    def set(self, key, value, ttl=None):
+        """写入缓存，ttl 为 None 时使用默认过期时间"""
+        if not self.enabled:
+            return
+
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl is not None else None
+
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), expires_at, now)
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def incr(self, key, amount=1, ttl=None):
+        """原子地增加整数计数，返回增加后的值（条目不存在或已过期时从 0 开始）
+
+        读取和写入在同一条语句、同一个事务中完成，多个进程同时增加也不会少算
+        """
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl is not None else None
+
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET "
+                    "value = CASE WHEN expires_at IS NOT NULL AND expires_at < excluded.accessed_at "
+                    "THEN excluded.value ELSE CAST(value AS INTEGER) + excluded.value END, "
+                    "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                    (key, amount, expires_at, now)
+                )
+                value = conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()[0]
+        return int(value)
+
+    def _evict(self, conn):
+        """删除过期条目，并按 LRU 淘汰超出上限的条目"""
+        conn.execute(
+            "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+        )
+        if not self.max_entries:
+            return
+
+        count = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,)
+            )
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
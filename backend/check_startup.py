@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动耗时检查
+在独立子进程中运行 `extractor.py --help` 和只使用手动数据的提取流程，
+确认没有加载模型 SDK 等重量级依赖，并且耗时在预算之内。
+用法: python check_startup.py [--budget 秒] [--runs 次数]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+# 手动数据流程中不应导入的模块
+HEAVY_MODULES = ("openai", "httpx", "requests", "PIL", "dotenv", "http.server")
+
+# 只使用手动数据时的提取流程（不保存，不访问网络）
+MANUAL_PATH = """
+import json, sys, time
+start = time.perf_counter()
+import extractor
+x = extractor.DouyinExtractor(non_interactive=True, use_cache=False)
+video_info, extracted = x.extract(
+    "https://v.douyin.com/startup-check/",
+    manual_data={"place_name": "启动检查", "city": "成都", "province": "四川", "address": "", "foods": []},
+)
+x.assemble_place(video_info, extracted, None, None)
+elapsed = time.perf_counter() - start
+x.close()
+print(json.dumps({"elapsed": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+HELP_PATH = """
+import json, sys, time
+start = time.perf_counter()
+sys.argv = ["extractor.py", "--help"]
+import extractor
+try:
+    extractor.main()
+except SystemExit:
+    pass
+print(json.dumps({"elapsed": time.perf_counter() - start, "modules": sorted(sys.modules)}))
+"""
+
+
+def run(code):
+    """在干净的子进程中运行，返回 (耗时, 已导入模块)"""
+    env = {key: value for key, value in os.environ.items() if not key.endswith("_KEY")}
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return report["elapsed"], set(report["modules"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='检查 extractor.py 的启动耗时和导入的依赖')
+    parser.add_argument('--budget', type=float, default=0.5, help='每个场景允许的最长耗时（秒，默认0.5）')
+    parser.add_argument('--runs', type=int, default=3, help='每个场景运行次数，取最快的一次（默认3）')
+    args = parser.parse_args()
+
+    failed = False
+    for name, code in (("--help", HELP_PATH), ("手动数据", MANUAL_PATH)):
+        timings = []
+        for _ in range(args.runs):
+            elapsed, modules = run(code)
+            timings.append(elapsed)
+        best = min(timings)
+        heavy = [m for m in HEAVY_MODULES if m in modules]
+
+        ok = best <= args.budget and not heavy
+        failed |= not ok
+        print(f"{'✅' if ok else '❌'} {name}: {best * 1000:.0f} ms（预算 {args.budget * 1000:.0f} ms）")
+        if heavy:
+            print(f"   不应导入的模块: {', '.join(heavy)}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
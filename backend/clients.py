@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP 会话与模型客户端
+每个 DouyinExtractor 只创建一次，复用连接池（keep-alive），
+按域名配置重试和退避策略；安装了 h2 时模型接口启用 HTTP/2。
+requests、httpx、openai 在第一次创建会话/客户端时才导入，只使用手动数据时不会加载
+"""
+
+import importlib.util
+
+from ratelimit import parse_retry_after
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# 连接池大小（与批量模式的并发上限相匹配）
+POOL_SIZE = 16
+
+# 各服务的重试策略，create_session 按服务的 URL 前缀挂载；未匹配的域名（如封面图床）使用 "default"
+HOST_RETRY_POLICIES = {
+    "amap": {"total": 3, "backoff_factor": 0.5},
+    "default": {"total": 2, "backoff_factor": 0.3},
+}
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+# OpenAI SDK 不会重试 Retry-After 超过该秒数的响应（与 SDK 的 MAX_RETRY_AFTER_DELAY 一致）
+SDK_MAX_RETRY_AFTER = 120
+
+# 模型接口：超时时间（秒）和 SDK 自带的重试次数
+MODEL_CLIENT_POLICIES = {
+    "qwen": {"timeout": 120, "max_retries": 2},
+    "openai": {"timeout": 60, "max_retries": 2},
+    "deepseek": {"timeout": 60, "max_retries": 2},
+}
+
+
+def _adapter(total, backoff_factor):
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=total,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=("GET", "HEAD"),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    return HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+
+
+def create_session(service_urls=None):
+    """创建带连接池和按域名重试策略的 requests 会话
+
+    Args:
+        service_urls: {服务名: 基础 URL}，例如 {"amap": AMAP_BASE_URL}，
+            该 URL 下的请求使用 HOST_RETRY_POLICIES 中对应服务的策略
+    """
+    import requests
+
+    session = requests.Session()
+
+    default = _adapter(**HOST_RETRY_POLICIES["default"])
+    session.mount("http://", default)
+    session.mount("https://", default)
+
+    # requests 按最长前缀匹配适配器
+    for service, base_url in (service_urls or {}).items():
+        session.mount(base_url.rstrip("/") + "/", _adapter(**HOST_RETRY_POLICIES[service]))
+
+    return session
+
+
+def count_retries(metrics, provider, response):
+    """记录 urllib3 对该响应进行的重试次数"""
+    retries = getattr(response.raw, "retries", None)
+    if metrics is not None and retries is not None and retries.history:
+        metrics.count("http_retries_total", len(retries.history), provider=provider)
+
+
+def observe_response(limiter, provider, response):
+    """把 requests 响应（包括 urllib3 内部重试过的 429）反馈给限流器"""
+    if limiter is None:
+        return
+    retries = getattr(response.raw, "retries", None)
+    for attempt in (retries.history if retries is not None else ()):
+        if attempt.status == 429:
+            limiter.observe(provider, 429)
+    limiter.observe(provider, response.status_code, response.headers)
+
+
+def sdk_will_retry(response, max_retries):
+    """OpenAI SDK 是否会重试该响应
+
+    与 SDK 的判断一致：还有剩余重试次数（请求头 x-stainless-retry-count 为已重试次数），
+    Retry-After 不超过 SDK_MAX_RETRY_AFTER，服务端的 x-should-retry 优先，否则重试 408/409/429/5xx
+    """
+    taken = response.request.headers.get("x-stainless-retry-count", "")
+    if taken.isdigit() and int(taken) >= max_retries:
+        return False
+    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+    if retry_after is not None and retry_after > SDK_MAX_RETRY_AFTER:
+        return False
+    should_retry = response.headers.get("x-should-retry")
+    if should_retry in ("true", "false"):
+        return should_retry == "true"
+    return response.status_code in (408, 409, 429) or response.status_code >= 500
+
+
+def create_openai_client(provider, api_key, base_url=None, metrics=None, limiter=None):
+    """创建 OpenAI 兼容客户端，底层使用长连接的 httpx 连接池
+
+    limiter 不为空时，每个响应（包括 SDK 自动重试的响应）都会反馈给限流器
+    """
+    import httpx
+    from openai import OpenAI
+
+    policy = MODEL_CLIENT_POLICIES[provider]
+
+    event_hooks = {}
+    if metrics is not None or limiter is not None:
+        def on_response(response):
+            # 只在 SDK 确实会再发一次请求时记为重试（最后一次失败的尝试不算）
+            if metrics is not None and sdk_will_retry(response, policy["max_retries"]):
+                metrics.count("http_retries_total", provider=provider)
+            if limiter is not None:
+                limiter.observe(provider, response.status_code, response.headers)
+        event_hooks["response"] = [on_response]
+
+    http_client = httpx.Client(
+        event_hooks=event_hooks,
+        http2=HTTP2_AVAILABLE,
+        timeout=policy["timeout"],
+        limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+    )
+    return OpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        http_client=http_client,
+        max_retries=policy["max_retries"],
+    )
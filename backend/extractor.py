@@ -9,35 +9,222 @@ import os
 import sys
 import json
 import argparse
-import requests
+import hashlib
+import threading
+import tempfile
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from dotenv import load_dotenv
-from openai import OpenAI
+
+from cache import DiskCache, MISS, make_key
+from clients import count_retries, create_openai_client, create_session, observe_response
+from gazetteer import approximate_location, normalize_region
+from images import (
+    content_stem, find_original, find_thumbnails, guess_extension,
+    make_thumbnails, pick_thumbnail, stream_to_file,
+)
+from jobs import STAGES, JobQueue, reached
+from json_repair import JsonRepairParser
+from keyframes import (
+    MAX_KEYFRAMES, MAX_VIDEO_BYTES, frames_digest, image_parts, keyframes_available, sample_keyframes,
+)
+from metrics import Metrics, traced
+from place_stream import PlaceFormatError, PlaceRecordError, check_places, iter_places
+from ratelimit import RateLimited, RateLimiter
+from schema import (
+    PLACE_SCHEMA, PLACES_BATCH_SCHEMA, parse_place_reply, parse_places_reply, response_format,
+    validate_food, validate_place,
+)
+from search_index import SearchIndex, build_search_index, place_text
+from shards import build_shards
+from site_export import export_site
+from store import normalize_text, open_store
+from strategy import Candidate, Cancelled, ExtractionStrategy, STRATEGIES
+
+
+def load_env():
+    """加载 .env 文件（与 python-dotenv 相同，从脚本所在目录向上查找）
+    
+    没有 .env 文件时（例如 GitHub Actions 中）不导入 python-dotenv
+    """
+    here = Path(__file__).resolve().parent
+    for directory in (here, *here.parents):
+        env_file = directory / ".env"
+        if env_file.is_file():
+            from dotenv import load_dotenv
+            load_dotenv(env_file)
+            return
+
 
 # 加载环境变量
-load_dotenv()
+load_env()
 
-# 项目根目录
+# 项目根目录（目录在第一次写入时创建）
+# EXTRACTOR_DATA_DIR / EXTRACTOR_IMAGE_DIR 可指向其他目录（例如基准测试使用临时目录）
 ROOT_DIR = Path(__file__).parent.parent
-DATA_DIR = ROOT_DIR / "data"
-IMAGE_DIR = ROOT_DIR / "frontend" / "public" / "images"
+DATA_DIR = Path(os.getenv("EXTRACTOR_DATA_DIR") or ROOT_DIR / "data")
+IMAGE_DIR = Path(os.getenv("EXTRACTOR_IMAGE_DIR") or ROOT_DIR / "frontend" / "public" / "images")
+CACHE_DIR = DATA_DIR / ".cache"
+# export 子命令输出的部署数据（前端构建时优先使用）
+EXPORT_DIR = DATA_DIR / "export"
+JOBS_DB = CACHE_DIR / "jobs.sqlite"
+
+# 地点存储：journal（places.json + 追加日志，默认）或 sqlite（data/places.sqlite，适合大量地点）
+PLACE_STORE = os.getenv("PLACE_STORE", "journal")
+
+# 默认只追加到数据日志，尚未合并的写入达到该数量时才在运行结束时合并生成 places.json、分片和搜索索引
+# （--compact 总是合并，--no-compact 从不合并）
+COMPACT_THRESHOLD = int(os.getenv("COMPACT_THRESHOLD", "200"))
+
+# 批量任务的封面下载失败时停在坐标阶段，下次运行时重试；累计失败这么多次后先保存不带封面的地点
+COVER_MAX_ATTEMPTS = int(os.getenv("COVER_MAX_ATTEMPTS", "3"))
+
+# 批量模式下各服务商的默认并发上限（可通过环境变量 <NAME>_CONCURRENCY 覆盖）
+PROVIDER_CONCURRENCY = {
+    "qwen": 4,
+    "openai": 4,
+    "deepseek": 8,
+    "amap": 8,
+    "cover": 8,
+    "video": 4,
+}
+
+# 模型结果缓存：默认保留30天，最多10000条
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL_DAYS", "30")) * 86400
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+# 地理编码缓存：成功结果保留180天，解析失败的地址保留1天（负缓存）
+GEOCODE_CACHE_TTL = 180 * 86400
+GEOCODE_NEGATIVE_TTL = 86400
+GEOCODE_CACHE_MAX_ENTRIES = 50000
+
+# OpenAI 兼容接口地址（可通过 <NAME>_BASE_URL 指向代理或本地测试服务）
+MODEL_BASE_URLS = {
+    "qwen": os.getenv("QWEN_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1"),
+    "openai": os.getenv("OPENAI_BASE_URL") or None,
+    "deepseek": os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com"),
+}
+
+# 提取策略（sequential / hedge / race / merge）和各服务的截止时间（秒）
+EXTRACTION_STRATEGY = os.getenv("EXTRACTION_STRATEGY", "sequential")
+HEDGE_DELAY = float(os.getenv("HEDGE_DELAY", "5"))
+PROVIDER_DEADLINES = {
+    "qwen": float(os.getenv("QWEN_DEADLINE", "90")),
+    "text": float(os.getenv("TEXT_DEADLINE", "45")),
+}
+
+# 各服务的结构化输出方式（json_schema / json_object / none），可通过 <NAME>_RESPONSE_FORMAT 覆盖；
+# 服务商不支持时自动退回普通模式，回复都经过容错解析和结构校验
+RESPONSE_FORMATS = {
+    "qwen": os.getenv("QWEN_RESPONSE_FORMAT", "json_object"),
+    "openai": os.getenv("OPENAI_RESPONSE_FORMAT", "json_schema"),
+    "deepseek": os.getenv("DEEPSEEK_RESPONSE_FORMAT", "json_object"),
+}
+
+# 400 错误信息中包含这些词时才视为不支持 response_format（其他 400，例如视频无法下载，直接抛出）
+RESPONSE_FORMAT_ERROR_HINTS = ("response_format", "json_schema", "json_object")
+
+# 服务商连续这么多次以 response_format 为由拒绝请求后，本进程内不再附带该参数
+RESPONSE_FORMAT_MAX_REJECTIONS = int(os.getenv("RESPONSE_FORMAT_MAX_REJECTIONS", "3"))
 
-# 确保目录存在
-DATA_DIR.mkdir(exist_ok=True)
-IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+# 模型调用使用流式输出（LLM_STREAMING=0 关闭）：边接收边增量解析，JSON 对象闭合后模型还在输出说明文字时
+# 立即断开；address 和 city 字段完整后就在后台提前获取坐标，与模型剩余的输出重叠
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1") != "0"
+
+# 各服务使用的模型；修改模型或提示词时同时增大 PROMPT_VERSION，
+# reenrich 子命令会据此找出由旧版本生成的地点
+EXTRACTION_MODELS = {
+    "qwen": "qwen-vl-max-latest",  # 或 qwen-vl-plus, qwen-vl-flash
+    "openai": "gpt-4o-mini",  # 使用支持视觉的模型
+    "deepseek": "deepseek-chat",
+}
+PROMPT_VERSION = 1
+
+# 文本分析的系统提示词
+TEXT_SYSTEM_PROMPT = "你是一个专业的信息提取助手,擅长从文本中提取地点和美食相关信息。"
+
+# 批量模式下把多条视频的标题和描述合并成一次 DeepSeek 请求（1 表示不合并，可用 --text-batch 覆盖），
+# 系统提示词和返回格式说明只发送一次；每条视频预留的输出 token 数
+TEXT_BATCH_SIZE = int(os.getenv("TEXT_BATCH_SIZE", "1"))
+TEXT_BATCH_TOKENS_PER_ITEM = 400
+TEXT_BATCH_MAX_TOKENS = 8192
+
+TEXT_BATCH_PROMPT = """
+请从以下多条抖音视频信息中分别提取地点和美食信息，每条视频以 [id] 开头。
+
+请以JSON格式返回，places 数组中每条视频一个对象，id 与输入一致:
+{
+    "places": [
+        {
+            "id": "视频 id",
+            "place_name": "地点名称",
+            "address": "详细地址 (如果有)",
+            "city": "城市",
+            "province": "省份",
+            "foods": [
+                {
+                    "name": "美食名称",
+                    "description": "美食描述",
+                    "tags": ["标签1", "标签2"]
+                }
+            ]
+        }
+    ]
+}
+
+如果无法提取某些信息,请留空字符串或空数组。
+只返回JSON,不要其他说明文字。
+"""
+
+# reenrich 可检查的项目：foods 美食为空、outdated 由旧模型/提示词生成、location 缺少坐标或只有城市中心的近似坐标、cover 缺少缩略图
+REENRICH_CHECKS = ("foods", "outdated", "location", "cover")
+
+AMAP_BASE_URL = os.getenv("AMAP_BASE_URL", "https://restapi.amap.com")
+AMAP_GEOCODE_URL = f"{AMAP_BASE_URL.rstrip('/')}/v3/geocode/geo"
+AMAP_BATCH_SIZE = 10  # 高德批量地理编码每次最多10个地址
+
+# 下载视频（抽取关键帧）时附带的请求头，抖音 CDN 会校验 Referer
+VIDEO_HEADERS = {"Referer": "https://www.douyin.com/"}
 
 
 class DouyinExtractor:
     """抖音内容提取器"""
     
-    def __init__(self, non_interactive=False):
+    def __init__(self, non_interactive=False, use_cache=True, refresh_cache=False,
+                 strategy=EXTRACTION_STRATEGY, metrics=None):
         self.amap_key = os.getenv('AMAP_WEB_SERVICE_KEY')
         self.deepseek_key = os.getenv('DEEPSEEK_API_KEY')
         self.openai_key = os.getenv('OPENAI_API_KEY')  # 用于视觉分析
         self.qwen_key = os.getenv('QWEN_API_KEY')  # 通义千问 VL（推荐，国内可用）
         self.non_interactive = non_interactive  # GitHub Actions 非交互模式
+        self.refresh = refresh_cache  # 重新处理已存在的视频
+        self.metrics = metrics or Metrics()  # 各阶段耗时、token 用量、缓存命中
+        
+        # 模型调用结果缓存（--no-cache 关闭，--refresh 忽略已有结果重新调用）
+        self.llm_cache = DiskCache(
+            CACHE_DIR / "llm.sqlite",
+            ttl=LLM_CACHE_TTL,
+            max_entries=LLM_CACHE_MAX_ENTRIES,
+            enabled=use_cache,
+            refresh=refresh_cache,
+            name="llm",
+            metrics=self.metrics,
+        )
+        self.store = open_store(DATA_DIR / "places.json", PLACE_STORE)
+        self._index = None
+        self._index_lock = threading.Lock()
+        self.geocode_cache = DiskCache(
+            CACHE_DIR / "geocode.sqlite",
+            ttl=GEOCODE_CACHE_TTL,
+            max_entries=GEOCODE_CACHE_MAX_ENTRIES,
+            enabled=use_cache,
+            refresh=refresh_cache,
+            name="geocode",
+            metrics=self.metrics,
+        )
         
         if not self.amap_key:
             print("警告: 未配置高德地图API密钥,将无法获取精确坐标")
@@ -50,6 +237,198 @@ class DouyinExtractor:
         
         if self.qwen_key:
             print("✓ 已配置 Qwen VL API，支持视频智能分析")
+        
+        # 每个服务商一个信号量，限制批量模式下的并发请求数
+        self._provider_slots = {
+            name: threading.BoundedSemaphore(
+                int(os.getenv(f"{name.upper()}_CONCURRENCY", default))
+            )
+            for name, default in PROVIDER_CONCURRENCY.items()
+        }
+        # 每个服务商的令牌桶限流和每日配额（计数保存在 data/.cache/quota.sqlite）
+        self.limits = RateLimiter(CACHE_DIR / "quota.sqlite", metrics=self.metrics)
+    
+        # 长连接会话和模型客户端，每个提取器只创建一次（第一次使用时创建）
+        self._http = None
+        self._http_lock = threading.Lock()
+        self._api_keys = {
+            "qwen": self.qwen_key,
+            "openai": self.openai_key,
+            "deepseek": self.deepseek_key,
+        }
+        self._clients = {}
+        self._clients_lock = threading.Lock()
+        self._plain_json_providers = set()  # 不接受 response_format 的服务商
+        self._format_rejections = {}  # 服务商 -> 连续拒绝 response_format 的次数
+        self._format_lock = threading.Lock()
+        
+        # 模型服务调度策略
+        self.strategy = ExtractionStrategy(strategy, hedge_delay=HEDGE_DELAY, max_workers=32)
+        # 流式提取过程中提前获取坐标的线程池（并发仍受 amap 名额限制）
+        self._prefetch_pool = ThreadPoolExecutor(
+            max_workers=PROVIDER_CONCURRENCY["amap"], thread_name_prefix="geocode-prefetch"
+        )
+    
+    @property
+    def http(self):
+        """requests 会话（只在需要访问高德或下载封面时创建）"""
+        with self._http_lock:
+            if self._http is None:
+                self._http = create_session({"amap": AMAP_BASE_URL})
+            return self._http
+    
+    @property
+    def index(self):
+        """已有地点索引（首次使用时从数据文件加载）"""
+        with self._index_lock:
+            if self._index is None:
+                self._index = self.store.lookup()
+            return self._index
+    
+    def _openai_client(self, provider, timeout=None):
+        """获取（首次使用时创建）某个服务商的 OpenAI 兼容客户端
+        
+        timeout 不为空时返回共享同一连接池、使用该请求超时的副本
+        """
+        with self._clients_lock:
+            client = self._clients.get(provider)
+            if client is None:
+                client = create_openai_client(
+                    provider, self._api_keys[provider], MODEL_BASE_URLS[provider],
+                    metrics=self.metrics, limiter=self.limits,
+                )
+                self._clients[provider] = client
+        if timeout:
+            return client.with_options(timeout=timeout)
+        return client
+    
+    def warm_up(self):
+        """预先创建已配置服务商的模型客户端（常驻服务启动时调用）"""
+        for provider, key in self._api_keys.items():
+            if key:
+                self._openai_client(provider)
+    
+    def close(self):
+        """关闭连接池和缓存"""
+        if self._http is not None:
+            self._http.close()
+        with self._clients_lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+        self.llm_cache.close()
+        self.geocode_cache.close()
+        self.limits.close()
+        self.store.close()
+        self.strategy.shutdown()
+        self._prefetch_pool.shutdown()
+        self.metrics.close()
+    
+    @contextmanager
+    def _slot(self, provider, cancel=None):
+        """占用某个服务商的一个并发名额，并按限流速率取得令牌
+        
+        被限流太久或当日配额用完时抛出 RateLimited，由调用方换用其他服务商；
+        调用已被提取策略取消（cancel 已设置）时抛出 Cancelled，不再占用名额和令牌
+        """
+        semaphore = self._provider_slots[provider]
+        with semaphore:
+            if cancel is not None and cancel.is_set():
+                raise Cancelled(f"{provider} 调用已取消")
+            self.limits.acquire(provider)
+            yield
+    
+    def _create_completion(self, provider, client, schema=PLACE_SCHEMA, schema_name="place", **kwargs):
+        """调用 chat.completions.create，按 RESPONSE_FORMATS 附带 response_format（回复结构为 schema）
+        
+        服务商以 response_format 为由拒绝请求（400 且错误信息提到 response_format）时，
+        本次去掉该参数重试；连续被拒绝 RESPONSE_FORMAT_MAX_REJECTIONS 次后不再附带。
+        其他 400 错误（例如视频无法下载）直接抛出，不重试也不影响之后的请求
+        """
+        fmt = None
+        if provider not in self._plain_json_providers:
+            fmt = response_format(RESPONSE_FORMATS[provider], schema, schema_name)
+        if fmt is None:
+            return client.chat.completions.create(**kwargs)
+        try:
+            response = client.chat.completions.create(response_format=fmt, **kwargs)
+        except Exception as e:
+            if not rejects_response_format(e):
+                raise
+            with self._format_lock:
+                rejections = self._format_rejections.get(provider, 0) + 1
+                self._format_rejections[provider] = rejections
+                if rejections >= RESPONSE_FORMAT_MAX_REJECTIONS:
+                    self._plain_json_providers.add(provider)
+            print(f"  ⚠️  {provider} 不接受 response_format={fmt['type']}（连续 {rejections} 次），"
+                  f"本次改为普通模式: {e}")
+            self.metrics.count("response_format_rejections_total", provider=provider)
+            return client.chat.completions.create(**kwargs)
+        with self._format_lock:
+            self._format_rejections.pop(provider, None)
+        return response
+    
+    def _complete(self, provider, client, on_partial=None, roots="{", cancel=None, **kwargs):
+        """调用模型，返回 (回复文本, usage)
+        
+        流式模式下边接收边增量解析：每有字段完整就把目前已完整的部分传给 on_partial；
+        JSON 根（roots 中的类型）闭合后如果模型继续输出其他文字，立即关闭连接，不再等待输出结束
+        （模型正常结束时读完最后的 usage 再返回）。cancel 被设置（其他服务已返回结果）时关闭连接
+        并抛出 Cancelled。其余参数传给 _create_completion
+        """
+        if cancel is not None and cancel.is_set():
+            raise Cancelled(f"{provider} 调用已取消")
+        if not LLM_STREAMING:
+            response = self._create_completion(provider, client, **kwargs)
+            return response.choices[0].message.content, response.usage
+        
+        stream = self._create_completion(
+            provider, client, stream=True,
+            extra_body={"stream_options": {"include_usage": True}}, **kwargs
+        )
+        parser = JsonRepairParser(roots=roots)
+        parts = []
+        usage = None
+        completed = 0
+        try:
+            for chunk in stream:
+                if cancel is not None and cancel.is_set():
+                    self.metrics.count("llm_stream_cancelled_total", provider=provider)
+                    raise Cancelled(f"{provider} 调用已取消")
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content or ""
+                if parser.done:
+                    if text.strip():
+                        self.metrics.count("llm_stream_early_exit_total", provider=provider)
+                        break
+                    continue
+                parts.append(text)
+                parser.feed(text)
+                if on_partial and parser.completed != completed:
+                    completed = parser.completed
+                    on_partial(parser.value())
+        finally:
+            stream.close()
+        return "".join(parts), usage
+    
+    def _parse_reply(self, provider, text):
+        """解析模型回复（容错修复格式问题）并按地点结构校验
+        
+        Raises:
+            ValueError: 回复中没有 JSON 对象
+        """
+        extracted, repairs = parse_place_reply(text or "")
+        if repairs:
+            self.metrics.count("json_repairs_total", repairs, provider=provider)
+        return extracted
+    
+    def _llm_cache_key(self, provider, model, prompt, inputs):
+        """模型缓存键：服务商 + 模型 + 提示词哈希 + 输入"""
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        return make_key(provider, model, prompt_hash, inputs)
     
     def _manual_input(self, url):
         """手动输入模式（仅用于交互式环境）"""
@@ -77,27 +456,100 @@ class DouyinExtractor:
             "video_url": url
         }
     
-    def _analyze_video_with_qwen(self, video_url, title, description):
-        """使用通义千问 Qwen VL 分析视频内容（国内推荐）"""
+    @traced("qwen")
+    def _analyze_video_with_qwen(self, video_url, title, description, timeout=None,
+                                 play_url=None, keyframes=None, on_partial=None, cancel=None):
+        """使用通义千问 Qwen VL 分析视频内容（国内推荐）
+        
+        有视频播放地址且可以抽取关键帧时，发送关键帧（多图输入）；
+        否则直接把抖音链接作为 video_url 发送（经常无法分析）。
+        on_partial 在流式输出过程中接收已完整的部分结果，cancel 被设置时尽快放弃
+        """
         if not self.qwen_key:
             return None
         
         try:
             print("\n🎬 使用通义千问 Qwen VL 分析视频内容...")
-            print("  ⚠️  注意：直接使用抖音链接可能无法分析，建议手动提供数据")
-            
-            # 直接使用抖音链接（可能不支持）
-            actual_video_url = video_url
             
             # Qwen API 兼容 OpenAI 格式
-            client = OpenAI(
-                api_key=self.qwen_key,
-                base_url="https://dashscope.aliyuncs.com/compatible-mode/v1"
-            )
+            client = self._openai_client("qwen", timeout)
+            model = EXTRACTION_MODELS["qwen"]
             
-            # 创建提示词
-            prompt = f"""
-请仔细观看这个抖音短视频，提取其中的地点和美食信息。
+            use_frames = bool(play_url and keyframes and keyframes_available())
+            if use_frames:
+                prompt = self._qwen_prompt("以下图片是从这个抖音短视频中按时间顺序抽取的关键帧，请仔细查看每一帧",
+                                           title, description)
+                cache_key = self._llm_cache_key(
+                    "qwen", model, prompt, {"play_url": play_url, "max_frames": MAX_KEYFRAMES}
+                )
+                cached = self.llm_cache.get(cache_key)
+                if cached is not MISS:
+                    print("  ✓ 命中本地缓存，跳过 Qwen VL 调用")
+                    return {**validate_place(cached), "model": model}
+                frames = keyframes()
+                if frames:
+                    media = image_parts(frames)
+                else:
+                    print("  ⚠️  未能抽取关键帧，改为直接发送抖音链接")
+                    use_frames = False
+            
+            if not use_frames:
+                print("  ⚠️  注意：直接使用抖音链接可能无法分析，建议提供 play_url 或手动数据")
+                prompt = self._qwen_prompt("请仔细观看这个抖音短视频", title, description)
+                cache_key = self._llm_cache_key("qwen", model, prompt, {"video_url": video_url})
+                cached = self.llm_cache.get(cache_key)
+                if cached is not MISS:
+                    print("  ✓ 命中本地缓存，跳过 Qwen VL 调用")
+                    return {**validate_place(cached), "model": model}
+                media = [{"type": "video_url", "video_url": {"url": video_url}}]
+            
+            # 调用 Qwen VL API
+            with self._slot("qwen", cancel):
+                content, usage = self._complete(
+                    "qwen", client, on_partial, cancel=cancel,
+                    model=model,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [{"type": "text", "text": prompt}, *media]
+                        }
+                    ],
+                    temperature=0.3,
+                    max_tokens=1000
+                )
+            
+            self.metrics.record_usage("qwen", model, usage)
+            extracted = self._parse_reply("qwen", content)
+            extracted["model"] = model
+            
+            # 检查结果
+            if extracted.get('place_name') or extracted.get('city') or extracted.get('foods'):
+                print(f"\n  ✅ Qwen VL 视频分析完成！")
+                print(f"    地点: {extracted.get('place_name', '未知')}")
+                print(f"    城市: {extracted.get('city', '未知')}")
+                print(f"    美食数量: {len(extracted.get('foods', []))}")
+                self.llm_cache.set(cache_key, extracted)
+                return extracted
+            else:
+                print("  ⚠️  视频中未找到有效信息")
+                return None
+                
+        except RateLimited as e:
+            print(f"  Qwen VL 暂不可用: {e}")
+            return None
+        except Cancelled:
+            return None
+        except Exception as e:
+            print(f"  Qwen VL 分析失败: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+    
+    @staticmethod
+    def _qwen_prompt(intro, title, description):
+        """Qwen VL 提示词（intro 说明输入是视频还是关键帧）"""
+        return f"""
+{intro}，提取其中的地点和美食信息。
 
 视频标题: {title if title else '无'}
 视频描述: {description if description else '无'}
@@ -126,64 +578,26 @@ class DouyinExtractor:
 
 如果某些信息无法从视频中获取，请留空字符串或空数组。
 """
-            
-            # 调用 Qwen VL API
-            response = client.chat.completions.create(
-                model="qwen-vl-max-latest",  # 或 qwen-vl-plus, qwen-vl-flash
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {"type": "video_url", "video_url": {"url": actual_video_url}}
-                        ]
-                    }
-                ],
-                temperature=0.3,
-                max_tokens=1000
-            )
-            
-            result_text = response.choices[0].message.content.strip()
-            
-            # 移除 markdown 标记
-            if result_text.startswith("```json"):
-                result_text = result_text[7:]
-            if result_text.startswith("```"):
-                result_text = result_text[3:]
-            if result_text.endswith("```"):
-                result_text = result_text[:-3]
-            
-            extracted = json.loads(result_text.strip())
-            
-            # 检查结果
-            if extracted.get('place_name') or extracted.get('city') or extracted.get('foods'):
-                print(f"\n  ✅ Qwen VL 视频分析完成！")
-                print(f"    地点: {extracted.get('place_name', '未知')}")
-                print(f"    城市: {extracted.get('city', '未知')}")
-                print(f"    美食数量: {len(extracted.get('foods', []))}")
-                return extracted
-            else:
-                print("  ⚠️  视频中未找到有效信息")
-                return None
-                
-        except Exception as e:
-            print(f"  Qwen VL 分析失败: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
     
-    def _analyze_with_vision(self, cover_url, title, description):
-        """使用视觉AI分析封面图片"""
+    @traced("vision")
+    def _analyze_with_vision(self, cover_url, title, description, timeout=None,
+                             play_url=None, keyframes=None, on_partial=None, cancel=None):
+        """使用视觉AI分析封面图片（有视频播放地址时同时分析视频关键帧）"""
         if not self.openai_key:
             return None
         
         try:
-            print("  使用 GPT-4 Vision 分析封面图片...")
+            use_frames = bool(play_url and keyframes and keyframes_available())
+            if not cover_url and not use_frames:
+                return None
+            sources = [name for name, present in (("封面图片", cover_url), ("视频关键帧", use_frames)) if present]
+            print(f"  使用 GPT-4 Vision 分析{'和'.join(sources)}...")
             
-            client = OpenAI(api_key=self.openai_key)
+            client = self._openai_client("openai", timeout)
             
+            subject = "这些抖音视频封面和关键帧图片" if use_frames else "这张抖音视频封面图片"
             prompt = f"""
-请分析这张抖音视频封面图片，提取其中的地点和美食信息。
+请分析{subject}，提取其中的地点和美食信息。
 
 视频标题: {title}
 视频描述: {description}
@@ -212,31 +626,39 @@ class DouyinExtractor:
 如果无法提取某些信息，请留空字符串或空数组。只返回JSON。
 """
             
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",  # 使用支持视觉的模型
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {"type": "image_url", "image_url": {"url": cover_url}}
-                        ]
-                    }
-                ],
-                max_tokens=500
-            )
+            model = EXTRACTION_MODELS["openai"]
+            inputs = {"cover_url": cover_url}
+            if use_frames:
+                inputs.update(play_url=play_url, max_frames=MAX_KEYFRAMES)
+            cache_key = self._llm_cache_key("openai", model, prompt, inputs)
+            cached = self.llm_cache.get(cache_key)
+            if cached is not MISS:
+                print("  ✓ 命中本地缓存，跳过视觉AI调用")
+                return {**validate_place(cached), "model": model}
             
-            result_text = response.choices[0].message.content.strip()
+            media = [{"type": "image_url", "image_url": {"url": cover_url}}] if cover_url else []
+            if use_frames:
+                media += image_parts(keyframes())
+            if not media:
+                print("  ⚠️  没有可分析的图片")
+                return None
             
-            # 移除markdown标记
-            if result_text.startswith("```json"):
-                result_text = result_text[7:]
-            if result_text.startswith("```"):
-                result_text = result_text[3:]
-            if result_text.endswith("```"):
-                result_text = result_text[:-3]
+            with self._slot("openai", cancel):
+                content, usage = self._complete(
+                    "openai", client, on_partial, cancel=cancel,
+                    model=model,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [{"type": "text", "text": prompt}, *media]
+                        }
+                    ],
+                    max_tokens=500
+                )
             
-            extracted = json.loads(result_text.strip())
+            self.metrics.record_usage("openai", model, usage)
+            extracted = self._parse_reply("openai", content)
+            extracted["model"] = model
             
             # 检查是否有有效信息
             if extracted.get('place_name') or extracted.get('city') or extracted.get('foods'):
@@ -244,44 +666,72 @@ class DouyinExtractor:
                 print(f"    地点: {extracted.get('place_name', '未知')}")
                 print(f"    城市: {extracted.get('city', '未知')}")
                 print(f"    美食数量: {len(extracted.get('foods', []))}")
+                self.llm_cache.set(cache_key, extracted)
                 return extracted
             else:
                 print("  ⚠️  图片中未找到有效信息")
                 return None
                 
+        except RateLimited as e:
+            print(f"  视觉AI暂不可用: {e}")
+            return None
+        except Cancelled:
+            return None
         except Exception as e:
             print(f"  视觉分析失败: {e}")
             return None
     
     def extract_info_with_ai(self, video_info):
-        """使用AI提取地点和美食信息"""
+        """使用AI提取地点和美食信息（失败时切换到手动输入）"""
         if not self.deepseek_key:
             return self._manual_extract()
         
+        title = video_info.get('title', '').strip()
+        description = video_info.get('description', '').strip()
+        cover_url = video_info.get('cover_url', '').strip()
+        
+        if len(title) < 3 and len(description) < 3 and not cover_url:
+            print("\n⚠️  视频标题和描述内容过少,无法使用AI分析")
+            print("切换到手动输入模式...")
+            return self._manual_extract()
+        
+        extracted = self._analyze_text(video_info)
+        if not extracted:
+            print("切换到手动输入模式...")
+            return self._manual_extract()
+        return extracted
+    
+    @traced("text")
+    def _analyze_text(self, video_info, timeout=None, keyframes=None, on_partial=None, cancel=None):
+        """根据视频标题、描述（和封面、视频关键帧）提取信息，失败时返回 None"""
         # 检查输入内容是否有效
         title = video_info.get('title', '').strip()
         description = video_info.get('description', '').strip()
         cover_url = video_info.get('cover_url', '').strip()
+        play_url = video_info.get('play_url', '').strip()
         
-        # 如果有封面图片，尝试使用视觉AI分析
-        if cover_url and len(title) < 10 and len(description) < 10:
-            print("\n📷 检测到封面图片，尝试使用视觉AI分析...")
-            vision_result = self._analyze_with_vision(cover_url, title, description)
+        # 如果有封面图片或视频，尝试使用视觉AI分析
+        if (cover_url or play_url) and len(title) < 10 and len(description) < 10:
+            print("\n📷 检测到封面图片或视频，尝试使用视觉AI分析...")
+            vision_result = self._analyze_with_vision(
+                cover_url, title, description, timeout=timeout, play_url=play_url, keyframes=keyframes,
+                on_partial=on_partial, cancel=cancel,
+            )
             if vision_result:
                 return vision_result
+            if cancel is not None and cancel.is_set():
+                return None
+        
+        if not self.deepseek_key:
+            return None
         
         if len(title) < 3 and len(description) < 3:
             print("\n⚠️  视频标题和描述内容过少,无法使用AI分析")
-            print("切换到手动输入模式...")
-            return self._manual_extract()
+            return None
         
         print("\n使用AI分析文本内容...")
         
-        client = OpenAI(
-            api_key=self.deepseek_key,
-            base_url="https://api.deepseek.com"
-        )
-        
+        client = self._openai_client("deepseek", timeout)
         prompt = f"""
 请从以下抖音视频信息中提取地点和美食信息:
 
@@ -307,43 +757,175 @@ class DouyinExtractor:
 只返回JSON,不要其他说明文字。
 """
         
+        model = EXTRACTION_MODELS["deepseek"]
+        cache_key = self._llm_cache_key(
+            "deepseek", model, prompt,
+            {"title": video_info['title'], "description": video_info['description']}
+        )
+        cached = self.llm_cache.get(cache_key)
+        if cached is not MISS:
+            print("✓ 命中本地缓存，跳过AI调用")
+            return {**validate_place(cached), "model": model}
+        
         try:
-            response = client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": "你是一个专业的信息提取助手,擅长从文本中提取地点和美食相关信息。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3
-            )
-            result_text = response.choices[0].message.content.strip()
-            # 移除可能的markdown代码块标记
-            if result_text.startswith("```json"):
-                result_text = result_text[7:]
-            if result_text.startswith("```"):
-                result_text = result_text[3:]
-            if result_text.endswith("```"):
-                result_text = result_text[:-3]
-            
-            extracted = json.loads(result_text.strip())
+            with self._slot("deepseek", cancel):
+                content, usage = self._complete(
+                    "deepseek", client, on_partial, cancel=cancel,
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": TEXT_SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.3
+                )
+            self.metrics.record_usage("deepseek", model, usage)
+            extracted = self._parse_reply("deepseek", content)
+            extracted["model"] = model
             
             # 检查AI提取结果是否有效
             if not extracted.get('place_name') and not extracted.get('city'):
                 print("\n⚠️  AI未能提取到有效信息")
-                print("切换到手动输入模式...")
-                return self._manual_extract()
+                return None
             
             print(f"✓ AI提取完成")
             print(f"  地点: {extracted.get('place_name', '未知')}")
             print(f"  城市: {extracted.get('city', '未知')}")
             print(f"  美食数量: {len(extracted.get('foods', []))}")
             
+            self.llm_cache.set(cache_key, extracted)
             return extracted
             
+        except Cancelled:
+            return None
         except Exception as e:
             print(f"AI提取失败: {e}")
-            print("切换到手动输入模式...")
-            return self._manual_extract()
+            return None
+    
+    def extract_text_batch(self, items, size=TEXT_BATCH_SIZE, workers=8):
+        """把有标题/描述的链接每 size 条合并成一次 DeepSeek 文本提取请求
+        
+        每条结果单独校验和缓存；请求失败时对半拆分重试，回复中缺少的条目重新组成一组重试。
+        
+        Args:
+            items: load_batch_file 返回的任务列表
+            size: 每次请求包含的视频数
+            workers: 同时进行的请求数（另受 deepseek 并发上限限制）
+        
+        Returns:
+            {url: (video_info, extracted)}，未能提取的链接不在结果中（由调用方逐条提取）
+        """
+        if not self.deepseek_key or size < 2:
+            return {}
+        
+        model = EXTRACTION_MODELS["deepseek"]
+        results = {}
+        pending = []
+        for item in items:
+            manual_data = item.get('manual_data')
+            if manual_data and manual_data.get('place_name') and manual_data.get('city'):
+                continue
+            video_info = default_video_info(item['url'], item.get('video_info'))
+            if len(video_info['title'].strip()) < 3 and len(video_info['description'].strip()) < 3:
+                continue
+            cached = self.llm_cache.get(self._text_batch_cache_key(video_info))
+            if cached is not MISS:
+                results[item['url']] = (video_info, normalize_region({**validate_place(cached), "model": model}))
+            else:
+                pending.append((item['url'], video_info))
+        if not results and not pending:
+            return {}
+        
+        print(f"\n📦 合并文本提取: {len(pending)} 条，每次请求 {size} 条（缓存命中 {len(results)}）")
+        groups = [pending[i:i + size] for i in range(0, len(pending), size)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for extracted in pool.map(self._extract_text_group, groups):
+                results.update(extracted)
+        
+        fallback = sum(1 for url, _ in pending if url not in results)
+        print(f"✓ 合并文本提取完成 {len(results)} 条" + (f"，其余 {fallback} 条逐条提取" if fallback else ""))
+        return results
+    
+    def _text_batch_cache_key(self, video_info):
+        return self._llm_cache_key(
+            "deepseek", EXTRACTION_MODELS["deepseek"], TEXT_BATCH_PROMPT,
+            {"title": video_info['title'], "description": video_info['description']}
+        )
+    
+    def _extract_text_group(self, group):
+        """提取一组 (url, video_info)，返回 {url: (video_info, extracted)}"""
+        entries = {str(index): entry for index, entry in enumerate(group, 1)}
+        try:
+            places = self._analyze_text_batch(entries)
+        except RateLimited as e:
+            print(f"  DeepSeek 暂不可用，{len(group)} 条改为逐条提取: {e}")
+            return {}
+        except Exception as e:
+            print(f"  合并文本提取失败（{len(group)} 条）: {e}")
+            return self._split_text_group(group)
+        
+        model = EXTRACTION_MODELS["deepseek"]
+        results = {}
+        missing = []
+        for key, (url, video_info) in entries.items():
+            place = places.get(key)
+            if place is None:
+                missing.append((url, video_info))
+            elif place.get('place_name') or place.get('city'):
+                self.llm_cache.set(self._text_batch_cache_key(video_info), place)
+                results[url] = (video_info, normalize_region({**place, "model": model}))
+            # 没有有效信息的条目交给逐条提取（可能使用视觉模型）
+        
+        if missing:
+            print(f"  回复中缺少 {len(missing)}/{len(group)} 条，重新请求")
+            if len(missing) < len(group):
+                results.update(self._extract_text_group(missing))
+            else:
+                results.update(self._split_text_group(group))
+        return results
+    
+    def _split_text_group(self, group):
+        """对半拆分后分别重试（只剩一条时放弃，由调用方逐条提取）"""
+        if len(group) < 2:
+            return {}
+        middle = len(group) // 2
+        return {**self._extract_text_group(group[:middle]), **self._extract_text_group(group[middle:])}
+    
+    @traced("text_batch")
+    def _analyze_text_batch(self, entries):
+        """一次请求提取多条视频的信息
+        
+        Args:
+            entries: {id: (url, video_info)}
+        
+        Returns:
+            {id: 校验后的地点}，回复中缺少的 id 不在结果中
+        
+        Raises:
+            请求失败或回复中没有 JSON 内容
+        """
+        client = self._openai_client("deepseek")
+        model = EXTRACTION_MODELS["deepseek"]
+        videos = "\n\n".join(
+            f"[{key}]\n标题: {video_info['title']}\n描述: {video_info['description']}"
+            for key, (_, video_info) in entries.items()
+        )
+        with self._slot("deepseek"):
+            content, usage = self._complete(
+                "deepseek", client,
+                roots="{[", schema=PLACES_BATCH_SCHEMA, schema_name="places",
+                model=model,
+                messages=[
+                    {"role": "system", "content": TEXT_SYSTEM_PROMPT},
+                    {"role": "user", "content": f"{TEXT_BATCH_PROMPT}\n{videos}\n"}
+                ],
+                temperature=0.3,
+                max_tokens=min(TEXT_BATCH_MAX_TOKENS, TEXT_BATCH_TOKENS_PER_ITEM * len(entries))
+            )
+        self.metrics.record_usage("deepseek", model, usage)
+        places, repairs = parse_places_reply(content or "")
+        if repairs:
+            self.metrics.count("json_repairs_total", repairs, provider="deepseek")
+        return places
     
     def _manual_extract(self):
         """手动提取信息"""
@@ -382,38 +964,183 @@ class DouyinExtractor:
             "foods": foods
         }
     
+    @traced("geocode")
     def get_coordinates(self, address, city):
-        """使用高德地图API获取坐标"""
+        """使用高德地图API获取坐标
+        
+        没有具体地址时直接使用内置行政区划表中的城市中心坐标（不访问网络）；
+        未配置高德或无法解析时也退回城市中心的近似坐标
+        """
+        if not address:
+            location = approximate_location(address, city)
+            if location:
+                print(f"\n✓ 只有城市信息，使用城市中心坐标: ({location['lng']}, {location['lat']})")
+                return location
+        
         if not self.amap_key:
             print("未配置高德地图API,跳过坐标获取")
-            return None
+            return self._approximate_coordinates(address, city)
         
         print(f"\n正在获取坐标: {address or city}...")
         
-        api_url = "https://restapi.amap.com/v3/geocode/geo"
+        cache_key = geocode_key(address, city)
+        cached = self.geocode_cache.get(cache_key)
+        if cached is not MISS:
+            if cached:
+                print(f"✓ 命中坐标缓存: ({cached['lng']}, {cached['lat']})")
+                return cached
+            print("坐标缓存记录该地址无法解析")
+            return self._fallback_coordinates(address, city)
+        
+        try:
+            location = self._request_location(address, city)
+            if location:
+                print(f"✓ 坐标获取成功: ({location['lng']}, {location['lat']})")
+                return location
+            else:
+                print("坐标获取失败,请手动输入")
+                return self._fallback_coordinates(address, city)
+                
+        except Exception as e:
+            print(f"坐标获取失败: {e}")
+            return self._fallback_coordinates(address, city)
+    
+    def _request_location(self, address, city):
+        """请求高德地理编码接口并写入坐标缓存，返回坐标（无法解析时为 None）"""
         params = {
             "key": self.amap_key,
             "address": f"{city} {address}" if address else city,
             "city": city
         }
+        with self._slot("amap"):
+            response = self.http.get(AMAP_GEOCODE_URL, params=params, timeout=10)
+        count_retries(self.metrics, "amap", response)
+        observe_response(self.limits, "amap", response)
+        response.raise_for_status()
+        data = response.json()
+        
+        if data['status'] == '1' and data['geocodes']:
+            location = parse_amap_location(data['geocodes'][0].get('location'))
+        else:
+            location = None
         
+        self._cache_location(geocode_key(address, city), location)
+        return location
+    
+    @traced("geocode_prefetch", track_empty=False)
+    def _prefetch_location(self, address, city):
+        """后台提前获取坐标（不打印结果、不请求手动输入），失败时返回 None"""
+        cached = self.geocode_cache.get(geocode_key(address, city))
+        if cached is not MISS:
+            return cached
         try:
-            response = requests.get(api_url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data['status'] == '1' and data['geocodes']:
-                location = data['geocodes'][0]['location']
-                lng, lat = map(float, location.split(','))
-                print(f"✓ 坐标获取成功: ({lng}, {lat})")
-                return {"lng": lng, "lat": lat}
+            return self._request_location(address, city)
+        except Exception as e:
+            print(f"  提前获取坐标失败（稍后重试）: {e}")
+            return None
+    
+    @traced("geocode_batch")
+    def get_coordinates_batch(self, queries):
+        """批量获取坐标
+        
+        先查缓存，剩余地址去重后按城市分组，每组通过高德批量接口
+        （batch=true，每次最多10个地址）一次性解析。
+        
+        Args:
+            queries: (address, city) 列表
+        
+        Returns:
+            与 queries 一一对应的坐标列表（失败为 None）
+        """
+        if not self.amap_key:
+            print("未配置高德地图API,使用城市中心的近似坐标")
+            return [approximate_location(address, city) for address, city in queries]
+        
+        results = {}
+        pending = {}  # cache_key -> (address, city)
+        local = 0  # 只有城市、直接使用城市中心坐标的数量
+        for address, city in queries:
+            cache_key = geocode_key(address, city)
+            if cache_key in results or cache_key in pending:
+                continue
+            if not address:
+                results[cache_key] = approximate_location(address, city)
+                if results[cache_key]:
+                    local += 1
+                    continue
+            cached = self.geocode_cache.get(cache_key)
+            if cached is not MISS:
+                results[cache_key] = cached
             else:
-                print("坐标获取失败,请手动输入")
-                return self._manual_coordinates()
+                pending[cache_key] = (address, city)
+        
+        by_city = {}
+        for cache_key, (address, city) in pending.items():
+            by_city.setdefault(city, []).append((cache_key, address))
+        
+        requests_made = 0
+        for city, entries in by_city.items():
+            for i in range(0, len(entries), AMAP_BATCH_SIZE):
+                chunk = entries[i:i + AMAP_BATCH_SIZE]
+                params = {
+                    "key": self.amap_key,
+                    "address": "|".join(
+                        f"{city} {address}" if address else city
+                        for _, address in chunk
+                    ),
+                    "city": city,
+                    "batch": "true",
+                }
+                try:
+                    with self._slot("amap"):
+                        response = self.http.get(AMAP_GEOCODE_URL, params=params, timeout=10)
+                    count_retries(self.metrics, "amap", response)
+                    observe_response(self.limits, "amap", response)
+                    response.raise_for_status()
+                    data = response.json()
+                    requests_made += 1
+                except Exception as e:
+                    print(f"批量坐标获取失败 ({city}): {e}")
+                    continue
                 
-        except Exception as e:
-            print(f"坐标获取失败: {e}")
-            return self._manual_coordinates()
+                if data.get('status') != '1':
+                    print(f"批量坐标获取失败 ({city}): {data.get('info')}")
+                    continue
+                
+                # 批量接口按输入顺序返回，解析失败的地址 location 为空
+                geocodes = data.get('geocodes') or []
+                for index, (cache_key, _) in enumerate(chunk):
+                    location = None
+                    if index < len(geocodes):
+                        location = parse_amap_location(geocodes[index].get('location'))
+                    self._cache_location(cache_key, location)
+                    results[cache_key] = location
+        
+        print(f"\n✓ 批量坐标获取: {len(queries)} 个地点，城市中心 {local}，缓存命中 "
+              f"{len(queries) - len(pending) - local}，高德请求 {requests_made} 次")
+        
+        # 无法解析的地址使用城市中心的近似坐标
+        return [
+            results.get(geocode_key(address, city)) or approximate_location(address, city)
+            for address, city in queries
+        ]
+    
+    def _cache_location(self, cache_key, location):
+        """写入坐标缓存，解析失败的地址使用较短的过期时间"""
+        if location:
+            self.geocode_cache.set(cache_key, location)
+        else:
+            self.geocode_cache.set(cache_key, None, ttl=GEOCODE_NEGATIVE_TTL)
+    
+    def _fallback_coordinates(self, address, city):
+        """高德无法解析时：交互模式下请求手动输入，未输入时使用城市中心的近似坐标"""
+        return self._manual_coordinates() or self._approximate_coordinates(address, city)
+    
+    def _approximate_coordinates(self, address, city):
+        location = approximate_location(address, city)
+        if location:
+            print(f"  使用城市中心的近似坐标: ({location['lng']}, {location['lat']})")
+        return location
     
     def _manual_coordinates(self):
         """手动输入坐标"""
@@ -433,112 +1160,267 @@ class DouyinExtractor:
         
         return None
     
+    @traced("cover")
     def download_cover(self, cover_url):
-        """下载封面图片"""
+        """下载封面图片并生成缩略图
+        
+        Returns:
+            {"thumbnail": 默认缩略图URL, "thumbnails": 各尺寸缩略图列表}，失败时返回 None
+        """
         if not cover_url:
             return None
         
         print("\n正在下载封面图片...")
         
+        # 下载过程中使用临时文件，完成后按内容哈希命名
+        IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+        partial = IMAGE_DIR / f".{uuid.uuid4()}.part"
+        
         try:
-            response = requests.get(cover_url, timeout=15)
-            response.raise_for_status()
+            with self._slot("cover"):
+                with self.http.get(cover_url, timeout=15, stream=True) as response:
+                    count_retries(self.metrics, "cover", response)
+                    observe_response(self.limits, "cover", response)
+                    response.raise_for_status()
+                    ext = guess_extension(response.headers.get('Content-Type'))
+                    size, digest = stream_to_file(response, partial)
             
-            # 生成唯一文件名
-            ext = ".jpg"
-            if "image/png" in response.headers.get('Content-Type', ''):
-                ext = ".png"
+            stem = content_stem(digest)
             
-            filename = f"{uuid.uuid4()}{ext}"
-            filepath = IMAGE_DIR / filename
+            # 同一张图片已处理过：直接复用
+            thumbnails = find_thumbnails(IMAGE_DIR, stem)
+            original = find_original(IMAGE_DIR, stem)
+            if thumbnails or original:
+                partial.unlink()
+                print("✓ 封面图片已存在，复用已有文件")
+            else:
+                thumbnails = make_thumbnails(partial, IMAGE_DIR, stem)
+                if thumbnails:
+                    partial.unlink()
+                    print(f"✓ 封面已生成 {len(thumbnails)} 张缩略图 (原图 {size // 1024}KB)")
+                else:
+                    # 无法解码时保留原图
+                    original = IMAGE_DIR / f"{stem}{ext}"
+                    partial.rename(original)
+                    print(f"✓ 封面图片已保存: {original.name}")
             
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
+            if thumbnails:
+                thumbnail = (pick_thumbnail(thumbnails) or thumbnails[0])['url']
+            else:
+                thumbnail = f"/images/{original.name}"
             
-            print(f"✓ 封面图片已保存: {filename}")
-            return f"/images/{filename}"
+            return {"thumbnail": thumbnail, "thumbnails": thumbnails}
             
         except Exception as e:
+            partial.unlink(missing_ok=True)
             print(f"封面下载失败: {e}")
             return None
     
     def save_to_json(self, place_data):
         """保存到JSON文件"""
-        json_file = DATA_DIR / "places.json"
-        
-        # 读取现有数据
-        if json_file.exists():
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        else:
-            data = {"places": []}
-        
-        # 添加新地点
-        data["places"].append(place_data)
+        self.save_many([place_data])
+    
+    @traced("save", track_empty=False)
+    def save_many(self, places):
+        """将多个地点追加到数据日志（不重写 places.json）"""
+        self.store.append(places)
+        with self._index_lock:
+            if self._index is not None:
+                for place in places:
+                    self._index.add(place)
         
-        # 保存
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ 已写入 {len(places)} 个地点到: {self.store.write_path}")
+    
+    @traced("compact")
+    def compact(self):
+        """合并数据日志，生成前端使用的 places.json 和分片"""
+        places = compact_store(self.store)
+        return len(places)
+    
+    def maybe_compact(self, force=False):
+        """force 时总是合并，否则只在尚未合并的写入达到 COMPACT_THRESHOLD 时合并
         
-        print(f"\n✓ 数据已保存到: {json_file}")
-        print(f"✓ 当前共有 {len(data['places'])} 个地点")
+        Returns:
+            合并后的地点数，没有合并时为 None
+        """
+        pending = self.store.pending_count()
+        if force or pending >= COMPACT_THRESHOLD:
+            return self.compact()
+        if pending:
+            print(f"✓ 有 {pending} 条写入尚未合并到 places.json（达到 {COMPACT_THRESHOLD} 条时自动合并，"
+                  f"或运行 python extractor.py compact）")
+        return None
     
-    def process(self, url, manual_data=None):
-        """处理抖音视频链接
+    @traced("extract")
+    def extract(self, url, manual_data=None, video_info=None, on_partial=None):
+        """提取地点和美食信息
         
         Args:
             url: 抖音视频链接
             manual_data: 手动提供的数据（用于非交互模式下的备选方案）
-        """
-        print(f"\n{'='*60}")
-        print("抖音视频内容提取")
-        print(f"{'='*60}")
+            video_info: 已知的视频信息（标题、描述、封面），批量模式下由输入文件提供
+            on_partial: 模型流式输出过程中接收已完整的部分结果（例如 GeocodePrefetch.offer）
         
-        video_info = {"video_url": url, "title": "", "description": "", "cover_url": ""}
+        Returns:
+            (video_info, extracted) 元组
+        """
+        video_info = default_video_info(url, video_info)
         extracted = None
         
         # 1. 优先使用手动提供的数据（如果有的话）
         if manual_data and manual_data.get('place_name') and manual_data.get('city'):
             print("\n✓ 使用手动提供的数据")
-            extracted = manual_data
+            # 与模型回复按同一结构规范化（例如 tags 写成字符串时拆分为数组）
+            extracted = validate_place(manual_data)
             print(f"  地点: {extracted.get('place_name', '未知')}")
             print(f"  城市: {extracted.get('city', '未知')}")
             print(f"  美食数量: {len(extracted.get('foods', []))}")
         
-        # 2. 如果没有手动数据，尝试 Qwen VL 视频分析
-        if not extracted and self.qwen_key:
-            extracted = self._analyze_video_with_qwen(url, "", "")
+        # 2. 如果没有手动数据，按提取策略调度 Qwen VL 视频分析和文本分析
+        if not extracted:
+            extracted = self.strategy.run(self._extraction_candidates(url, video_info, on_partial))
             
-            if not extracted:
+            if not extracted and self.qwen_key:
                 print("\n⚠️  Qwen VL 分析失败，尝试其他方式...")
         
-        # 3. 如果 Qwen 失败，尝试其他 AI 方法（文本分析）
-        if not extracted and (self.deepseek_key or self.openai_key):
+        # 3. 交互模式下还没有标题/描述时，请用户输入后再做文本分析
+        if (not extracted and (self.deepseek_key or self.openai_key) and not self.non_interactive
+                and not (video_info['title'] or video_info['description'])):
             print("\n尝试文本分析方式...")
-            video_info = self._manual_input(url)
+            video_info = {**self._manual_input(url), **{
+                k: v for k, v in video_info.items() if v
+            }}
             if video_info.get('title') or video_info.get('description'):
                 extracted = self.extract_info_with_ai(video_info)
         
-        # 4. 如果还是没有数据，且是非交互模式，则失败
+        # 4. 如果还是没有数据，且是非交互模式，则失败（有服务商被限流时抛出 RateLimited，调用方可稍后重试）
         if not extracted:
             if self.non_interactive:
+                limited = [
+                    name for name, key in (("qwen", self.qwen_key), ("openai", self.openai_key),
+                                           ("deepseek", self.deepseek_key))
+                    if key and not self.limits.healthy(name)
+                ]
+                if limited:
+                    raise RateLimited(f"{'、'.join(limited)} 被限流或今日配额已用完，稍后重试")
                 raise ValueError("所有自动提取方法均失败，且未提供手动数据。请在运行 workflow 时填写地点名称和城市信息。")
             else:
                 # 交互模式：手动输入
                 video_info = self._manual_input(url)
                 extracted = self.extract_info_with_ai(video_info)
         
-        # 3. 获取坐标
-        location = self.get_coordinates(
-            extracted.get('address', ''),
-            extracted.get('city', '')
+        # 城市、省份统一为行政区划全称，缺少省份时按城市补全
+        return video_info, normalize_region(extracted)
+    
+    def _extraction_candidates(self, url, video_info, on_partial=None):
+        """按优先级列出可用的提取服务（被限流的服务排在健康的服务之后）"""
+        candidates = []
+        providers = {}  # 候选服务 -> 使用的服务商
+        # Qwen VL 和视觉分析共用同一组关键帧（视频只下载一次，都命中缓存时不下载）
+        keyframes = self._lazy_keyframes(video_info)
+        
+        if self.qwen_key:
+            candidates.append(Candidate(
+                "Qwen VL",
+                lambda timeout, cancel: self._analyze_video_with_qwen(
+                    url, video_info['title'], video_info['description'], timeout=timeout,
+                    play_url=video_info.get('play_url'), keyframes=keyframes, on_partial=on_partial,
+                    cancel=cancel,
+                ),
+                PROVIDER_DEADLINES["qwen"],
+            ))
+            providers["Qwen VL"] = ["qwen"]
+        
+        # 文本分析需要已知的标题/描述、封面或视频播放地址
+        has_text = (video_info['title'] or video_info['description'] or video_info['cover_url']
+                    or video_info.get('play_url'))
+        if has_text and (self.deepseek_key or self.openai_key):
+            candidates.append(Candidate(
+                "文本分析",
+                lambda timeout, cancel: self._analyze_text(
+                    video_info, timeout=timeout, keyframes=keyframes, on_partial=on_partial, cancel=cancel
+                ),
+                PROVIDER_DEADLINES["text"],
+            ))
+            providers["文本分析"] = [
+                name for name, key in (("openai", self.openai_key), ("deepseek", self.deepseek_key)) if key
+            ]
+        
+        ranked = sorted(
+            candidates,
+            key=lambda c: not any(self.limits.healthy(p) for p in providers[c.name])
         )
+        if ranked != candidates:
+            print(f"  ⚖️  {candidates[0].name} 当前被限流，优先使用 {ranked[0].name}")
+        return ranked
+    
+    def _lazy_keyframes(self, video_info):
+        """返回第一次调用时才抽取关键帧、之后复用结果的函数（线程安全）"""
+        lock = threading.Lock()
+        result = []
+        
+        def get():
+            with lock:
+                if not result:
+                    result.append(self.sample_keyframes(video_info))
+                return result[0]
+        return get
+    
+    @traced("keyframes", track_empty=False)
+    def sample_keyframes(self, video_info):
+        """下载视频并抽取关键帧（JPEG 字节列表），没有播放地址或失败时返回空列表"""
+        play_url = video_info.get('play_url')
+        if not play_url or not keyframes_available():
+            return []
+        
+        print("\n🎞️  正在下载视频并抽取关键帧...")
+        try:
+            with tempfile.TemporaryDirectory(prefix="keyframes-") as work_dir:
+                video_path = Path(work_dir) / "video"
+                with self._slot("video"):
+                    with self.http.get(play_url, headers=VIDEO_HEADERS, timeout=30, stream=True) as response:
+                        count_retries(self.metrics, "video", response)
+                        observe_response(self.limits, "video", response)
+                        response.raise_for_status()
+                        size, _ = stream_to_file(response, video_path, max_bytes=MAX_VIDEO_BYTES)
+                frames = sample_keyframes(video_path, work_dir)
+        except Exception as e:
+            print(f"  关键帧抽取失败: {e}")
+            return []
         
-        # 4. 下载封面
-        thumbnail = self.download_cover(video_info.get('cover_url'))
+        print(f"  ✓ 抽取 {len(frames)} 张关键帧 {frames_digest(frames)}"
+              f"（视频 {size // 1024}KB，关键帧共 {sum(map(len, frames)) // 1024}KB）")
+        return frames
+    
+    def locate(self, extracted, prefetch=None):
+        """获取提取结果的坐标
         
-        # 5. 组装数据
-        place_data = {
+        prefetch 为提取过程中使用的 GeocodePrefetch，已提前获取到坐标时直接使用；
+        提前请求失败时重新请求，仍无法解析时请求手动输入
+        """
+        address, city = extracted.get('address', ''), extracted.get('city', '')
+        location = prefetch.result(address, city) if prefetch else None
+        if location:
+            print(f"\n✓ 使用提前获取的坐标: ({location['lng']}, {location['lat']})")
+            return location
+        return self.get_coordinates(address, city)
+    
+    def find_existing(self, video_url, extracted=None):
+        """按 videoUrl 或 (名称, 城市) 查找已保存的地点"""
+        extracted = extracted or {}
+        return self.index.find(
+            video_url=video_url,
+            name=extracted.get('place_name'),
+            city=extracted.get('city'),
+        )
+    
+    def assemble_place(self, video_info, extracted, location, cover):
+        """组装地点数据
+        
+        如果已有相同视频或相同 (名称, 城市) 的地点，则沿用其 id 和添加时间（更新而非新增），
+        本次未获取到的字段保留原值。
+        """
+        place = {
             "id": str(uuid.uuid4()),
             "name": extracted.get('place_name', '未命名地点'),
             "address": extracted.get('address', ''),
@@ -546,29 +1428,920 @@ class DouyinExtractor:
             "province": extracted.get('province', ''),
             "location": location,
             "foods": extracted.get('foods', []),
-            "thumbnail": thumbnail,
+            "thumbnail": cover['thumbnail'] if cover else None,
+            "thumbnails": cover['thumbnails'] if cover else [],
             "videoUrl": video_info['video_url'],
+            "coverUrl": video_info.get('cover_url', ''),
+            "extraction": extraction_info(extracted),
             "addedDate": datetime.utcnow().isoformat() + 'Z'
         }
         
-        # 6. 保存到JSON
-        self.save_to_json(place_data)
+        existing = self.find_existing(video_info['video_url'], extracted)
+        if not existing:
+            return place
+        
+        print(f"✓ 更新已有地点: {existing.get('name')} ({existing.get('id')})")
+        merged = dict(existing)
+        for key, value in place.items():
+            if value or key not in merged:
+                merged[key] = value
+        merged["id"] = existing["id"]
+        merged["addedDate"] = existing.get("addedDate") or place["addedDate"]
+        merged["updatedDate"] = place["addedDate"]
+        return merged
+    
+    @traced("process")
+    def process(self, url, manual_data=None, video_info=None, save=True):
+        """处理抖音视频链接
+        
+        各阶段在调用线程中依次运行（交互模式下的手动输入必须在主线程）；
+        流式提取中地址和城市确定后立即在后台获取坐标，提取结束时通常已经拿到
+        
+        Args:
+            url: 抖音视频链接
+            manual_data: 手动提供的数据（用于非交互模式下的备选方案）
+            video_info: 已知的视频信息（标题、描述、封面）
+            save: 是否立即保存到JSON（批量模式下在最后统一保存）
+        
+        Returns:
+            组装好的地点数据
+        """
+        print(f"\n{'='*60}")
+        print("抖音视频内容提取")
+        print(f"{'='*60}")
+        
+        existing = self._skip_existing(url, manual_data)
+        if existing:
+            return existing
+        
+        # 流式提取时，地址和城市一确定就在后台获取坐标
+        prefetch = GeocodePrefetch(self) if self.amap_key and LLM_STREAMING else None
+        video_info, extracted = self.extract(
+            url, manual_data, video_info, on_partial=prefetch.offer if prefetch else None
+        )
+        location = self.locate(extracted, prefetch)
+        cover = self.download_cover(video_info.get('cover_url'))
+        place_data = self.assemble_place(video_info, extracted, location, cover)
+        
+        if save:
+            self.save_to_json(place_data)
         
         print(f"\n{'='*60}")
         print("✓ 提取完成!")
         print(f"{'='*60}\n")
+        
+        return place_data
+    
+    def _skip_existing(self, url, manual_data):
+        """该视频已保存过且没有新的手动数据时跳过（--refresh 强制重新处理）"""
+        if self.refresh or manual_data:
+            return None
+        existing = self.index.find(video_url=url)
+        if existing:
+            print(f"✓ 该视频已保存过，跳过: {existing.get('name')} ({existing.get('id')})")
+        return existing
+    
+    def process_batch(self, items, workers=8, queue=None, text_batch=TEXT_BATCH_SIZE):
+        """并发处理多个视频链接，所有结果在最后一次性保存
+        
+        每个链接完成一个阶段（提取、坐标、封面、保存）后都会记录到任务队列，
+        使用持久化队列时，中断后重新运行会从上次完成的阶段继续。
+        
+        Args:
+            items: load_batch_file 返回的任务列表
+            workers: 线程池大小（各服务商另有并发上限）
+            queue: JobQueue 实例，None 时使用仅在内存中的队列
+            text_batch: 大于1时，有标题/描述的链接先每 text_batch 条合并成一次文本提取请求，
+                未能提取的再逐条按提取策略处理
+        
+        Returns:
+            (成功的地点列表, 失败的 (url, 错误) 列表)
+        """
+        failures = []
+        queue = queue or JobQueue()
+        
+        # 0. 去掉重复链接和已保存过的视频
+        seen = set()
+        pending = []
+        for item in items:
+            if item['url'] in seen:
+                print(f"⚠️  重复链接，跳过: {item['url']}")
+                continue
+            seen.add(item['url'])
+            if self._skip_existing(item['url'], item.get('manual_data')):
+                # 上次运行在保存后、记录完成前中断的任务
+                queue.advance(item['url'], "saved")
+            else:
+                pending.append(item)
+        items = pending
+        if len(seen) > len(items):
+            print(f"✓ 跳过 {len(seen) - len(items)} 个已保存过的视频")
+        
+        queue.enqueue(items, reset=self.refresh)
+        jobs = queue.get([item['url'] for item in items])
+        resumed = sum(1 for job in jobs.values() if reached(job, "extracted"))
+        if resumed:
+            print(f"✓ 从任务队列恢复 {resumed} 个链接的已完成阶段")
+        
+        # 1. 并发提取地点和美食信息（可先合并文本提取请求）
+        to_extract = [item for item in items if not reached(jobs[item['url']], "extracted")]
+        if text_batch > 1 and to_extract:
+            batched = self.extract_text_batch(to_extract, size=text_batch, workers=workers)
+            for url, (video_info, extracted) in batched.items():
+                queue.advance(url, "extracted", video_info=video_info, extracted=extracted)
+                jobs[url].update(stage="extracted", video_info=video_info, extracted=extracted)
+            to_extract = [item for item in to_extract if item['url'] not in batched]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(
+                    self.extract,
+                    item['url'],
+                    manual_data=item.get('manual_data'),
+                    video_info=item.get('video_info'),
+                ): item['url']
+                for item in to_extract
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                url = futures[future]
+                try:
+                    video_info, extracted = future.result()
+                except Exception as e:
+                    failures.append((url, str(e)))
+                    queue.fail(url, e)
+                    print(f"[{done}/{len(to_extract)}] ❌ {url}: {e}")
+                    continue
+                queue.advance(url, "extracted", video_info=video_info, extracted=extracted)
+                jobs[url].update(stage="extracted", video_info=video_info, extracted=extracted)
+                print(f"[{done}/{len(to_extract)}] ✅ {url}")
+        
+        # 2. 批量获取坐标
+        to_geocode = [job for job in jobs.values()
+                      if reached(job, "extracted") and not reached(job, "geocoded")]
+        if to_geocode:
+            locations = self.get_coordinates_batch([
+                (job['extracted'].get('address', ''), job['extracted'].get('city', ''))
+                for job in to_geocode
+            ])
+            for job, location in zip(to_geocode, locations):
+                queue.advance(job['url'], "geocoded", location=location)
+                job.update(stage="geocoded", location=location)
+        
+        # 3. 并发下载封面（下载失败的任务停在坐标阶段，下次运行时重试）
+        to_cover = [job for job in jobs.values()
+                    if reached(job, "geocoded") and not reached(job, "cover")]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            covers = pool.map(
+                lambda job: self.download_cover(job['video_info'].get('cover_url')),
+                to_cover
+            )
+            for job, cover in zip(to_cover, covers):
+                if cover is None and job['video_info'].get('cover_url'):
+                    if job['attempts'] + 1 < COVER_MAX_ATTEMPTS:
+                        error = "封面下载失败，下次运行时重试"
+                        queue.fail(job['url'], error)
+                        failures.append((job['url'], error))
+                        continue
+                    print(f"⚠️  封面已连续 {COVER_MAX_ATTEMPTS} 次下载失败，先保存不带封面的地点"
+                          f"（可用 reenrich --only cover 修复）: {job['url']}")
+                queue.advance(job['url'], "cover", cover=cover)
+                job.update(stage="cover", cover=cover)
+        
+        # 4. 按输入顺序组装并一次性保存（已保存过的地点按 videoUrl 更新，重复保存不会产生新记录）
+        ready = [jobs[item['url']] for item in items if reached(jobs[item['url']], "cover")]
+        places = [
+            self.assemble_place(job['video_info'], job['extracted'], job['location'], job['cover'])
+            for job in ready
+        ]
+        if places:
+            self.save_many(places)
+        for job, place in zip(ready, places):
+            queue.advance(job['url'], "saved", place=place)
+        
+        return places, failures
+    
+    def reenrich(self, places, checks=REENRICH_CHECKS, workers=8):
+        """只为缺失或过期字段的地点重新运行对应阶段，并按 id 原地更新
+        
+        AI 提取和封面修复并发进行，AI 结果改变了城市/地址的地点随后重新获取坐标。
+        
+        Args:
+            places: 已保存的地点列表
+            checks: REENRICH_CHECKS 的子集
+            workers: 线程池大小（各服务商另有并发上限）
+        
+        Returns:
+            (更新的地点列表, 失败的 (地点名称, 错误) 列表, 因限流推迟的 (地点名称, 原因) 列表)
+        """
+        plans = []
+        for place in places:
+            stages = reenrich_stages(place, checks)
+            if stages:
+                plans.append((dict(place), stages))
+        if not plans:
+            return [], [], []
+        
+        failures = []
+        deferred = []  # 服务商被限流的地点保持原样，下次运行时重新检查
+        changed = set()  # 有字段被更新的地点序号
+        
+        # 1. 并发运行 AI 提取和封面修复（两者互不依赖）
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            ai_futures = {
+                pool.submit(
+                    self.extract,
+                    place['videoUrl'],
+                    video_info={"cover_url": place.get('coverUrl') or ""},
+                ): index
+                for index, (place, stages) in enumerate(plans) if "ai" in stages
+            }
+            cover_futures = {
+                pool.submit(self._repair_cover, place): index
+                for index, (place, stages) in enumerate(plans) if "cover" in stages
+            }
+            
+            for future in as_completed(ai_futures):
+                index = ai_futures[future]
+                place, stages = plans[index]
+                try:
+                    _, extracted = future.result()
+                except RateLimited as e:
+                    deferred.append((place.get('name'), str(e)))
+                    continue
+                except Exception as e:
+                    failures.append((place.get('name'), f"AI 提取失败: {e}"))
+                    continue
+                if patch_extracted(place, extracted, overwrite="outdated" in stages):
+                    stages.add("geocode")
+                changed.add(index)
+            
+            for future in as_completed(cover_futures):
+                index = cover_futures[future]
+                place, _ = plans[index]
+                try:
+                    cover = future.result()
+                except Exception as e:
+                    failures.append((place.get('name'), f"封面修复失败: {e}"))
+                    continue
+                if cover:
+                    place.update(cover)
+                    changed.add(index)
+                else:
+                    failures.append((place.get('name'), "封面修复失败"))
+        
+        # 2. 批量获取坐标（包括 AI 更新了城市/地址的地点）
+        geocode = [
+            index for index, (place, stages) in enumerate(plans)
+            if "geocode" in stages and (place.get('city') or place.get('address'))
+        ]
+        if geocode:
+            locations = self.get_coordinates_batch([
+                (plans[index][0].get('address', ''), plans[index][0].get('city', ''))
+                for index in geocode
+            ])
+            for index, location in zip(geocode, locations):
+                place, _ = plans[index]
+                if location:
+                    if location != place.get('location'):
+                        place['location'] = location
+                        changed.add(index)
+                else:
+                    failures.append((place.get('name'), "坐标获取失败"))
+        
+        # 3. 按 id 写回数据日志
+        now = datetime.utcnow().isoformat() + 'Z'
+        patched = []
+        for index in sorted(changed):
+            place, _ = plans[index]
+            place['updatedDate'] = now
+            patched.append(place)
+        if patched:
+            self.save_many(patched)
+        
+        return patched, failures, deferred
+    
+    def _repair_cover(self, place):
+        """修复封面：本地已有原图时直接生成缩略图，否则重新下载 coverUrl"""
+        original = local_image(place.get('thumbnail'))
+        if original and original.exists():
+            thumbnails = make_thumbnails(original, IMAGE_DIR, original.stem)
+            if not thumbnails:
+                return None
+            print(f"✓ 已为 {original.name} 生成 {len(thumbnails)} 张缩略图")
+            return {
+                "thumbnail": (pick_thumbnail(thumbnails) or thumbnails[0])['url'],
+                "thumbnails": thumbnails,
+            }
+        return self.download_cover(place.get('coverUrl'))
+
+
+class GeocodePrefetch:
+    """在模型流式输出过程中提前获取坐标
+    
+    部分结果中 address 和 city 都已完整时，立即把地理编码请求提交到后台，
+    与模型剩余的输出重叠；不同候选服务给出的每个地址只请求一次
+    """
+    
+    def __init__(self, extractor):
+        self.extractor = extractor
+        self._futures = {}
+        self._lock = threading.Lock()
+    
+    def offer(self, partial):
+        """接收流式解析出的部分结果"""
+        if not isinstance(partial, dict) or "address" not in partial or "city" not in partial:
+            return
+        place = normalize_region(validate_place(partial))
+        if not place['city'] or not place['address']:
+            # 只有城市时由 locate 直接使用城市中心坐标
+            return
+        key = geocode_key(place['address'], place['city'])
+        with self._lock:
+            if key in self._futures:
+                return
+            print(f"  📍 已识别地址，提前获取坐标: {place['city']} {place['address']}")
+            self._futures[key] = self.extractor._prefetch_pool.submit(
+                self.extractor._prefetch_location, place['address'], place['city']
+            )
+    
+    def result(self, address, city):
+        """等待该地址的提前请求完成并返回坐标（没有提前请求或未获取到时为 None）"""
+        with self._lock:
+            future = self._futures.get(geocode_key(address, city))
+        return future.result() if future else None
+
+
+def default_video_info(url, video_info=None):
+    """补全视频信息的默认字段"""
+    return {
+        "video_url": url,
+        "title": "",
+        "description": "",
+        "cover_url": "",
+        "play_url": "",
+        **(video_info or {}),
+    }
+
+
+def rejects_response_format(error):
+    """模型接口的错误是否表示不支持 response_format（400 且错误信息提到相关参数）"""
+    if getattr(error, "status_code", None) != 400:
+        return False
+    text = f"{error} {getattr(error, 'body', '') or ''}".lower()
+    return any(hint in text for hint in RESPONSE_FORMAT_ERROR_HINTS)
+
+
+def extraction_info(extracted):
+    """记录地点由哪个模型和提示词版本生成（手动数据为 manual）"""
+    return {
+        "model": extracted.get('model') or "manual",
+        "promptVersion": PROMPT_VERSION,
+    }
+
+
+def is_outdated(place):
+    """地点是否由旧版本的模型或提示词生成
+    
+    没有 extraction 记录的旧数据和手动数据无法判断，视为最新
+    """
+    extraction = place.get('extraction')
+    if not extraction or extraction.get('model') == "manual":
+        return False
+    return (extraction.get('promptVersion', 0) < PROMPT_VERSION
+            or extraction.get('model') not in EXTRACTION_MODELS.values())
+
+
+def local_image(url):
+    """/images/ 开头的图片地址对应的本地文件，其他地址返回 None"""
+    if not url or not url.startswith("/images/"):
+        return None
+    return IMAGE_DIR / url[len("/images/"):]
+
+
+def reenrich_stages(place, checks=REENRICH_CHECKS):
+    """地点需要重新运行的阶段集合（ai / geocode / cover），无需或无法修复时为空"""
+    stages = set()
+    
+    if place.get('videoUrl'):
+        if "foods" in checks and not place.get('foods'):
+            stages.add("ai")
+        if "outdated" in checks and is_outdated(place):
+            stages.add("ai")
+    
+    location = place.get('location')
+    if "location" in checks and not location:
+        # 没有城市和地址时需要先由 AI 补全，再获取坐标
+        if place.get('city') or place.get('address') or "ai" in stages:
+            stages.add("geocode")
+    elif "location" in checks and location.get('approximate') and place.get('address'):
+        # 城市中心的近似坐标：有具体地址时重新获取精确坐标
+        stages.add("geocode")
+    
+    if "cover" in checks:
+        thumbnail = place.get('thumbnail')
+        original = local_image(thumbnail)
+        missing = not thumbnail or (original is not None and not original.exists())
+        # 只有原图、没有缩略图的旧数据也重新生成缩略图
+        legacy = original is not None and original.exists() and not place.get('thumbnails')
+        if (missing and place.get('coverUrl')) or legacy:
+            stages.add("cover")
+    
+    return stages
+
+
+def patch_extracted(place, extracted, overwrite=False):
+    """用新的提取结果更新地点字段
+    
+    overwrite 为 False 时只补全空字段；为 True 时（旧版本生成的数据）用非空的新值覆盖。
+    
+    Returns:
+        城市或地址是否发生变化（需要重新获取坐标）
+    """
+    fields = {
+        "name": "place_name",
+        "address": "address",
+        "city": "city",
+        "province": "province",
+        "foods": "foods",
+    }
+    before = (place.get('city'), place.get('address'))
+    for field, key in fields.items():
+        value = extracted.get(key)
+        if value and (overwrite or not place.get(field)):
+            place[field] = value
+    place['extraction'] = extraction_info(extracted)
+    return (place.get('city'), place.get('address')) != before
+
+
+def geocode_key(address, city):
+    """坐标缓存键：规范化后的 (城市, 地址)"""
+    return make_key("amap", normalize_text(city), normalize_text(address))
+
+
+def parse_amap_location(location):
+    """解析高德返回的 "lng,lat" 字符串，无效时返回 None"""
+    if not location or not isinstance(location, str):
+        return None
+    try:
+        lng, lat = map(float, location.split(','))
+    except ValueError:
+        return None
+    return {"lng": lng, "lat": lat}
+
+
+def parse_foods(foods_json):
+    """解析美食JSON并按 FOOD_SCHEMA 规范化，格式错误时返回空列表"""
+    try:
+        foods = json.loads(foods_json)
+    except json.JSONDecodeError as e:
+        print(f"⚠️  警告: 美食JSON格式错误: {e}")
+        print(f"   使用空列表")
+        return []
+    if isinstance(foods, (dict, str)):
+        foods = [foods]
+    if not isinstance(foods, list):
+        print(f"⚠️  警告: 美食JSON应为数组，使用空列表")
+        return []
+    return [food for food in map(validate_food, foods) if food]
+
+
+def load_batch_file(path):
+    """读取批量任务文件
+    
+    每行一个任务，支持两种格式：
+      - 纯文本：一行一个抖音链接
+      - JSONL：{"url": "...", "title": "...", "description": "...", "cover_url": "...", "play_url": "...",
+                "place_name": "...", "city": "...", "province": "...", "address": "...", "foods": [...]}
+    空行和以 # 开头的行会被忽略。
+    """
+    items = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            
+            if not line.startswith('{'):
+                items.append({"url": line})
+                continue
+            
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"批量文件第 {line_no} 行JSON格式错误: {e}")
+            
+            try:
+                items.append(parse_batch_record(record))
+            except ValueError as e:
+                raise ValueError(f"批量文件第 {line_no} 行{e}")
+    
+    return items
+
+
+def parse_batch_record(record):
+    """把一条 JSON 任务（批量文件的一行或 serve 接口的请求）转换为 process_batch 的任务格式"""
+    url = record.get('url') or record.get('video_url')
+    if not url:
+        raise ValueError("缺少 url 字段")
+    
+    item = {"url": url}
+    
+    video_info = {
+        key: record[key]
+        for key in ('title', 'description', 'cover_url', 'play_url')
+        if record.get(key)
+    }
+    if video_info:
+        item['video_info'] = video_info
+    
+    if record.get('place_name') or record.get('city'):
+        foods = record.get('foods') or []
+        if isinstance(foods, str):
+            foods = parse_foods(foods)
+        item['manual_data'] = {
+            'place_name': record.get('place_name', ''),
+            'city': record.get('city', ''),
+            'province': record.get('province', ''),
+            'address': record.get('address', ''),
+            'foods': foods,
+        }
+    
+    return item
+
+
+def add_compact_arguments(parser, when):
+    """--compact / --no-compact（默认只在尚未合并的写入达到 COMPACT_THRESHOLD 时合并）"""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--compact', action='store_true',
+                       help=f'{when}总是合并生成 places.json、分片和搜索索引')
+    group.add_argument('--no-compact', action='store_true',
+                       help=f'{when}不合并，即使尚未合并的写入达到 COMPACT_THRESHOLD（默认 {COMPACT_THRESHOLD}）')
+
+
+def cmd_compact(argv):
+    """compact 子命令：合并数据日志到 places.json"""
+    parser = argparse.ArgumentParser(
+        prog='extractor.py compact',
+        description='合并 data/places.journal.jsonl 中的新增地点，生成前端使用的 data/places.json、'
+                    'data/manifest.json 和 data/shards/'
+    )
+    parser.parse_args(argv)
+    
+    store = open_store(DATA_DIR / "places.json", PLACE_STORE)
+    try:
+        compact_store(store)
+    finally:
+        store.close()
+
+
+def compact_store(store):
+    """合并数据日志，并生成前端按视野加载的分片和 manifest.json"""
+    places = store.compact()
+    manifest = build_shards(places, DATA_DIR)
+    build_search_index(places, DATA_DIR)
+    print(f"✓ 数据已保存到: {store.json_path}")
+    print(f"✓ 当前共有 {len(places)} 个地点，{len(manifest['shards'])} 个分片")
+    return places
+
+
+def cmd_export(argv):
+    """export 子命令：流式校验地点并导出部署使用的数据文件"""
+    parser = argparse.ArgumentParser(
+        prog='extractor.py export',
+        description='逐条读取并校验地点，写出部署使用的紧凑格式 places.json、分片、manifest.json 和搜索索引；'
+                    '有不合法的记录时不写出文件并返回非零（前端构建时优先复制导出结果）'
+    )
+    parser.add_argument('--input', type=Path,
+                        help='读取指定的 places.json（默认从地点存储读取，包含尚未合并的数据日志）')
+    parser.add_argument('--out-dir', type=Path, default=EXPORT_DIR,
+                        help=f'输出目录（默认 {EXPORT_DIR}）')
+    parser.add_argument('--check', action='store_true', help='只校验，不写出文件')
+    args = parser.parse_args(argv)
+    
+    store = None if args.input else open_store(DATA_DIR / "places.json", PLACE_STORE)
+    places = iter_places(args.input) if args.input else store.iter_places()
+    start = time.perf_counter()
+    try:
+        if args.check:
+            total, invalid, errors = check_places(places)
+            if invalid:
+                raise PlaceRecordError(invalid, errors)
+        else:
+            stats = export_site(places, args.out_dir)
+    except PlaceRecordError as e:
+        for position, place_id, problems in e.errors:
+            print(f"❌ 第 {position} 条记录（{place_id or '无 id'}）: {'；'.join(problems)}")
+        if e.invalid > len(e.errors):
+            print(f"❌ 另有 {e.invalid - len(e.errors)} 条不合法的记录未显示")
+        print(f"❌ {e}，{'校验未通过' if args.check else '未写出任何文件'}")
+        sys.exit(1)
+    except PlaceFormatError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        if store is not None:
+            store.close()
+    elapsed = time.perf_counter() - start
+    
+    if args.check:
+        print(f"✓ 共 {total} 个地点，全部合法（{elapsed:.1f} 秒）")
+        return
+    print(f"✓ 已导出 {stats['places']} 个地点（{stats['shards']} 个分片）到 {args.out_dir}"
+          f"（{stats['bytes'] / 1024:.1f} KB，{elapsed:.1f} 秒）")
+
+
+def cmd_search(argv):
+    """search 子命令：使用搜索索引查找地点"""
+    parser = argparse.ArgumentParser(
+        prog='extractor.py search',
+        description='按地点名称、城市、地址、美食名称或标签搜索已保存的地点'
+    )
+    parser.add_argument('query', help='搜索关键词')
+    parser.add_argument('--limit', type=int, default=20, help='最多显示的结果数（默认 20）')
+    parser.add_argument('--city', help='只显示该城市的地点')
+    parser.add_argument('--province', help='只显示该省份的地点')
+    args = parser.parse_args(argv)
+    
+    store = open_store(DATA_DIR / "places.json", PLACE_STORE)
+    index_path = DATA_DIR / "search-index.json"
+    try:
+        pending = store.has_pending() or not index_path.exists()
+        if pending:
+            # 有未合并的新数据或索引不存在时，先合并并重建索引
+            places = compact_store(store)
+        if args.city or args.province:
+            # 只读取符合条件的地点（SQLite 存储使用索引查询）
+            places = store.query(city=args.city, province=args.province)
+        elif not pending:
+            places = store.load()
+    finally:
+        store.close()
+    with open(index_path, 'r', encoding='utf-8') as f:
+        index = SearchIndex(json.load(f))
+    
+    start = time.perf_counter()
+    ids = index.search(args.query)
+    if ids is None:
+        # 查询中没有可索引的字符（如只有标点），退回到子串匹配
+        query = normalize_text(args.query)
+        ids = [p.get("id") for p in places
+               if query and query in normalize_text(place_text(p))]
+    elapsed = (time.perf_counter() - start) * 1000
+    
+    by_id = {p.get("id"): p for p in places}
+    ids = [place_id for place_id in ids if place_id in by_id]
+    print(f"🔍 找到 {len(ids)} 个地点（{elapsed:.1f} ms）")
+    for place_id in ids[:args.limit]:
+        place = by_id[place_id]
+        foods = "、".join(f.get("name", "") for f in place.get("foods") or [])
+        print(f"  - {place.get('name')}（{place.get('city') or '未知城市'}）{place.get('address') or ''}")
+        if foods:
+            print(f"    美食: {foods}")
+    if len(ids) > args.limit:
+        print(f"  ……还有 {len(ids) - args.limit} 个结果，使用 --limit 显示更多")
+
+
+def cmd_reenrich(argv):
+    """reenrich 子命令：只修复缺失或过期字段的地点"""
+    parser = argparse.ArgumentParser(
+        prog='extractor.py reenrich',
+        description='扫描已保存的地点，只为缺少坐标、缩略图、美食或由旧版本模型/提示词生成的地点'
+                    '重新运行对应阶段（AI 提取、坐标、封面），并原地更新记录'
+    )
+    parser.add_argument(
+        '--only',
+        choices=REENRICH_CHECKS,
+        action='append',
+        help='只检查指定项目（可重复），默认检查全部：' + ', '.join(REENRICH_CHECKS)
+    )
+    parser.add_argument('--workers', type=int, default=8, help='并发数（默认8）')
+    parser.add_argument('--limit', type=int, help='最多修复的地点数')
+    parser.add_argument('--dry-run', action='store_true', help='只列出需要修复的地点，不做修改')
+    parser.add_argument('--refresh', action='store_true', help='忽略已缓存的模型结果和坐标')
+    parser.add_argument('--profile', action='store_true', help='结束时打印各阶段耗时汇总表')
+    add_compact_arguments(parser, '修复后')
+    args = parser.parse_args(argv)
+    checks = tuple(args.only or REENRICH_CHECKS)
+    
+    store = open_store(DATA_DIR / "places.json", PLACE_STORE)
+    try:
+        places = store.load()
+    finally:
+        store.close()
+    targets = [(place, reenrich_stages(place, checks)) for place in places]
+    targets = [(place, stages) for place, stages in targets if stages]
+    if args.limit is not None:
+        targets = targets[:args.limit]
+    
+    counts = {stage: sum(stage in stages for _, stages in targets) for stage in ("ai", "geocode", "cover")}
+    print(f"共 {len(places)} 个地点，需要修复 {len(targets)} 个"
+          f"（AI 提取 {counts['ai']}，坐标 {counts['geocode']}，封面 {counts['cover']}）")
+    if args.dry_run:
+        for place, stages in targets:
+            print(f"  - {place.get('name')}（{place.get('city') or '未知城市'}）: {', '.join(sorted(stages))}")
+        return
+    if not targets:
+        return
+    
+    metrics = Metrics()
+    extractor = DouyinExtractor(non_interactive=True, refresh_cache=args.refresh, metrics=metrics)
+    try:
+        patched, failures, deferred = extractor.reenrich(
+            [place for place, _ in targets], checks, workers=args.workers
+        )
+        if patched and not args.no_compact:
+            extractor.maybe_compact(force=args.compact)
+    finally:
+        extractor.close()
+    
+    print(f"\n✓ 已更新 {len(patched)} 个地点")
+    for name, error in failures:
+        print(f"  ❌ {name}: {error}")
+    if deferred:
+        print(f"⚠️  {len(deferred)} 个地点因服务商限流推迟，稍后重新运行 reenrich 即可继续:")
+        for name, reason in deferred:
+            print(f"  - {name}: {reason}")
+    if args.profile:
+        print(metrics.summary())
+
+
+def cmd_jobs(argv):
+    """jobs 子命令：查看、继续或清理批量任务队列"""
+    parser = argparse.ArgumentParser(
+        prog='extractor.py jobs',
+        description='批量任务队列（data/.cache/jobs.sqlite）：记录每个链接完成到了哪个阶段，'
+                    '中断后可从上次完成的阶段继续'
+    )
+    parser.add_argument(
+        'action',
+        choices=('status', 'resume', 'clear'),
+        help='status 查看各阶段任务数和失败原因；resume 继续处理所有未完成的任务；clear 删除已完成的任务'
+    )
+    parser.add_argument('--workers', type=int, default=8, help='resume 时的并发数（默认8）')
+    parser.add_argument('--all', action='store_true', help='clear 时同时删除未完成的任务')
+    add_compact_arguments(parser, 'resume 后')
+    args = parser.parse_args(argv)
+    
+    queue = JobQueue(JOBS_DB)
+    try:
+        if args.action == 'status':
+            counts = queue.counts()
+            print("任务队列: " + ", ".join(f"{stage} {counts.get(stage, 0)}" for stage in STAGES))
+            for url, stage, attempts, error in queue.failures():
+                print(f"  ❌ {url}（停在 {stage}，已尝试 {attempts} 次）: {error}")
+        elif args.action == 'clear':
+            print(f"✓ 已删除 {queue.clear(finished_only=not args.all)} 个任务")
+        else:
+            jobs = queue.unfinished()
+            if not jobs:
+                print("✓ 没有未完成的任务")
+                return
+            print(f"继续处理 {len(jobs)} 个未完成的任务，并发数 {args.workers}")
+            extractor = DouyinExtractor(non_interactive=True)
+            try:
+                places, failures = extractor.process_batch(
+                    [job['item'] for job in jobs], workers=args.workers, queue=queue
+                )
+                if places and not args.no_compact:
+                    extractor.maybe_compact(force=args.compact)
+            finally:
+                extractor.close()
+            print(f"\n✓ 完成 {len(places)} 个，失败 {len(failures)} 个")
+            for url, error in failures:
+                print(f"  ❌ {url}: {error}")
+            if failures:
+                sys.exit(1)
+    finally:
+        queue.close()
+
+
+def cmd_serve(argv):
+    """serve 子命令：常驻的本地提取服务"""
+    from server import BATCH_WINDOW, ExtractionService, make_server
+    
+    parser = argparse.ArgumentParser(
+        prog='extractor.py serve',
+        description='启动本地 HTTP 服务：POST /jobs 提交链接（同批量 JSONL 的字段），'
+                    'GET /jobs/<id> 查询进度，GET /jobs 列出所有任务'
+    )
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址（默认 127.0.0.1）')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口（默认 8765）')
+    parser.add_argument('--workers', type=int, default=8, help='每批的并发数（默认8）')
+    parser.add_argument(
+        '--batch-window',
+        type=float,
+        default=BATCH_WINDOW,
+        help=f'收到链接后等待多少秒再合并处理（默认 {BATCH_WINDOW}）'
+    )
+    parser.add_argument('--strategy', choices=STRATEGIES, default=EXTRACTION_STRATEGY, help='模型调度策略')
+    add_compact_arguments(parser, '每批完成后')
+    args = parser.parse_args(argv)
+    
+    extractor = DouyinExtractor(non_interactive=True, strategy=args.strategy)
+    extractor.warm_up()
+    queue = JobQueue(JOBS_DB)
+    service = ExtractionService(
+        extractor,
+        queue,
+        parse_item=parse_batch_record,
+        after_batch=None if args.no_compact else lambda: extractor.maybe_compact(force=args.compact),
+        workers=args.workers,
+        batch_window=args.batch_window,
+    )
+    server = make_server(service, args.host, args.port)
+    service.start()
+    print(f"✓ 提取服务已启动: http://{args.host}:{args.port}")
+    print(f'  提交: curl -X POST http://{args.host}:{args.port}/jobs -d \'{{"url": "抖音视频链接"}}\'')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n正在停止服务...")
+    finally:
+        server.server_close()
+        service.stop()
+        queue.close()
+        extractor.close()
+
+
+# 子命令：python extractor.py <command> [参数]
+COMMANDS = {
+    "compact": cmd_compact,
+    "export": cmd_export,
+    "search": cmd_search,
+    "reenrich": cmd_reenrich,
+    "jobs": cmd_jobs,
+    "serve": cmd_serve,
+}
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+    
     parser = argparse.ArgumentParser(
         description='从抖音视频链接提取地点和美食信息'
     )
-    parser.add_argument(
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
         '--url',
         type=str,
-        required=True,
         help='抖音视频链接'
     )
+    source.add_argument(
+        '--batch',
+        type=str,
+        metavar='FILE',
+        help='批量任务文件（每行一个链接，或JSONL格式），在同一进程中并发处理'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=8,
+        help='批量模式下的并发数（默认8）'
+    )
+    parser.add_argument(
+        '--text-batch',
+        type=int,
+        default=TEXT_BATCH_SIZE,
+        metavar='N',
+        help=f'批量模式下把 N 条视频的标题和描述合并成一次文本提取请求（默认 {TEXT_BATCH_SIZE}，1 表示不合并）'
+    )
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='不读写本地模型结果缓存'
+    )
+    cache_group.add_argument(
+        '--refresh',
+        action='store_true',
+        help='忽略已缓存的模型结果，重新调用并更新缓存'
+    )
+    parser.add_argument(
+        '--strategy',
+        choices=STRATEGIES,
+        default=EXTRACTION_STRATEGY,
+        help='模型调度策略：sequential 依次尝试（默认）、hedge 主服务慢时并行启动备选、'
+             'race 同时启动取最快、merge 同时启动并合并结果'
+    )
+    parser.add_argument(
+        '--metrics',
+        type=str,
+        metavar='FILE',
+        help='将各阶段耗时、token 用量等事件以JSONL格式追加到文件'
+    )
+    parser.add_argument(
+        '--prom-file',
+        type=str,
+        metavar='FILE',
+        help='结束时将指标写入 Prometheus 文本格式文件'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='结束时打印各阶段耗时汇总表'
+    )
+    add_compact_arguments(parser, '运行结束时')
     parser.add_argument(
         '--non-interactive',
         action='store_true',
@@ -601,6 +2374,11 @@ def main():
         type=str,
         help='美食列表JSON（非交互模式下的备选输入），格式：[{"name":"火锅","description":"麻辣","tags":["辣"]}]'
     )
+    parser.add_argument(
+        '--play-url',
+        type=str,
+        help='视频文件的直接播放地址（mp4），提供时下载视频抽取关键帧交给视觉模型分析（需要 ffmpeg）'
+    )
     
     args = parser.parse_args()
     
@@ -617,15 +2395,46 @@ def main():
         
         # 解析美食JSON
         if args.foods:
-            try:
-                manual_data['foods'] = json.loads(args.foods)
-            except json.JSONDecodeError as e:
-                print(f"⚠️  警告: 美食JSON格式错误: {e}")
-                print(f"   使用空列表")
+            manual_data['foods'] = parse_foods(args.foods)
     
+    metrics = Metrics(args.metrics)
+    try:
+        if args.batch:
+            run_batch(args, metrics)
+        else:
+            run_single(args, manual_data, metrics)
+    finally:
+        report_metrics(args, metrics)
+
+
+def report_metrics(args, metrics):
+    """输出 --prom-file / --profile 指标"""
+    if args.prom_file:
+        metrics.write_prometheus(args.prom_file)
+        print(f"✓ 指标已写入: {args.prom_file}")
+    if args.profile:
+        print(f"\n{'='*60}")
+        print("性能汇总")
+        print(f"{'='*60}")
+        print(metrics.summary())
+    metrics.close()
+
+
+def run_single(args, manual_data, metrics):
+    """单个链接入口"""
+    extractor = None
     try:
-        extractor = DouyinExtractor(non_interactive=args.non_interactive)
-        extractor.process(args.url, manual_data=manual_data)
+        extractor = DouyinExtractor(
+            non_interactive=args.non_interactive,
+            use_cache=not args.no_cache,
+            refresh_cache=args.refresh,
+            strategy=args.strategy,
+            metrics=metrics,
+        )
+        video_info = {"play_url": args.play_url} if args.play_url else None
+        extractor.process(args.url, manual_data=manual_data, video_info=video_info)
+        if not args.no_compact:
+            extractor.maybe_compact(force=args.compact)
     except ValueError as e:
         print(f"\n❌ {e}")
         print("\n💡 提示：")
@@ -645,6 +2454,54 @@ def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        if extractor is not None:
+            extractor.close()
+
+
+def run_batch(args, metrics):
+    """批量模式入口（始终以非交互方式运行）"""
+    try:
+        items = load_batch_file(args.batch)
+    except (OSError, ValueError) as e:
+        print(f"\n❌ 读取批量文件失败: {e}")
+        sys.exit(1)
+    
+    if not items:
+        print("⚠️  批量文件中没有任何链接")
+        return
+    
+    print(f"共 {len(items)} 个链接，并发数 {args.workers}")
+    
+    extractor = DouyinExtractor(
+        non_interactive=True,
+        use_cache=not args.no_cache,
+        refresh_cache=args.refresh,
+        strategy=args.strategy,
+        metrics=metrics,
+    )
+    queue = JobQueue(JOBS_DB)
+    try:
+        places, failures = extractor.process_batch(
+            items, workers=args.workers, queue=queue, text_batch=args.text_batch
+        )
+        if not args.no_compact:
+            extractor.maybe_compact(force=args.compact)
+    finally:
+        queue.close()
+        extractor.close()
+    
+    print(f"\n{'='*60}")
+    print("批量处理完成！")
+    print(f"{'='*60}")
+    print(f"总计: {len(items)}")
+    print(f"成功: {len(places)}")
+    print(f"失败: {len(failures)}")
+    for url, error in failures:
+        print(f"  ❌ {url}: {error}")
+    
+    if failures:
+        sys.exit(1)
 
 
 if __name__ == '__main__':
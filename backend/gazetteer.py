@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线行政区划表
+内置全国省级和地级行政区划（gazetteer.tsv：全称、简称、别名和行政中心坐标），用于：
+  - 把模型返回的城市/省份统一为全称（"成都" → "成都市"，"四川" → "四川省"），缺少省份时按城市补全
+  - 只知道城市、没有配置高德或高德无法解析时，用城市中心坐标作为近似位置（不访问网络）
+名称和别名放在逐字前缀树中，从文本开头连续匹配最长的名称（"四川成都武侯区" → 四川省、成都市）。
+表只有几百行，第一次使用时加载（几毫秒），之后每次查询都在微秒级
+"""
+
+import threading
+from pathlib import Path
+
+GAZETTEER_PATH = Path(__file__).with_name("gazetteer.tsv")
+
+# 参与匹配的名称最短长度（不使用"川""沪"这类单字简称，避免误匹配）
+MIN_KEY_LENGTH = 2
+
+# 文本开头可以忽略的前缀和名称之间的分隔符
+IGNORED_PREFIXES = ("中华人民共和国", "中国")
+SEPARATORS = set(" \t,，、·-/")
+
+# 简称后面紧跟这些字时不视为行政区划（例如"朝阳区""北京路""南京西路"）
+NAME_BREAKERS = set("区县镇乡街路道村巷里西东南北中")
+
+_END = ""  # 前缀树中标记名称结束的键
+
+
+class Gazetteer:
+    """行政区划表
+
+    Args:
+        path: TSV 文件（列：级别、全称、简称、所属省份、经度、纬度、别名）
+    """
+
+    def __init__(self, path=GAZETTEER_PATH):
+        self.regions = []
+        self._trie = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                level, name, short, province, lng, lat, aliases = line.rstrip("\n").split("\t")
+                region = {
+                    "level": level,
+                    "name": name,
+                    "province": province,
+                    "lng": float(lng),
+                    "lat": float(lat),
+                }
+                self.regions.append(region)
+                self._insert(name, region, full=True)
+                for key in {short, *aliases.split(",")} - {name}:
+                    if len(key) >= MIN_KEY_LENGTH:
+                        self._insert(key, region, full=False)
+
+    def _insert(self, key, region, full):
+        node = self._trie
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node.setdefault(_END, []).append((region, full))
+
+    def match(self, text, start=0):
+        """从 text[start] 开始匹配最长的名称
+
+        Returns:
+            (结束位置, 区划列表)，没有匹配时为 (start, [])
+        """
+        node = self._trie
+        best = (start, [])
+        for i in range(start, len(text)):
+            node = node.get(text[i])
+            if node is None:
+                break
+            if _END in node:
+                following = text[i + 1] if i + 1 < len(text) else ""
+                regions = [region for region, full in node[_END]
+                           if full or following not in NAME_BREAKERS]
+                if regions:
+                    best = (i + 1, regions)
+        return best
+
+    def scan(self, text):
+        """从文本开头连续匹配行政区划名称，遇到无法识别的内容时停止
+
+        Returns:
+            每段名称匹配到的区划列表（同名的省份和城市会同时出现，例如吉林）
+        """
+        text = (text or "").strip()
+        for prefix in IGNORED_PREFIXES:
+            if text.startswith(prefix):
+                text = text[len(prefix):]
+                break
+        groups = []
+        pos = 0
+        while pos < len(text):
+            while pos < len(text) and text[pos] in SEPARATORS:
+                pos += 1
+            end, regions = self.match(text, pos)
+            if not regions:
+                break
+            groups.append(regions)
+            pos = end
+        return groups
+
+    def resolve(self, city="", province="", address=""):
+        """识别城市和省份
+
+        省份从 province 字段识别（也接受写在 city 开头的省份）；城市从 city 字段识别，
+        city 中没有可识别的城市时再看 address 开头。同名时优先选择所属省份一致的城市。
+
+        Returns:
+            (城市区划, 省份区划)，无法识别的为 None
+        """
+        province_region = None
+        for text in (province, city):
+            for group in self.scan(text):
+                province_region = _pick(group, "province")
+                if province_region:
+                    break
+            if province_region:
+                break
+
+        context = province_region["name"] if province_region else None
+        city_region = None
+        for text in (city, address):
+            for group in self.scan(text):
+                city_region = _pick(group, "city", context)
+                if city_region:
+                    break
+            if city_region:
+                break
+        return city_region, province_region
+
+    def normalize(self, city="", province="", address=""):
+        """统一城市和省份的写法，返回 (城市, 省份)
+
+        识别出城市时省份以城市所属省份为准（模型给出的省份与城市矛盾时通常是省份错了）；
+        无法识别的字段保持原样
+        """
+        city_region, province_region = self.resolve(city, province, address)
+        if city_region:
+            return city_region["name"], city_region["province"]
+        if province_region:
+            return city, province_region["name"]
+        return city, province
+
+    def centroid(self, city="", province="", address=""):
+        """城市（无法识别城市时为省会）的中心坐标，都无法识别时返回 None"""
+        city_region, province_region = self.resolve(city, province, address)
+        region = city_region or province_region
+        if region is None:
+            return None
+        return {"lng": region["lng"], "lat": region["lat"], "approximate": True}
+
+
+def _pick(regions, level, province=None):
+    """从同名区划中选出指定级别的一个（优先选择属于 province 的）"""
+    candidates = [region for region in regions if region["level"] == level]
+    for region in candidates:
+        if province and region["province"] == province:
+            return region
+    return candidates[0] if candidates else None
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def gazetteer():
+    """内置行政区划表（第一次调用时加载）"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Gazetteer()
+        return _default
+
+
+def normalize_region(extracted):
+    """返回城市、省份统一为全称后的提取结果（不修改原字典）"""
+    city, province = gazetteer().normalize(
+        extracted.get("city", ""), extracted.get("province", ""), extracted.get("address", "")
+    )
+    if city == extracted.get("city", "") and province == extracted.get("province", ""):
+        return extracted
+    return {**extracted, "city": city, "province": province}
+
+
+def approximate_location(address, city, province=""):
+    """城市中心的近似坐标（带 approximate 标记），无法识别城市和省份时返回 None"""
+    return gazetteer().centroid(city, province, address)
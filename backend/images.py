@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+封面图片处理
+分块流式下载（限制最大字节数），只解码一次并生成多种宽度的 WebP 缩略图（可选再生成一张 AVIF）。
+缩略图编码占用 CPU 和内存，同时编码的封面数单独限制，不随下载并发数增长。
+文件按内容哈希命名，同一张图片重复下载时直接复用已有缩略图。
+"""
+
+import hashlib
+import os
+import re
+import threading
+from pathlib import Path
+
+# 单张封面最大字节数（默认 10MB）
+MAX_COVER_BYTES = int(os.getenv("COVER_MAX_BYTES", str(10 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+
+# 缩略图宽度：列表/地图标记、详情页、高分屏详情页
+THUMBNAIL_WIDTHS = (160, 480, 960)
+# place.thumbnail 默认使用的宽度
+DEFAULT_THUMBNAIL_WIDTH = 480
+
+# AVIF 编码比 WebP 慢数倍，默认不生成；THUMBNAIL_AVIF=1 时只额外生成 DEFAULT_THUMBNAIL_WIDTH 一种宽度
+THUMBNAIL_AVIF = os.getenv("THUMBNAIL_AVIF", "0") == "1"
+
+# 同时解码/编码的封面数（默认等于 CPU 核数）
+THUMBNAIL_CONCURRENCY = int(os.getenv("THUMBNAIL_CONCURRENCY", str(os.cpu_count() or 1)))
+_encode_slots = threading.BoundedSemaphore(max(1, THUMBNAIL_CONCURRENCY))
+
+# 编码参数
+SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "avif": {"format": "AVIF", "quality": 60},
+}
+
+CONTENT_TYPE_EXTENSIONS = {
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/avif": ".avif",
+}
+
+
+class CoverTooLarge(ValueError):
+    """封面超过大小限制"""
+
+
+_pillow_modules = None
+
+
+def _pillow():
+    """首次处理图片时才导入 Pillow，未安装时返回 (None, None)"""
+    global _pillow_modules
+    if _pillow_modules is None:
+        try:
+            from PIL import Image, ImageOps
+        except ImportError:
+            Image = ImageOps = None
+        else:
+            try:
+                import pillow_avif  # noqa: F401  可选插件，为旧版 Pillow 注册 AVIF 编码器
+            except ImportError:
+                pass
+        _pillow_modules = (Image, ImageOps)
+    return _pillow_modules
+
+
+def thumbnail_formats():
+    """当前环境可用的缩略图格式"""
+    Image, _ = _pillow()
+    if Image is None:
+        return []
+    Image.init()
+    formats = ["webp"] if "WEBP" in Image.SAVE else []
+    if THUMBNAIL_AVIF and "AVIF" in Image.SAVE:
+        formats.append("avif")
+    return formats
+
+
+def guess_extension(content_type):
+    """根据 Content-Type 推断原图扩展名"""
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    return CONTENT_TYPE_EXTENSIONS.get(content_type, ".jpg")
+
+
+def stream_to_file(response, path, max_bytes=MAX_COVER_BYTES):
+    """将 stream=True 的响应分块写入文件，超过 max_bytes 时中止
+
+    Returns:
+        (写入的字节数, 内容的 sha256 十六进制摘要)
+    """
+    declared = response.headers.get("Content-Length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise CoverTooLarge(f"文件过大: {int(declared)} 字节 (上限 {max_bytes})")
+
+    size = 0
+    digest = hashlib.sha256()
+    try:
+        with open(path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise CoverTooLarge(f"文件超过 {max_bytes} 字节上限")
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        Path(path).unlink(missing_ok=True)
+        raise
+    return size, digest.hexdigest()
+
+
+def content_stem(digest):
+    """内容哈希文件名（取 sha256 前16位）"""
+    return digest[:16]
+
+
+def find_thumbnails(out_dir, stem, url_prefix="/images"):
+    """查找已为该内容哈希生成过的缩略图，没有时返回空列表"""
+    Image, _ = _pillow()
+    pattern = re.compile(rf"^{re.escape(stem)}-(\d+)\.(\w+)$")
+    thumbnails = []
+    for path in Path(out_dir).glob(f"{stem}-*"):
+        match = pattern.match(path.name)
+        if not match or match.group(2) not in SAVE_OPTIONS:
+            continue
+        width = int(match.group(1))
+        height = None
+        if Image is not None:
+            try:
+                # 只读取文件头获取尺寸
+                with Image.open(path) as img:
+                    width, height = img.size
+            except OSError:
+                continue
+        thumbnails.append({
+            "url": f"{url_prefix}/{path.name}",
+            "width": width,
+            "height": height,
+            "format": match.group(2),
+        })
+    return sorted(thumbnails, key=lambda t: (t["width"], t["format"] != "webp"))
+
+
+def find_original(out_dir, stem):
+    """查找以内容哈希命名、未能生成缩略图的原图"""
+    for ext in set(CONTENT_TYPE_EXTENSIONS.values()) | {".jpg"}:
+        path = Path(out_dir) / f"{stem}{ext}"
+        if path.exists():
+            return path
+    return None
+
+
+def make_thumbnails(src_path, out_dir, stem, url_prefix="/images"):
+    """解码一次原图，按 THUMBNAIL_WIDTHS 生成 WebP 缩略图（启用 AVIF 时另外生成一张默认宽度的 AVIF）
+
+    不放大图片：比原图宽的尺寸会被跳过（至少保留一张原宽度的缩略图）。
+    同时处理的封面数不超过 THUMBNAIL_CONCURRENCY，超出时等待。
+
+    Returns:
+        缩略图列表 [{"url", "width", "height", "format"}]，无法解码时返回空列表
+    """
+    formats = thumbnail_formats()
+    if not formats:
+        return []
+    Image, ImageOps = _pillow()
+
+    try:
+        with _encode_slots, Image.open(src_path) as img:
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+
+            widths = [w for w in THUMBNAIL_WIDTHS if w < img.width] or [img.width]
+            if img.width < THUMBNAIL_WIDTHS[-1] and img.width not in widths:
+                widths.append(img.width)
+            # AVIF 只用于默认宽度（原图更窄时用不小于它的最小宽度）
+            avif_width = next((w for w in widths if w >= DEFAULT_THUMBNAIL_WIDTH), widths[-1])
+
+            thumbnails = []
+            for width in widths:
+                height = max(1, round(img.height * width / img.width))
+                resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+                for fmt in formats:
+                    if fmt == "avif" and width != avif_width:
+                        continue
+                    filename = f"{stem}-{width}.{fmt}"
+                    resized.save(Path(out_dir) / filename, **SAVE_OPTIONS[fmt])
+                    thumbnails.append({
+                        "url": f"{url_prefix}/{filename}",
+                        "width": width,
+                        "height": height,
+                        "format": fmt,
+                    })
+            return thumbnails
+    except (OSError, ValueError) as e:
+        print(f"  ⚠️  封面解码失败，保留原图: {e}")
+        return []
+
+
+def pick_thumbnail(thumbnails, width=DEFAULT_THUMBNAIL_WIDTH, fmt="webp"):
+    """选出不小于目标宽度的最小缩略图（没有则取最大的一张）"""
+    candidates = sorted(
+        (t for t in thumbnails if t["format"] == fmt),
+        key=lambda t: t["width"]
+    )
+    if not candidates:
+        return None
+    for thumbnail in candidates:
+        if thumbnail["width"] >= width:
+            return thumbnail
+    return candidates[-1]
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务队列
+基于 SQLite 记录批量任务中每个链接完成到了哪个阶段（提取、坐标、封面、保存）
+以及各阶段的中间结果，进程中断后重新运行时从上次完成的阶段继续，
+不再重复付费的模型调用和封面下载
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# 阶段按顺序推进：pending -> extracted -> geocoded -> cover -> saved
+STAGES = ("pending", "extracted", "geocoded", "cover", "saved")
+
+# 各阶段保存的中间结果字段
+RESULT_FIELDS = ("video_info", "extracted", "location", "cover", "place")
+
+
+def reached(job, stage):
+    """任务是否已完成某个阶段"""
+    return STAGES.index(job["stage"]) >= STAGES.index(stage)
+
+
+class JobQueue:
+    """SQLite 任务队列
+
+    Args:
+        path: 数据库文件路径，None 表示只保存在内存中（不可恢复）
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            if self.path is None:
+                target = ":memory:"
+            else:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                target = str(self.path)
+            self._conn = sqlite3.connect(target, timeout=30, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    url TEXT PRIMARY KEY,
+                    item TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    video_info TEXT,
+                    extracted TEXT,
+                    location TEXT,
+                    cover TEXT,
+                    place TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_stage ON jobs (stage)")
+            self._conn.commit()
+        return self._conn
+
+    def enqueue(self, items, reset=False):
+        """加入任务（load_batch_file 返回的格式）
+
+        未完成的链接保留已完成的阶段，只清除上次的错误；已保存过的链接再次加入时
+        重新开始（调用方已过滤掉不需要重新处理的链接）；reset 为 True 时全部从头开始
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            for item in items:
+                payload = json.dumps(item, ensure_ascii=False)
+                if reset:
+                    conn.execute("DELETE FROM jobs WHERE url = ?", (item["url"],))
+                conn.execute(
+                    "INSERT INTO jobs (url, item, stage, created_at, updated_at) VALUES (?, ?, 'pending', ?, ?) "
+                    "ON CONFLICT(url) DO UPDATE SET item = excluded.item, error = NULL, updated_at = excluded.updated_at, "
+                    "stage = CASE WHEN stage = 'saved' THEN 'pending' ELSE stage END",
+                    (item["url"], payload, now, now)
+                )
+            conn.commit()
+
+    def _row_to_job(self, row):
+        job = {"url": row["url"], "item": json.loads(row["item"]), "stage": row["stage"],
+               "attempts": row["attempts"], "error": row["error"]}
+        for field in RESULT_FIELDS:
+            job[field] = json.loads(row[field]) if row[field] is not None else None
+        return job
+
+    def get(self, urls):
+        """按链接读取任务，返回 {url: job}"""
+        jobs = {}
+        with self._lock:
+            conn = self._connect()
+            for url in urls:
+                row = conn.execute("SELECT * FROM jobs WHERE url = ?", (url,)).fetchone()
+                if row is not None:
+                    jobs[url] = self._row_to_job(row)
+        return jobs
+
+    def unfinished(self):
+        """所有尚未保存的任务（按加入顺序）"""
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE stage != 'saved' ORDER BY created_at, rowid"
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def advance(self, url, stage, **results):
+        """记录某个链接完成了一个阶段及其结果"""
+        assignments = ["stage = ?", "error = NULL", "updated_at = ?"]
+        values = [stage, time.time()]
+        for field, value in results.items():
+            if field not in RESULT_FIELDS:
+                raise ValueError(f"未知的任务字段: {field}")
+            assignments.append(f"{field} = ?")
+            values.append(json.dumps(value, ensure_ascii=False))
+        with self._lock:
+            conn = self._connect()
+            conn.execute(f"UPDATE jobs SET {', '.join(assignments)} WHERE url = ?", (*values, url))
+            conn.commit()
+
+    def fail(self, url, error):
+        """记录失败（阶段不变，下次运行时重试）"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "UPDATE jobs SET attempts = attempts + 1, error = ?, updated_at = ? WHERE url = ?",
+                (str(error), time.time(), url)
+            )
+            conn.commit()
+
+    def counts(self):
+        """各阶段的任务数，以及带有错误的任务数"""
+        with self._lock:
+            conn = self._connect()
+            counts = {stage: count for stage, count in
+                      conn.execute("SELECT stage, COUNT(*) FROM jobs GROUP BY stage")}
+            counts["failed"] = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE error IS NOT NULL"
+            ).fetchone()[0]
+        return counts
+
+    def failures(self):
+        """[(url, stage, attempts, error)]"""
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT url, stage, attempts, error FROM jobs WHERE error IS NOT NULL ORDER BY updated_at"
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def clear(self, finished_only=True):
+        """删除已保存的任务（finished_only 为 False 时删除全部），返回删除数量"""
+        with self._lock:
+            conn = self._connect()
+            if finished_only:
+                cursor = conn.execute("DELETE FROM jobs WHERE stage = 'saved'")
+            else:
+                cursor = conn.execute("DELETE FROM jobs")
+            conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
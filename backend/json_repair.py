@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+容错 JSON 解析
+逐字符单遍扫描模型回复，同时修复常见的格式问题：
+  - 忽略 JSON 前后的说明文字和 ```json 代码块标记
+  - 多余/缺少的逗号、缺少的冒号、单引号字符串、未加引号的键和值、True/False/None
+  - 字符串中的换行和控制字符
+  - 回复被截断时，只保留已经完整的键值对并补全括号
+可以在流式输出过程中不断 feed，随时用 value() 取得目前已完整的部分
+"""
+
+import json
+
+# 未加引号的单词对应的 JSON 字面量
+LITERALS = {
+    "true": "true", "false": "false", "null": "null",
+    "True": "true", "False": "false", "None": "null",
+}
+
+NUMBER_CHARS = set("0123456789+-.eE")
+ESCAPES = set('"\\/bfnrtu')
+CLOSERS = {"{": "}", "[": "]"}
+
+
+class JsonRepairParser:
+    """增量容错 JSON 解析器
+
+    Args:
+        roots: 可以作为根的容器类型（"{"、"[" 或两者），根之前的字符会被忽略
+    """
+
+    def __init__(self, roots="{["):
+        self.roots = roots
+        self.repairs = 0  # 修复的格式问题数量（不含忽略的前后说明文字）
+        self._out = []  # 修复后的输出片段
+        self._stack = []  # 未闭合的容器：[类型, 状态]
+        self._safe = (0, ())  # 最近一个完整位置：(输出片段数, 当时未闭合的容器类型)
+        self._token = None  # 正在读取的 token
+        self._pending_comma = False
+        self._started = False
+        self._done = False
+
+    @property
+    def started(self):
+        """是否已遇到根容器"""
+        return self._started
+
+    @property
+    def done(self):
+        """根容器是否已闭合"""
+        return self._done
+
+    @property
+    def completed(self):
+        """已完整部分的长度，只有它变化时 value() 的结果才会变化"""
+        return self._safe[0]
+
+    def feed(self, text):
+        for ch in text:
+            if self._done:
+                break
+            self._feed_char(ch)
+        return self
+
+    def finish(self):
+        """输入结束：结束末尾的数字或单词"""
+        if self._token is not None and self._token["kind"] != "string":
+            self._end_token()
+        return self
+
+    def value(self):
+        """目前已完整的部分（补全括号后解析）
+
+        Raises:
+            ValueError: 还没有遇到 JSON 根容器
+        """
+        if not self._started:
+            raise ValueError("回复中没有 JSON 内容")
+        length, open_types = self._safe
+        text = "".join(self._out[:length]) + "".join(CLOSERS[t] for t in reversed(open_types))
+        return json.loads(text)
+
+    # ---- 内部实现 ----
+
+    def _emit(self, text):
+        self._out.append(text)
+
+    def _mark_safe(self):
+        self._safe = (len(self._out), tuple(t for t, _ in self._stack))
+
+    def _feed_char(self, ch):
+        token = self._token
+        if token is not None:
+            if token["kind"] == "string":
+                self._string_char(token, ch)
+                return
+            if self._continues(token, ch):
+                token["chars"].append(ch)
+                return
+            self._end_token()
+
+        if not self._started:
+            if ch in self.roots:
+                self._started = True
+                self._open(ch)
+            return
+
+        if ch.isspace():
+            return
+        if ch in "{[":
+            self._open(ch)
+        elif ch in "}]":
+            self._close(ch)
+        elif ch == ",":
+            self._comma()
+        elif ch == ":":
+            self._colon()
+        elif ch in "\"'":
+            is_key = self._prepare_slot()
+            self._token = {"kind": "string", "quote": ch, "key": is_key, "escape": False}
+            self._emit('"')
+            if ch == "'":
+                self.repairs += 1  # 单引号字符串
+        elif ch in NUMBER_CHARS:
+            self._token = {"kind": "number", "chars": [ch], "key": self._prepare_slot()}
+        elif ch.isalpha() or ch == "_":
+            self._token = {"kind": "word", "chars": [ch], "key": self._prepare_slot()}
+        else:
+            self.repairs += 1  # 无法识别的字符
+
+    @staticmethod
+    def _continues(token, ch):
+        if token["kind"] == "number":
+            return ch in NUMBER_CHARS
+        return ch.isalnum() or ch in "_-"
+
+    def _prepare_slot(self):
+        """新的键或值开始前补上缺少的逗号/冒号，返回它是否是对象的键"""
+        top = self._stack[-1]
+        if top[0] == "{":
+            if top[1] == "colon":
+                self._emit(":")
+                self.repairs += 1
+                top[1] = "value"
+            if top[1] == "value":
+                return False
+            if top[1] == "next":
+                self.repairs += 1  # 两个键值对之间缺少逗号
+            if top[1] == "next" or self._pending_comma:
+                self._emit(",")
+            self._pending_comma = False
+            top[1] = "key"
+            return True
+        if top[1] == "next":
+            self.repairs += 1
+        if top[1] == "next" or self._pending_comma:
+            self._emit(",")
+        self._pending_comma = False
+        top[1] = "value"
+        return False
+
+    def _value_done(self):
+        if not self._stack:
+            self._done = True
+            self._safe = (len(self._out), ())
+            return
+        self._stack[-1][1] = "next"
+        self._mark_safe()
+
+    def _key_done(self):
+        self._stack[-1][1] = "colon"
+
+    def _open(self, ch):
+        if self._stack:
+            if self._prepare_slot():
+                # 容器不能作为键：视为缺少键的值
+                self._emit('"":')
+                self.repairs += 1
+        self._emit(ch)
+        self._stack.append([ch, "key" if ch == "{" else "value"])
+        self._mark_safe()
+
+    def _close(self, ch):
+        if not any(t == ("{" if ch == "}" else "[") for t, _ in self._stack):
+            self.repairs += 1  # 多余的右括号
+            return
+        while self._stack:
+            kind, state = self._stack[-1]
+            if kind == "{" and state in ("colon", "value"):
+                # 有键没有值
+                self._emit(":null" if state == "colon" else "null")
+                self.repairs += 1
+            if self._pending_comma:
+                self.repairs += 1  # 末尾多余的逗号
+                self._pending_comma = False
+            self._emit(CLOSERS[kind])
+            self._stack.pop()
+            self._value_done()
+            if CLOSERS[kind] == ch:
+                break
+            self.repairs += 1  # 括号不匹配，补上内层的右括号
+
+    def _comma(self):
+        top = self._stack[-1]
+        if top[1] == "next":
+            self._pending_comma = True
+            top[1] = "key" if top[0] == "{" else "value"
+        else:
+            self.repairs += 1  # 多余的逗号
+
+    def _colon(self):
+        top = self._stack[-1]
+        if top[0] == "{" and top[1] == "colon":
+            self._emit(":")
+            top[1] = "value"
+        else:
+            self.repairs += 1
+
+    def _string_char(self, token, ch):
+        if token["escape"]:
+            token["escape"] = False
+            if ch in ESCAPES:
+                self._emit("\\" + ch)
+            else:
+                # 无效的转义（如 \'）：保留字符本身
+                self._emit(json.dumps(ch)[1:-1])
+                self.repairs += 1
+        elif ch == "\\":
+            token["escape"] = True
+        elif ch == token["quote"]:
+            self._emit('"')
+            self._token = None
+            if token["key"]:
+                self._key_done()
+            else:
+                self._value_done()
+        elif ch == '"':
+            self._emit('\\"')  # 单引号字符串中的双引号
+        elif ch < " ":
+            self._emit(json.dumps(ch)[1:-1])
+            if ch != "\t":
+                self.repairs += 1
+        else:
+            self._emit(ch)
+
+    def _end_token(self):
+        token, self._token = self._token, None
+        text = "".join(token["chars"])
+        if token["kind"] == "number":
+            try:
+                json.loads(text)
+                rendered = text
+            except json.JSONDecodeError:
+                try:
+                    rendered = json.dumps(float(text))
+                except ValueError:
+                    rendered = json.dumps(text)
+                self.repairs += 1
+            if token["key"] and not rendered.startswith('"'):
+                rendered = json.dumps(text)
+        elif not token["key"] and text in LITERALS:
+            rendered = LITERALS[text]
+            if rendered != text:
+                self.repairs += 1
+        else:
+            rendered = json.dumps(text, ensure_ascii=False)  # 未加引号的键或值
+            self.repairs += 1
+        self._emit(rendered)
+        if token["key"]:
+            self._key_done()
+        else:
+            self._value_done()
+
+
+def parse_json_reply(text, roots="{["):
+    """解析完整的模型回复，返回 (JSON 值, 修复的问题数量)
+
+    Raises:
+        ValueError: 回复中没有 JSON 内容
+    """
+    parser = JsonRepairParser(roots).feed(text).finish()
+    return parser.value(), parser.repairs
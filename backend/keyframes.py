@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+视频关键帧抽取
+视频只下载一次，用 ffmpeg 按场景变化选出候选帧（没有场景变化时每隔几秒取一帧）。
+默认只解码视频的关键帧（I 帧，编码器会在镜头切换处插入），比逐帧解码快几十倍；
+候选帧太少时（例如整段只有一个 GOP）再逐帧解码。
+候选帧用 Pillow 缩小并去掉几乎相同的画面，最多保留 MAX_KEYFRAMES 张 JPEG，
+作为多图输入发送给视觉模型，代替直接把抖音链接交给模型
+"""
+
+import base64
+import hashlib
+import io
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+from images import _pillow
+
+# 每个视频最多发送给模型的关键帧数
+MAX_KEYFRAMES = int(os.getenv("KEYFRAME_MAX_FRAMES", "8"))
+
+# ffmpeg 最多输出的候选帧数（去重后再均匀挑选 MAX_KEYFRAMES 张）
+MAX_CANDIDATES = MAX_KEYFRAMES * 4
+
+# 只解码 I 帧得到的候选帧少于该数量时，改为逐帧解码
+MIN_CANDIDATES = 3
+
+# 关键帧缩放后的最长边（像素）和 JPEG 质量
+KEYFRAME_MAX_SIZE = 768
+KEYFRAME_QUALITY = 75
+
+# 场景变化阈值（0~1，越小越敏感）；没有场景变化时至少每隔 KEYFRAME_INTERVAL 秒取一帧，
+# 两个场景变化帧之间至少间隔 KEYFRAME_MIN_GAP 秒（避免快速剪辑时集中在同一段）
+SCENE_THRESHOLD = 0.3
+KEYFRAME_INTERVAL = 5.0
+KEYFRAME_MIN_GAP = 1.0
+
+# 只分析视频的前 MAX_VIDEO_SECONDS 秒；视频文件大小上限（默认 200MB）
+MAX_VIDEO_SECONDS = 180
+MAX_VIDEO_BYTES = int(os.getenv("VIDEO_MAX_BYTES", str(200 * 1024 * 1024)))
+FFMPEG_TIMEOUT = 120
+
+# 两帧的平均哈希（8x8）汉明距离不超过该值时视为重复画面
+DUPLICATE_DISTANCE = 6
+
+
+def ffmpeg_path():
+    """ffmpeg 可执行文件（可通过 FFMPEG_BIN 指定），未安装时返回 None"""
+    return os.getenv("FFMPEG_BIN") or shutil.which("ffmpeg")
+
+
+def keyframes_available():
+    """当前环境是否可以抽取关键帧（需要 ffmpeg 和 Pillow）"""
+    Image, _ = _pillow()
+    return Image is not None and ffmpeg_path() is not None
+
+
+def select_filter():
+    """ffmpeg select 过滤器：第一帧、场景变化帧、以及距上一帧超过 KEYFRAME_INTERVAL 秒的帧"""
+    since_last = "t-prev_selected_t"
+    return (
+        f"select='isnan(prev_selected_t)"
+        f"+gte({since_last},{KEYFRAME_INTERVAL})"
+        f"+gt(scene,{SCENE_THRESHOLD})*gte({since_last},{KEYFRAME_MIN_GAP})'"
+    )
+
+
+def _run_ffmpeg(ffmpeg, video_path, out_dir, keyframes_only):
+    for old in out_dir.glob("frame-*.jpg"):
+        old.unlink()
+    skip = ["-skip_frame", "nokey"] if keyframes_only else []
+    result = subprocess.run(
+        [
+            ffmpeg, "-hide_banner", "-loglevel", "error", "-nostdin",
+            *skip, "-t", str(MAX_VIDEO_SECONDS), "-i", str(video_path),
+            "-vf", select_filter(), "-vsync", "vfr",
+            "-frames:v", str(MAX_CANDIDATES), "-q:v", "3",
+            str(out_dir / "frame-%03d.jpg"),
+        ],
+        capture_output=True, text=True, timeout=FFMPEG_TIMEOUT,
+    )
+    frames = sorted(out_dir.glob("frame-*.jpg"))
+    if result.returncode != 0 and not frames:
+        raise RuntimeError(f"ffmpeg 执行失败: {result.stderr.strip()[-200:]}")
+    return frames
+
+
+def extract_candidates(video_path, out_dir):
+    """用 ffmpeg 输出候选帧，返回按时间排序的文件列表
+
+    Raises:
+        RuntimeError: ffmpeg 不可用或执行失败
+    """
+    ffmpeg = ffmpeg_path()
+    if not ffmpeg:
+        raise RuntimeError("未安装 ffmpeg")
+    out_dir = Path(out_dir)
+    frames = _run_ffmpeg(ffmpeg, video_path, out_dir, keyframes_only=True)
+    if len(frames) < MIN_CANDIDATES:
+        frames = _run_ffmpeg(ffmpeg, video_path, out_dir, keyframes_only=False)
+    return frames
+
+
+def average_hash(img):
+    """8x8 灰度平均哈希，用于判断两帧是否几乎相同"""
+    small = img.convert("L").resize((8, 8))
+    pixels = list(small.getdata())
+    mean = sum(pixels) / len(pixels)
+    return sum(1 << i for i, value in enumerate(pixels) if value > mean)
+
+
+def pick_evenly(items, count):
+    """从列表中均匀挑选 count 个元素（保留首尾）"""
+    if len(items) <= count:
+        return list(items)
+    if count == 1:
+        return [items[0]]
+    step = (len(items) - 1) / (count - 1)
+    return [items[round(i * step)] for i in range(count)]
+
+
+def sample_keyframes(video_path, work_dir, max_frames=MAX_KEYFRAMES):
+    """抽取关键帧
+
+    Args:
+        video_path: 已下载的视频文件
+        work_dir: 存放候选帧的临时目录
+        max_frames: 最多返回的帧数
+
+    Returns:
+        按时间排序的 JPEG 字节列表
+    """
+    Image, ImageOps = _pillow()
+    if Image is None:
+        raise RuntimeError("未安装 Pillow")
+
+    kept = []  # (平均哈希, JPEG 字节)
+    for path in extract_candidates(video_path, work_dir):
+        with Image.open(path) as img:
+            img = ImageOps.exif_transpose(img).convert("RGB")
+            img.thumbnail((KEYFRAME_MAX_SIZE, KEYFRAME_MAX_SIZE))
+            frame_hash = average_hash(img)
+            if kept and bin(frame_hash ^ kept[-1][0]).count("1") <= DUPLICATE_DISTANCE:
+                continue
+            buffer = io.BytesIO()
+            img.save(buffer, format="JPEG", quality=KEYFRAME_QUALITY, optimize=True)
+        kept.append((frame_hash, buffer.getvalue()))
+    return [frame for _, frame in pick_evenly(kept, max_frames)]
+
+
+def data_url(frame):
+    """JPEG 字节转换为模型接口接受的 data URL"""
+    return "data:image/jpeg;base64," + base64.b64encode(frame).decode("ascii")
+
+
+def image_parts(frames):
+    """OpenAI 兼容接口的多图消息内容"""
+    return [{"type": "image_url", "image_url": {"url": data_url(frame)}} for frame in frames]
+
+
+def frames_digest(frames):
+    """关键帧内容的摘要（用于日志和调试）"""
+    digest = hashlib.sha256()
+    for frame in frames:
+        digest.update(hashlib.sha256(frame).digest())
+    return digest.hexdigest()[:16]
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行指标
+记录提取流程各阶段的耗时、重试次数、模型 token 用量和缓存命中情况，
+可输出为 JSONL 事件流、Prometheus 文本格式，或在结束时打印汇总表
+"""
+
+import functools
+import json
+import math
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+
+# 汇总表各列：(标题, 宽度)，宽度按终端显示宽度计算（中文占两列）
+SUMMARY_COLUMNS = (
+    ("阶段", 18), ("次数", 8), ("空/失败", 10), ("总耗时(s)", 12), ("p50(s)", 10), ("p99(s)", 10),
+)
+
+
+def display_width(text):
+    """终端显示宽度（全角和宽字符占两列）"""
+    return sum(2 if unicodedata.east_asian_width(ch) in "WF" else 1 for ch in text)
+
+
+def _pad(text, width, left=False):
+    padding = " " * max(0, width - display_width(text))
+    return text + padding if left else padding + text
+
+
+def _table_row(cells):
+    """按 SUMMARY_COLUMNS 的宽度排列一行（第一列左对齐，其余右对齐）"""
+    return "".join(
+        _pad(cell, width, left=i == 0) for i, (cell, (_, width)) in enumerate(zip(cells, SUMMARY_COLUMNS))
+    )
+
+
+def percentile(values, pct):
+    """最近秩法百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in sorted(labels.items())
+    )
+    return "{" + body + "}"
+
+
+class Metrics:
+    """线程安全的指标收集器
+
+    Args:
+        jsonl_path: 事件输出文件（每个阶段/用量事件一行），None 表示不输出
+    """
+
+    def __init__(self, jsonl_path=None):
+        self.jsonl_path = jsonl_path
+        self._lock = threading.Lock()
+        self._durations = {}  # stage -> [秒]
+        self._status = {}  # (stage, status) -> 次数
+        self._counters = {}  # (name, labels) -> 数值
+        self._file = open(jsonl_path, "a", encoding="utf-8") if jsonl_path else None
+
+    def _emit(self, event):
+        if self._file is None:
+            return
+        event = {"ts": round(time.time(), 3), **event}
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        """记录一个阶段的耗时
+
+        在 with 块内可通过返回的 dict 设置 status（默认 ok，异常时为 error）和附加属性
+        """
+        info = {"status": "ok"}
+        start = time.perf_counter()
+        try:
+            yield info
+        except BaseException:
+            info["status"] = "error"
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            status = info.pop("status")
+            with self._lock:
+                self._durations.setdefault(stage, []).append(duration)
+                key = (stage, status)
+                self._status[key] = self._status.get(key, 0) + 1
+                self._emit({
+                    "type": "span",
+                    "stage": stage,
+                    "status": status,
+                    "duration_ms": round(duration * 1000, 2),
+                    **attrs,
+                    **info,
+                })
+
+    def count(self, name, value=1, **labels):
+        """累加计数器"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def record_usage(self, provider, model, usage):
+        """记录 OpenAI 兼容接口返回的 response.usage"""
+        if usage is None:
+            return
+        tokens = {
+            "prompt": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion": getattr(usage, "completion_tokens", 0) or 0,
+        }
+        for kind, value in tokens.items():
+            self.count("tokens_total", value, provider=provider, model=model, kind=kind)
+        with self._lock:
+            self._emit({"type": "usage", "provider": provider, "model": model, **tokens})
+
+    def counter_totals(self, name):
+        """某个计数器按标签汇总后的值"""
+        with self._lock:
+            return {dict(labels).get("provider") or dict(labels).get("cache") or "": value
+                    for (counter, labels), value in self._counters.items() if counter == name}
+
+    def to_prometheus(self):
+        """Prometheus 文本格式（可用于 node_exporter textfile collector）"""
+        lines = []
+        with self._lock:
+            lines.append("# TYPE extractor_stage_duration_seconds summary")
+            for stage, values in sorted(self._durations.items()):
+                labels = {"stage": stage}
+                for quantile in (0.5, 0.99):
+                    value = percentile(values, quantile * 100)
+                    lines.append(
+                        f"extractor_stage_duration_seconds{_labels({**labels, 'quantile': quantile})} {value:.6f}"
+                    )
+                lines.append(f"extractor_stage_duration_seconds_sum{_labels(labels)} {sum(values):.6f}")
+                lines.append(f"extractor_stage_duration_seconds_count{_labels(labels)} {len(values)}")
+
+            lines.append("# TYPE extractor_stage_total counter")
+            for (stage, status), value in sorted(self._status.items()):
+                lines.append(f"extractor_stage_total{_labels({'stage': stage, 'status': status})} {value}")
+
+            names = sorted({name for name, _ in self._counters})
+            for name in names:
+                lines.append(f"# TYPE extractor_{name} counter")
+                for (counter, labels), value in sorted(self._counters.items()):
+                    if counter == name:
+                        lines.append(f"extractor_{name}{_labels(dict(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+
+    def stage_stats(self):
+        """各阶段的调用次数、空/失败次数、总耗时和 p50/p99（秒），按总耗时降序"""
+        stats = {}
+        with self._lock:
+            for stage, values in sorted(self._durations.items(), key=lambda item: -sum(item[1])):
+                stats[stage] = {
+                    "calls": len(values),
+                    "errors": sum(v for (s, status), v in self._status.items()
+                                  if s == stage and status != "ok"),
+                    "total": sum(values),
+                    "p50": percentile(values, 50),
+                    "p99": percentile(values, 99),
+                }
+        return stats
+
+    def summary(self):
+        """各阶段耗时汇总表"""
+        lines = [
+            _table_row([title for title, _ in SUMMARY_COLUMNS]),
+            "-" * sum(width for _, width in SUMMARY_COLUMNS),
+        ]
+        for stage, row in self.stage_stats().items():
+            lines.append(_table_row([
+                stage, str(row['calls']), str(row['errors']),
+                f"{row['total']:.2f}", f"{row['p50']:.2f}", f"{row['p99']:.2f}",
+            ]))
+
+        tokens = {}
+        retries = self.counter_totals("http_retries_total")
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                if name == "tokens_total":
+                    provider = dict(labels)["provider"]
+                    tokens[provider] = tokens.get(provider, 0) + value
+        if tokens:
+            lines.append("")
+            lines.append("Token 用量: " + ", ".join(f"{p} {v}" for p, v in sorted(tokens.items())))
+        if any(retries.values()):
+            lines.append("重试次数: " + ", ".join(f"{p} {v}" for p, v in sorted(retries.items())))
+
+        hits = self.counter_totals("cache_hits_total")
+        misses = self.counter_totals("cache_misses_total")
+        caches = sorted(set(hits) | set(misses))
+        if caches:
+            lines.append("缓存命中: " + ", ".join(
+                f"{name} {hits.get(name, 0)}/{hits.get(name, 0) + misses.get(name, 0)}" for name in caches
+            ))
+        return "\n".join(lines)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def traced(stage, track_empty=True):
+    """方法装饰器：用 self.metrics 记录该方法的耗时
+
+    track_empty 为 True 时，返回 None（未获取到结果）记为 empty
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.span(stage) as span:
+                result = fn(self, *args, **kwargs)
+                if track_empty and result is None:
+                    span["status"] = "empty"
+                return result
+        return wrapper
+    return decorator
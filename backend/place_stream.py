@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+places.json 流式读写
+逐条读取 {"places": [...]} 中的地点（每次只解析一条记录，不把整个文件读入内存），
+逐条校验并以紧凑格式写出（部署数据的导出见 site_export.py）。
+读写过程中的内存占用只取决于单条记录和缓冲区大小，与地点数量无关
+"""
+
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+
+# 每次从文件读取的字符数 / 写出前累积的字节数
+READ_CHUNK_SIZE = 1 << 16
+WRITE_BUFFER_SIZE = 1 << 16
+
+# 校验失败时最多报告的记录数
+MAX_REPORTED_ERRORS = 20
+
+PLACES_KEY = "places"
+
+# 地点记录中字符串类型的字段（必填的不能为空）
+REQUIRED_TEXT_FIELDS = ("id", "name")
+OPTIONAL_TEXT_FIELDS = ("address", "city", "province", "videoUrl", "coverUrl", "addedDate")
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class PlaceFormatError(ValueError):
+    """文件不是 {"places": [...]} 格式的 JSON"""
+
+
+class PlaceRecordError(ValueError):
+    """有地点记录不符合前端使用的结构
+
+    Attributes:
+        invalid: 不合法的记录数
+        errors: [(序号, id, 问题列表)]，最多 MAX_REPORTED_ERRORS 条
+    """
+
+    def __init__(self, invalid, errors):
+        super().__init__(f"{invalid} 条地点记录不合法")
+        self.invalid = invalid
+        self.errors = errors
+
+
+class _Reader:
+    """在按块读取的文本上逐个解析 JSON 值"""
+
+    def __init__(self, f, chunk_size=READ_CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.offset = 0  # buffer[0] 在文件中的位置（用于错误信息）
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """丢弃已解析的内容并读入下一块，文件结束时返回 False"""
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.offset += self.pos
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _error(self, message):
+        return PlaceFormatError(f"{message}（位置 {self.offset + self.pos}）")
+
+    def peek(self):
+        """跳过空白，返回下一个字符（文件结束时为空字符串）"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise self._error(f"期望 {char!r}，实际为 {found or '文件结尾'!r}")
+        self.pos += 1
+
+    def value(self):
+        """解析下一个完整的 JSON 值（不完整时继续读入）"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if self._fill():
+                    continue
+                raise self._error(f"JSON 格式错误: {e.msg}") from None
+            # 值恰好在缓冲区末尾结束时（例如数字）可能还没有读完
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def array(self):
+        """逐个产出数组中的元素"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("]")
+            return
+
+
+def read_places(f, chunk_size=READ_CHUNK_SIZE):
+    """从文本文件对象中逐条读取地点
+
+    接受 {"places": [...]}（其他顶层字段被跳过）或直接的地点数组
+
+    Raises:
+        PlaceFormatError: 文件格式不正确（已产出的记录仍然有效）
+    """
+    reader = _Reader(f, chunk_size)
+    if reader.peek() == "[":
+        yield from reader.array()
+        return
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise reader._error("对象的键必须是字符串")
+        reader.expect(":")
+        if key == PLACES_KEY:
+            yield from reader.array()
+        else:
+            reader.value()
+        if reader.peek() == ",":
+            reader.pos += 1
+            continue
+        reader.expect("}")
+        return
+
+
+def iter_places(path, chunk_size=READ_CHUNK_SIZE):
+    """逐条读取 places.json 中的地点（文件不存在时不产出任何记录）"""
+    path = Path(path)
+    if not path.exists():
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        yield from read_places(f, chunk_size)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def place_problems(place):
+    """检查一条地点记录，返回问题列表（没有问题时为空）
+
+    只检查前端依赖的字段：id 和名称必填，foods 必须是带名称的对象数组，
+    location 为空或包含合法范围内的经纬度，其余已知字段类型正确
+    """
+    if not isinstance(place, dict):
+        return [f"记录不是对象（{type(place).__name__}）"]
+    problems = []
+    for field in REQUIRED_TEXT_FIELDS:
+        if not isinstance(place.get(field), str) or not place[field].strip():
+            problems.append(f"{field} 缺失或为空")
+    for field in OPTIONAL_TEXT_FIELDS:
+        if place.get(field) is not None and not isinstance(place[field], str):
+            problems.append(f"{field} 不是字符串")
+
+    foods = place.get("foods")
+    if not isinstance(foods, list):
+        problems.append("foods 不是数组")
+    else:
+        for i, food in enumerate(foods):
+            if not isinstance(food, dict) or not isinstance(food.get("name"), str) or not food["name"]:
+                problems.append(f"foods[{i}] 缺少名称")
+            elif not isinstance(food.get("tags", []), list):
+                problems.append(f"foods[{i}].tags 不是数组")
+
+    location = place.get("location")
+    if location is not None:
+        if not isinstance(location, dict):
+            problems.append("location 不是对象")
+        elif not (_is_number(location.get("lng")) and -180 <= location["lng"] <= 180
+                  and _is_number(location.get("lat")) and -90 <= location["lat"] <= 90):
+            problems.append(f"location 经纬度无效: {location.get('lng')}, {location.get('lat')}")
+
+    if place.get("thumbnail") is not None and not isinstance(place["thumbnail"], str):
+        problems.append("thumbnail 不是字符串")
+    if place.get("thumbnails") is not None and not isinstance(place["thumbnails"], list):
+        problems.append("thumbnails 不是数组")
+    return problems
+
+
+class PlacesWriter:
+    """流式写出紧凑格式的 places.json
+
+    先写到同目录的临时文件，close 时原子重命名；
+    中途出错（或调用 abort）时删除临时文件，已有的文件保持不变
+
+    Args:
+        path: 输出的 places.json 路径
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.count = 0
+        fd, self._tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+        self._file = os.fdopen(fd, "wb")
+        self._buffer = bytearray(b'{"' + PLACES_KEY.encode() + b'":[')
+
+    def write(self, place):
+        if self.count:
+            self._buffer += b","
+        self._buffer += json.dumps(place, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.count += 1
+        if len(self._buffer) >= WRITE_BUFFER_SIZE:
+            self._flush()
+
+    def _flush(self):
+        self._file.write(self._buffer)
+        self._buffer.clear()
+
+    def close(self):
+        """写完结尾并替换目标文件，返回文件字节数"""
+        self._buffer += b"]}"
+        try:
+            self._flush()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.chmod(self._tmp_path, 0o644)  # mkstemp 创建的文件只有所有者可读，静态服务器需要能读取
+            os.replace(self._tmp_path, self.path)
+        except BaseException:
+            self.abort()
+            raise
+        return self.path.stat().st_size
+
+    def abort(self):
+        """放弃写入，删除临时文件"""
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.unlink(self._tmp_path)
+
+
+def check_places(places, on_valid=None):
+    """逐条校验地点
+
+    Args:
+        places: 地点的可迭代对象
+        on_valid: 在遇到第一条不合法的记录之前，对每条合法的记录调用（用于边校验边写出）
+
+    Returns:
+        (记录数, 不合法的记录数, [(序号, id, 问题列表)])，列表最多 MAX_REPORTED_ERRORS 条
+    """
+    total = invalid = 0
+    errors = []
+    for position, place in enumerate(places):
+        total += 1
+        problems = place_problems(place)
+        if problems:
+            invalid += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append((position + 1, place.get("id") if isinstance(place, dict) else None, problems))
+        elif on_valid is not None and not invalid:
+            on_valid(place)
+    return total, invalid, errors
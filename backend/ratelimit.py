@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务商限流
+每个服务商一个令牌桶（每秒请求数 + 突发容量）和可选的每日配额；
+收到 429 时按 Retry-After 暂停并把速率减半，之后每次成功逐步恢复（AIMD），
+调度时可据此优先选择仍然健康的服务商
+"""
+
+import os
+import threading
+import time
+from datetime import date, datetime, timezone
+
+from cache import DiskCache, MISS, make_key
+
+# 各服务商默认的每秒请求数和突发容量，可通过环境变量
+# <NAME>_QPS、<NAME>_BURST、<NAME>_DAILY_QUOTA 覆盖（每日配额默认不限）
+PROVIDER_RATE_LIMITS = {
+    "qwen": {"rate": 2, "burst": 4},
+    "openai": {"rate": 3, "burst": 6},
+    "deepseek": {"rate": 5, "burst": 10},
+    "amap": {"rate": 3, "burst": 3},
+    "cover": {"rate": 20, "burst": 20},
+    "video": {"rate": 5, "burst": 5},
+}
+
+# 等待令牌超过该时间（秒）时放弃，交给其他服务商处理
+MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "30"))
+
+# 预计等待不超过该时间（秒）的服务商视为健康
+HEALTHY_WAIT = 2.0
+
+# 没有 Retry-After 时的退避时间：1s、2s、4s …… 最长60s
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+# 429 后速率最低降到配置值的比例，每次成功恢复配置值的比例
+MIN_RATE_RATIO = 0.1
+RECOVERY_RATIO = 0.1
+
+
+class RateLimited(Exception):
+    """服务商被限流或当日配额已用完"""
+
+
+def parse_retry_after(value):
+    """解析 Retry-After（秒数或 HTTP 日期），无法解析时返回 None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class ProviderLimiter:
+    """单个服务商的令牌桶
+
+    Args:
+        name: 服务商名称
+        rate: 每秒请求数
+        burst: 突发容量（桶大小）
+        daily_quota: 每日最多请求数，None 表示不限
+        quota_store: 保存当日已用次数的 DiskCache，None 时只在本进程内计数
+    """
+
+    def __init__(self, name, rate, burst, daily_quota=None, quota_store=None):
+        self.name = name
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.daily_quota = daily_quota
+        self.quota_store = quota_store
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._cooldown_until = 0.0
+        self._failures = 0
+        self._used = {}  # 日期 -> 本进程内的已用次数（没有 quota_store 时使用）
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _wait_time(self, now):
+        token_wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+        return max(self._cooldown_until - now, token_wait, 0.0)
+
+    def expected_wait(self):
+        """现在申请令牌预计需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return self._wait_time(now)
+
+    def quota_left(self):
+        if self.daily_quota is None:
+            return None
+        return max(0, self.daily_quota - self._quota_used())
+
+    def healthy(self):
+        """没有用完配额且预计等待时间很短"""
+        if self.quota_left() == 0:
+            return False
+        return self.expected_wait() <= HEALTHY_WAIT
+
+    def acquire(self, max_wait=MAX_WAIT):
+        """取得一个令牌（必要时等待），返回等待的秒数
+
+        Raises:
+            RateLimited: 配额已用完，或需要等待超过 max_wait 秒
+        """
+        if self.quota_left() == 0:
+            raise RateLimited(f"{self.name} 今日配额已用完 ({self.daily_quota})")
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = self._wait_time(now)
+            if wait > max_wait:
+                raise RateLimited(f"{self.name} 被限流，需要等待 {wait:.0f}s")
+            # 预占令牌（可为负数），后来的请求会排在后面
+            self._tokens -= 1
+
+        if wait > 0:
+            time.sleep(wait)
+        # 先计数再比较：多个进程同时申请最后一次配额时只有一个能通过
+        used = self._count_quota()
+        if used is not None and used > self.daily_quota:
+            raise RateLimited(f"{self.name} 今日配额已用完 ({self.daily_quota})")
+        return wait
+
+    def on_response(self, status, retry_after=None):
+        """根据响应状态调整速率：429 减半并暂停，成功时逐步恢复"""
+        with self._lock:
+            if status == 429:
+                self._failures += 1
+                self.rate = max(self.max_rate * MIN_RATE_RATIO, self.rate / 2)
+                delay = retry_after
+                if delay is None:
+                    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self._failures - 1))
+                self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+                # 暂停期间不积累令牌
+                self._tokens = min(self._tokens, 0.0)
+            elif status < 400:
+                self._failures = 0
+                self.rate = min(self.max_rate, self.rate + self.max_rate * RECOVERY_RATIO)
+
+    def _quota_key(self):
+        return make_key("quota", self.name, date.today().isoformat())
+
+    def _quota_used(self):
+        if self.quota_store is None:
+            return self._used.get(date.today().isoformat(), 0)
+        used = self.quota_store.get(self._quota_key())
+        return 0 if used is MISS else used
+
+    def _count_quota(self):
+        """计入一次请求，返回今日已用次数（不限配额时返回 None）
+
+        quota_store 中的计数在 SQLite 中原子递增，多个进程同时运行也不会少算
+        """
+        if self.daily_quota is None:
+            return None
+        if self.quota_store is not None:
+            return self.quota_store.incr(self._quota_key())
+        with self._lock:
+            today = date.today().isoformat()
+            self._used[today] = self._used.get(today, 0) + 1
+            return self._used[today]
+
+
+class RateLimiter:
+    """所有服务商的限流器
+
+    Args:
+        quota_path: 每日配额计数的 SQLite 文件（跨进程累计），None 表示只在本进程内计数
+        metrics: 可选的 Metrics 实例，记录限流次数和等待时间
+    """
+
+    def __init__(self, quota_path=None, metrics=None):
+        self.metrics = metrics
+        self.quota_store = None
+        if quota_path is not None:
+            self.quota_store = DiskCache(quota_path, ttl=2 * 86400, max_entries=None, name="quota")
+        self.providers = {}
+        for name, limits in PROVIDER_RATE_LIMITS.items():
+            prefix = name.upper()
+            quota = os.getenv(f"{prefix}_DAILY_QUOTA")
+            self.providers[name] = ProviderLimiter(
+                name,
+                rate=float(os.getenv(f"{prefix}_QPS", limits["rate"])),
+                burst=float(os.getenv(f"{prefix}_BURST", limits["burst"])),
+                daily_quota=int(quota) if quota else None,
+                quota_store=self.quota_store,
+            )
+
+    def acquire(self, provider, max_wait=MAX_WAIT):
+        """取得一个令牌，被限流时抛出 RateLimited"""
+        try:
+            wait = self.providers[provider].acquire(max_wait)
+        except RateLimited:
+            if self.metrics is not None:
+                self.metrics.count("rate_limited_total", provider=provider)
+            raise
+        if wait and self.metrics is not None:
+            self.metrics.count("throttle_wait_seconds_total", round(wait, 3), provider=provider)
+
+    def observe(self, provider, status, headers=None):
+        """记录一次响应（包括 SDK/urllib3 内部重试的响应）"""
+        retry_after = parse_retry_after((headers or {}).get("Retry-After"))
+        self.providers[provider].on_response(status, retry_after)
+
+    def healthy(self, provider):
+        return self.providers[provider].healthy()
+
+    def close(self):
+        if self.quota_store is not None:
+            self.quota_store.close()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型提取结果的结构定义与校验
+所有服务商的回复都按同一个地点/美食结构校验并规范化（类型转换、去空白、丢弃未知字段），
+同一份定义也用于生成 response_format 的 JSON Schema
+"""
+
+import re
+
+from json_repair import parse_json_reply
+
+# 字段类型：str 为字符串，[类型] 为该类型的数组，dict 为嵌套对象
+FOOD_SCHEMA = {
+    "name": str,
+    "description": str,
+    "tags": [str],
+}
+
+PLACE_SCHEMA = {
+    "place_name": str,
+    "address": str,
+    "city": str,
+    "province": str,
+    "foods": [FOOD_SCHEMA],
+}
+
+# 批量提取：一次请求多条视频，每个地点对象带上输入中的 id
+PLACES_BATCH_SCHEMA = {
+    "places": [{"id": str, **PLACE_SCHEMA}],
+}
+
+# 标签写成一个字符串时的分隔符
+TAG_SEPARATORS = re.compile(r"[,，、;；/|]")
+
+
+class SchemaError(ValueError):
+    """模型回复不是合法的地点对象"""
+
+
+def _coerce_str(value):
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    if isinstance(value, list):
+        return "、".join(filter(None, (_coerce_str(v) for v in value)))
+    return ""
+
+
+def _coerce(value, schema):
+    if schema is str:
+        return _coerce_str(value)
+    if isinstance(schema, list):
+        item_schema = schema[0]
+        if value is None or value == "":
+            return []
+        if isinstance(value, str) and item_schema is str:
+            return [part.strip() for part in TAG_SEPARATORS.split(value) if part.strip()]
+        if not isinstance(value, list):
+            value = [value]
+        items = [_coerce(item, item_schema) for item in value]
+        return [item for item in items if item]
+    # 嵌套对象：单独的字符串视为名称（例如 "foods": ["火锅", "串串"]）
+    if isinstance(value, str):
+        value = {next(iter(schema)): value}
+    if not isinstance(value, dict):
+        return {}
+    return {field: _coerce(value.get(field), field_schema) for field, field_schema in schema.items()}
+
+
+def validate_food(food):
+    """规范化一道美食，没有名称时返回 None"""
+    food = _coerce(food, FOOD_SCHEMA)
+    return food if food.get("name") else None
+
+
+def validate_place(data):
+    """按 PLACE_SCHEMA 规范化模型返回的地点
+
+    Raises:
+        SchemaError: data 不是对象
+    """
+    if not isinstance(data, dict):
+        raise SchemaError(f"期望 JSON 对象，实际为 {type(data).__name__}")
+    place = {field: _coerce(data.get(field), schema) for field, schema in PLACE_SCHEMA.items() if field != "foods"}
+    foods = data.get("foods")
+    if isinstance(foods, (dict, str)):
+        foods = [foods]
+    place["foods"] = [food for food in map(validate_food, foods or []) if food]
+    return place
+
+
+def parse_place_reply(text):
+    """解析并校验模型回复，返回 (地点, 修复的格式问题数量)
+
+    Raises:
+        ValueError: 回复中没有 JSON 对象
+    """
+    data, repairs = parse_json_reply(text, roots="{")
+    return validate_place(data), repairs
+
+
+def parse_places_reply(text):
+    """解析批量提取的回复，返回 ({id: 地点}, 修复的格式问题数量)
+
+    接受 {"places": [...]}、直接返回的数组或以 id 为键的对象，没有 id 的条目被忽略
+
+    Raises:
+        ValueError: 回复中没有 JSON 内容
+    """
+    data, repairs = parse_json_reply(text, roots="{[")
+    items = data
+    if isinstance(data, dict):
+        items = data.get("places")
+        if items is None:
+            items = [{**value, "id": key} for key, value in data.items() if isinstance(value, dict)]
+    places = {}
+    for item in items if isinstance(items, list) else []:
+        if isinstance(item, dict) and _coerce_str(item.get("id")):
+            places[_coerce_str(item["id"])] = validate_place(item)
+    return places, repairs
+
+
+def to_json_schema(schema):
+    """把字段定义转换为 JSON Schema（严格模式：所有字段必填、不允许额外字段）"""
+    if schema is str:
+        return {"type": "string"}
+    if isinstance(schema, list):
+        return {"type": "array", "items": to_json_schema(schema[0])}
+    return {
+        "type": "object",
+        "properties": {field: to_json_schema(value) for field, value in schema.items()},
+        "required": list(schema),
+        "additionalProperties": False,
+    }
+
+
+def response_format(mode, schema=PLACE_SCHEMA, name="place"):
+    """OpenAI 兼容接口的 response_format 参数
+
+    Args:
+        mode: json_schema（结构化输出）、json_object（JSON 模式）或 none
+        schema: 回复的结构（默认单个地点）
+        name: json_schema 模式下的结构名称
+    """
+    if mode == "json_schema":
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": name, "strict": True, "schema": to_json_schema(schema)},
+        }
+    if mode == "json_object":
+        return {"type": "json_object"}
+    return None
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全文搜索索引
+对 name、city、address、foods[].name、foods[].tags 建立倒排索引（中文按单字+二元组切分，
+英文/数字按单词，查询时按前缀匹配），写入 data/search-index.json 供前端在首次搜索时懒加载。
+前端 frontend/src/utils/search.js 使用相同的切分规则，修改时需要保持一致
+"""
+
+import re
+import unicodedata
+from bisect import bisect_left
+
+from shards import SHARD_PRECISION, shard_of
+from store import write_json_if_changed
+
+INDEX_VERSION = 1
+
+# 中文字符（含扩展A区和兼容汉字）连续片段，或英文/数字单词
+_TOKEN_RE = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]+|[a-z0-9]+")
+
+
+def _normalize(text):
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def tokenize(text, query=False):
+    """切分文本为索引词
+
+    建索引时中文片段同时产出单字和二元组；查询时只用二元组（单字查询除外），
+    以减少需要求交集的倒排表
+    """
+    tokens = set()
+    for run in _TOKEN_RE.findall(_normalize(text)):
+        if run.isascii():
+            tokens.add(run)
+            continue
+        if not query or len(run) == 1:
+            tokens.update(run)
+        tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def place_text(place):
+    """地点中参与索引的全部文本"""
+    parts = [place.get("name"), place.get("city"), place.get("address")]
+    for food in place.get("foods") or []:
+        parts.append(food.get("name"))
+        parts.extend(food.get("tags") or [])
+    return " ".join(part for part in parts if isinstance(part, str))
+
+
+def _encode_postings(ids):
+    """倒排表差分编码（递增 id 之间的差值更短）"""
+    previous = 0
+    deltas = []
+    for doc_id in ids:
+        deltas.append(doc_id - previous)
+        previous = doc_id
+    return deltas
+
+
+def _decode_postings(deltas):
+    ids = []
+    current = 0
+    for delta in deltas:
+        current += delta
+        ids.append(current)
+    return ids
+
+
+class SearchIndexBuilder:
+    """逐条添加地点，生成搜索索引
+
+    docs 记录每个文档对应的地点 id 和所在分片（前端据此按需加载分片），
+    terms 为 词 -> 差分编码的文档序号列表
+    """
+
+    def __init__(self, precision=SHARD_PRECISION):
+        self.precision = precision
+        self.docs = []
+        self.postings = {}
+
+    def add(self, place):
+        doc_id = len(self.docs)
+        self.docs.append([place.get("id"), shard_of(place, self.precision)])
+        for token in tokenize(place_text(place)):
+            self.postings.setdefault(token, []).append(doc_id)
+
+    def index(self):
+        """索引字典"""
+        return {
+            "version": INDEX_VERSION,
+            "docs": self.docs,
+            "terms": {token: _encode_postings(ids) for token, ids in sorted(self.postings.items())},
+        }
+
+
+def build_search_index(places, data_dir, precision=SHARD_PRECISION):
+    """生成 data/search-index.json
+
+    Returns:
+        索引字典
+    """
+    builder = SearchIndexBuilder(precision)
+    for place in places:
+        builder.add(place)
+    index = builder.index()
+    write_json_if_changed(data_dir / "search-index.json", index, indent=None)
+    return index
+
+
+class SearchIndex:
+    """已加载的搜索索引"""
+
+    def __init__(self, data):
+        self.docs = data["docs"]
+        self.terms = data["terms"]
+        self._decoded = {}
+        # 英文/数字词按前缀匹配（"hot" 也能找到 "hotpot"），在排好序的词表中二分查找前缀范围
+        self._ascii_terms = sorted(term for term in self.terms if term.isascii())
+
+    def _postings(self, token):
+        ids = self._decoded.get(token)
+        if ids is None:
+            ids = set(_decode_postings(self.terms.get(token, ())))
+            self._decoded[token] = ids
+        return ids
+
+    def _prefix_postings(self, prefix):
+        key = prefix + "*"
+        ids = self._decoded.get(key)
+        if ids is None:
+            ids = set()
+            for term in self._ascii_terms[bisect_left(self._ascii_terms, prefix):]:
+                if not term.startswith(prefix):
+                    break
+                ids.update(_decode_postings(self.terms[term]))
+            self._decoded[key] = ids
+        return ids
+
+    def search(self, query):
+        """返回同时包含查询中所有词的地点 id 列表（按写入顺序），英文/数字词匹配以它开头的单词
+
+        查询中没有可索引的词时返回 None，由调用方退回到子串匹配
+        """
+        tokens = tokenize(query, query=True)
+        if not tokens:
+            return None
+        # 从最短的倒排表开始求交集
+        matched = None
+        lists = [self._prefix_postings(t) if t.isascii() else self._postings(t) for t in tokens]
+        for ids in sorted(lists, key=len):
+            matched = set(ids) if matched is None else matched & ids
+            if not matched:
+                return []
+        return [self.docs[doc_id][0] for doc_id in sorted(matched)]
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地提取服务
+常驻进程复用同一个 DouyinExtractor（连接池、模型客户端、缓存保持预热），
+通过 HTTP 提交链接并查询进度；同一链接在排队或处理中时重复提交会合并为同一个任务。
+提交的链接按时间窗口攒成小批，交给 process_batch 处理（共享批量坐标查询和任务队列）
+"""
+
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# 收到第一个链接后再等待多少秒，把这段时间内提交的链接合并为一批处理
+BATCH_WINDOW = 2.0
+
+# 每批最多处理的链接数
+MAX_BATCH_SIZE = 50
+
+# 请求体大小上限（字节）
+MAX_BODY_BYTES = 1024 * 1024
+
+
+def job_id(url):
+    """任务 id：链接的哈希（同一链接总是对应同一个 id）"""
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+
+
+class ExtractionService:
+    """任务调度：接收链接、合并重复提交、按批调用 process_batch
+
+    Args:
+        extractor: 常驻的 DouyinExtractor
+        queue: JobQueue，记录各阶段进度（服务重启后可继续）
+        parse_item: 把请求中的 JSON 对象转换为 process_batch 任务的函数
+        after_batch: 每批处理完成后调用（例如合并数据），可为 None
+        workers: 每批的并发数
+        batch_window: 攒批等待时间（秒）
+    """
+
+    def __init__(self, extractor, queue, parse_item, after_batch=None, workers=8,
+                 batch_window=BATCH_WINDOW):
+        self.extractor = extractor
+        self.queue = queue
+        self.parse_item = parse_item
+        self.after_batch = after_batch
+        self.workers = workers
+        self.batch_window = batch_window
+        self._jobs = {}  # id -> 任务状态
+        self._pending = []  # 等待处理的任务 id
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="dispatcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def submit(self, record):
+        """提交一个任务，返回 (任务状态, 是否与已有任务合并)
+
+        Raises:
+            ValueError: 请求内容无效
+        """
+        item = self.parse_item(record)
+        key = job_id(item['url'])
+        with self._cond:
+            job = self._jobs.get(key)
+            if job and job['status'] in ("queued", "running"):
+                return dict(job), True
+            job = {
+                "id": key,
+                "url": item['url'],
+                "status": "queued",
+                "submittedAt": time.time(),
+                "item": item,
+            }
+            self._jobs[key] = job
+            self._pending.append(key)
+            self._cond.notify_all()
+            return dict(job), False
+
+    def status(self, key):
+        """任务状态，包括任务队列中记录的阶段；不存在时返回 None"""
+        with self._cond:
+            job = self._jobs.get(key)
+            job = dict(job) if job else None
+        if job is None:
+            return None
+        stored = self.queue.get([job['url']]).get(job['url'])
+        if stored:
+            job['stage'] = stored['stage']
+        return job
+
+    def jobs(self):
+        with self._cond:
+            return [dict(job) for job in self._jobs.values()]
+
+    def _take_batch(self):
+        """等待任务到达，再等 batch_window 秒收集更多任务"""
+        with self._cond:
+            while not self._pending and not self._stopped:
+                self._cond.wait()
+            if self._stopped:
+                return []
+            deadline = time.monotonic() + self.batch_window
+            while len(self._pending) < MAX_BATCH_SIZE and not self._stopped:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[:MAX_BATCH_SIZE]
+            del self._pending[:MAX_BATCH_SIZE]
+            for key in batch:
+                self._jobs[key]['status'] = "running"
+            return [self._jobs[key] for key in batch]
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            try:
+                places, failures = self.extractor.process_batch(
+                    [job['item'] for job in batch], workers=self.workers, queue=self.queue
+                )
+            except Exception as e:
+                places, failures = [], [(job['url'], str(e)) for job in batch]
+            if places and self.after_batch:
+                try:
+                    self.after_batch()
+                except Exception as e:
+                    print(f"⚠️  批次完成后的处理失败: {e}")
+
+            by_url = {place.get('videoUrl'): place for place in places}
+            errors = dict(failures)
+            with self._cond:
+                for job in batch:
+                    job['finishedAt'] = time.time()
+                    if job['url'] in errors:
+                        job['status'] = "failed"
+                        job['error'] = errors[job['url']]
+                    else:
+                        # 已保存过而被跳过的链接没有新结果，视为完成
+                        job['status'] = "done"
+                        place = by_url.get(job['url']) or self.extractor.index.find(video_url=job['url'])
+                        if place:
+                            job['place'] = place
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service = None  # 由 make_server 设置
+
+    def _send(self, status, body):
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _public(self, job):
+        return {key: value for key, value in job.items() if key != "item"}
+
+    def do_GET(self):
+        path = urlparse(self.path).path.rstrip('/')
+        if path == "/health":
+            self._send(200, {"status": "ok"})
+        elif path == "/jobs":
+            self._send(200, {"jobs": [self._public(job) for job in self.service.jobs()]})
+        elif path.startswith("/jobs/"):
+            job = self.service.status(path[len("/jobs/"):])
+            if job is None:
+                self._send(404, {"error": "任务不存在"})
+            else:
+                self._send(200, self._public(job))
+        else:
+            self._send(404, {"error": "未知的路径"})
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip('/') != "/jobs":
+            self._send(404, {"error": "未知的路径"})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self._send(413, {"error": "请求体过大"})
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            self._send(400, {"error": f"JSON格式错误: {e}"})
+            return
+
+        # 支持 {"url": ...}、{"urls": [...]} 或任务对象数组
+        if isinstance(body, list):
+            records = body
+        elif isinstance(body, dict) and isinstance(body.get("urls"), list):
+            records = [{"url": url} for url in body["urls"]]
+        else:
+            records = [body]
+
+        results = []
+        for record in records:
+            if not isinstance(record, dict):
+                record = {"url": record}
+            try:
+                job, coalesced = self.service.submit(record)
+            except ValueError as e:
+                results.append({"error": str(e)})
+                continue
+            results.append({**self._public(job), "coalesced": coalesced})
+
+        status = 202 if any("id" in result for result in results) else 400
+        self._send(status, {"jobs": results})
+
+    def log_message(self, format, *args):
+        print(f"  [serve] {self.address_string()} {format % args}")
+
+
+def make_server(service, host="127.0.0.1", port=8765):
+    """创建 HTTP 服务（每个请求一个线程，任务处理在调度线程中进行）"""
+    handler = type("Handler", (_Handler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
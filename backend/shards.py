@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+地点分片
+按 geohash 前缀把地点切分为多个小文件（data/shards/<geohash>.json），
+并生成 data/manifest.json 记录每个分片的范围、数量以及按省份/城市的统计，
+前端只需加载视野范围内的分片
+"""
+
+import os
+
+from store import write_json_if_changed
+
+# geohash 精度：2 位约为 1250km x 625km，覆盖全国约 30 个分片
+SHARD_PRECISION = int(os.getenv("SHARD_PRECISION", "2"))
+
+# 没有坐标的地点放在单独的分片中
+UNLOCATED_SHARD = "none"
+
+MANIFEST_VERSION = 1
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat, lng, precision=SHARD_PRECISION):
+    """经纬度编码为 geohash"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def geohash_bbox(geohash):
+    """geohash 单元格范围 [minLng, minLat, maxLng, maxLat]"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        index = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (index >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return [lng_range[0], lat_range[0], lng_range[1], lat_range[1]]
+
+
+def shard_of(place, precision=SHARD_PRECISION):
+    """地点所属分片"""
+    location = place.get("location")
+    if not location or location.get("lng") is None or location.get("lat") is None:
+        return UNLOCATED_SHARD
+    return geohash_encode(location["lat"], location["lng"], precision)
+
+
+class ShardStats:
+    """逐条累计各分片的数量和中心点，以及按省份/城市的统计，用于生成 manifest.json
+
+    Args:
+        precision: geohash 精度
+    """
+
+    def __init__(self, precision=SHARD_PRECISION):
+        self.precision = precision
+        self.total = 0
+        self.foods = 0
+        self.shards = {}  # 分片 -> [地点数, 经度和, 纬度和]
+        self.provinces = {}
+        self.cities = {}
+
+    def add(self, place):
+        """累计一个地点，返回它所属的分片"""
+        key = shard_of(place, self.precision)
+        shard = self.shards.setdefault(key, [0, 0.0, 0.0])
+        shard[0] += 1
+        if key != UNLOCATED_SHARD:
+            shard[1] += place["location"]["lng"]
+            shard[2] += place["location"]["lat"]
+
+        foods = len(place.get("foods") or [])
+        self.total += 1
+        self.foods += foods
+
+        province = place.get("province") or ""
+        stats = self.provinces.setdefault(province, {"count": 0, "foods": 0})
+        stats["count"] += 1
+        stats["foods"] += foods
+
+        city = place.get("city") or ""
+        if city:
+            stats = self.cities.setdefault(city, {"count": 0, "foods": 0, "province": province})
+            stats["count"] += 1
+            stats["foods"] += foods
+        return key
+
+    def manifest(self):
+        """manifest 字典"""
+        shard_entries = {}
+        for key, (count, lng_sum, lat_sum) in sorted(self.shards.items()):
+            entry = {"file": f"shards/{key}.json", "count": count}
+            if key != UNLOCATED_SHARD:
+                entry["bbox"] = geohash_bbox(key)
+                entry["center"] = [lng_sum / count, lat_sum / count]
+            shard_entries[key] = entry
+        return {
+            "version": MANIFEST_VERSION,
+            "precision": self.precision,
+            "total": self.total,
+            "foods": self.foods,
+            "shards": shard_entries,
+            "provinces": self.provinces,
+            "cities": self.cities,
+        }
+
+
+def remove_stale_shards(shard_dir, keys):
+    """删除已经没有地点的旧分片"""
+    for path in shard_dir.glob("*.json"):
+        if path.stem not in keys:
+            path.unlink()
+
+
+def build_shards(places, data_dir, precision=SHARD_PRECISION):
+    """生成分片文件和 manifest.json，并删除不再使用的旧分片
+
+    Returns:
+        manifest 字典
+    """
+    shard_dir = data_dir / "shards"
+    shard_dir.mkdir(exist_ok=True)
+
+    stats = ShardStats(precision)
+    shards = {}
+    for place in places:
+        shards.setdefault(stats.add(place), []).append(place)
+
+    for key, shard_places in sorted(shards.items()):
+        write_json_if_changed(shard_dir / f"{key}.json", {"places": shard_places})
+    remove_stale_shards(shard_dir, shards)
+
+    manifest = stats.manifest()
+    write_json_if_changed(data_dir / "manifest.json", manifest)
+    return manifest
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+部署数据导出
+逐条校验地点，把前端实际加载的全部数据写到导出目录（默认 data/export/）：
+紧凑格式的 places.json、shards/<geohash>.json、manifest.json 和 search-index.json。
+有任何不合法的记录时不写出任何文件，已有的导出保持不变。
+地点记录边校验边写出，内存中只保留 manifest 统计和搜索索引
+"""
+
+import os
+from pathlib import Path
+
+from place_stream import PlaceRecordError, PlacesWriter, check_places
+from search_index import SearchIndexBuilder
+from shards import SHARD_PRECISION, ShardStats, remove_stale_shards
+from store import atomic_write_json
+
+
+def _write_compact_json(path, data):
+    atomic_write_json(path, data, indent=None)
+    os.chmod(path, 0o644)  # mkstemp 创建的文件只有所有者可读，静态服务器需要能读取
+    return path.stat().st_size
+
+
+def export_site(places, out_dir, precision=SHARD_PRECISION):
+    """校验地点并导出部署使用的数据文件
+
+    Args:
+        places: 地点的可迭代对象（可以是 iter_places 或存储的 iter_places 生成器）
+        out_dir: 输出目录
+        precision: 分片的 geohash 精度
+
+    Returns:
+        {"places": 地点数, "shards": 分片数, "bytes": 全部文件的字节数}
+
+    Raises:
+        PlaceRecordError: 有不合法的记录
+    """
+    out_dir = Path(out_dir)
+    shard_dir = out_dir / "shards"
+    places_writer = PlacesWriter(out_dir / "places.json")
+    shard_writers = {}
+    stats = ShardStats(precision)
+    index = SearchIndexBuilder(precision)
+
+    def write(place):
+        places_writer.write(place)
+        key = stats.add(place)
+        if key not in shard_writers:
+            shard_writers[key] = PlacesWriter(shard_dir / f"{key}.json")
+        shard_writers[key].write(place)
+        index.add(place)
+
+    try:
+        total, invalid, errors = check_places(places, write)
+        if invalid:
+            raise PlaceRecordError(invalid, errors)
+    except BaseException:
+        places_writer.abort()
+        for writer in shard_writers.values():
+            writer.abort()
+        raise
+
+    # 先写分片和索引，最后写 manifest.json 和 places.json（前端从 manifest.json 开始加载）
+    size = sum(writer.close() for writer in shard_writers.values())
+    if shard_dir.exists():
+        remove_stale_shards(shard_dir, shard_writers)
+    size += _write_compact_json(out_dir / "search-index.json", index.index())
+    size += _write_compact_json(out_dir / "manifest.json", stats.manifest())
+    size += places_writer.close()
+    return {"places": total, "shards": len(shard_writers), "bytes": size}
@@ -0,0 +1,724 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+地点数据存储
+PlaceStore 定义存储接口，有两种实现：
+  - JournalStore（默认）：新地点以追加方式写入 JSONL 日志（O(1)），compact 时再合并生成 places.json；
+    查找已有地点使用持久化的 SQLite 索引（places.lookup.sqlite），只回放新增的日志
+  - SqliteStore：地点保存在 SQLite 中，按 videoUrl、名称+城市、城市、省份、添加日期建索引，
+    读写和查询不随数据量线性增长，compact 时导出 places.json
+前端使用的 places.json、分片和搜索索引都由 compact 的结果生成。
+所有写操作都持有文件锁，并通过临时文件 + 原子重命名落盘，多个进程并发写入也不会丢数据。
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+
+from place_stream import read_places
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(lock_path):
+    """跨进程排他锁（数据目录不存在时创建）"""
+    Path(lock_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a+b') as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write_json(path, data, indent=2):
+    """先写临时文件再原子重命名，避免写到一半的文件被读取
+
+    indent 为 None 时输出不含空白的紧凑格式
+    """
+    path = Path(path)
+    separators = (',', ':') if indent is None else None
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent, separators=separators)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def write_json_if_changed(path, data, indent=2):
+    """内容未变化时不重写文件（避免无意义的 git 变更）"""
+    path = Path(path)
+    if path.exists():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                if json.load(f) == data:
+                    return False
+        except (OSError, json.JSONDecodeError):
+            pass
+    atomic_write_json(path, data, indent=indent)
+    return True
+
+
+def normalize_text(text):
+    """去除空白并转小写，用于去重比较"""
+    return "".join((text or "").split()).lower()
+
+
+class PlaceIndex:
+    """按 videoUrl 和规范化后的 (名称, 城市) 查找已有地点"""
+
+    def __init__(self, places=()):
+        self._by_url = {}
+        self._by_name = {}
+        for place in places:
+            self.add(place)
+
+    @staticmethod
+    def _name_key(name, city):
+        name, city = normalize_text(name), normalize_text(city)
+        return (name, city) if name and city else None
+
+    def add(self, place):
+        if place.get("videoUrl"):
+            self._by_url[place["videoUrl"]] = place
+        key = self._name_key(place.get("name"), place.get("city"))
+        if key:
+            self._by_name[key] = place
+
+    def find(self, video_url=None, name=None, city=None):
+        """优先按 videoUrl 匹配，其次按 (名称, 城市) 匹配"""
+        if video_url and video_url in self._by_url:
+            return self._by_url[video_url]
+        key = self._name_key(name, city)
+        if key:
+            return self._by_name.get(key)
+        return None
+
+    def __len__(self):
+        return len(self._by_url)
+
+
+class PlaceStore(ABC):
+    """地点存储接口
+
+    Args:
+        json_path: 前端读取的 places.json 路径（compact 时导出到这里）
+    """
+
+    def __init__(self, json_path):
+        self.json_path = Path(json_path)
+        self.lock_path = self.json_path.with_suffix('.lock')
+
+    @property
+    @abstractmethod
+    def write_path(self):
+        """新数据写入的文件（用于提示信息）"""
+
+    @abstractmethod
+    def append(self, places):
+        """按 id 写入地点：已存在的 id 原位替换，新 id 追加到末尾"""
+
+    @abstractmethod
+    def load(self):
+        """按添加顺序读取全部地点"""
+
+    @abstractmethod
+    def compact(self):
+        """导出 places.json，返回全部地点"""
+
+    @abstractmethod
+    def has_pending(self):
+        """是否有尚未导出到 places.json 的数据"""
+
+    @abstractmethod
+    def pending_count(self):
+        """尚未导出到 places.json 的写入数"""
+
+    def _json_mtime(self):
+        try:
+            return self.json_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def lookup(self):
+        """返回按 videoUrl / (名称, 城市) 查找已有地点的对象（提供 find 和 add）"""
+        return PlaceIndex(self.load())
+
+    def query(self, city=None, province=None, added_since=None, limit=None):
+        """按城市、省份、添加日期（YYYY-MM-DD，含当天）筛选地点"""
+        places = [
+            place for place in self.load()
+            if (city is None or place.get("city") == city)
+            and (province is None or place.get("province") == province)
+            and (added_since is None or (place.get("addedDate") or "") >= added_since)
+        ]
+        return places[:limit] if limit is not None else places
+
+    def count(self):
+        return len(self.load())
+
+    def iter_places(self):
+        """按添加顺序逐个产出地点（用于导出，子类按需实现为不占用与数据量成正比的内存）"""
+        yield from self.load()
+
+    def close(self):
+        pass
+
+
+class JournalStore(PlaceStore):
+    """places.json + 追加日志
+
+    日志每行一条操作：{"op": "put", "place": {...}}。
+    put 按 id 写入：已存在的 id 原位替换，新 id 追加到末尾。
+
+    Args:
+        json_path: 前端读取的 places.json 路径
+    """
+
+    def __init__(self, json_path):
+        super().__init__(json_path)
+        self.journal_path = self.json_path.with_suffix('.journal.jsonl')
+        self._lookup = None
+
+    @property
+    def write_path(self):
+        return self.journal_path
+
+    def has_pending(self):
+        return self.journal_path.exists() or not self.json_path.exists()
+
+    def pending_count(self):
+        if not self.journal_path.exists():
+            return 0
+        with open(self.journal_path, 'rb') as f:
+            return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 16), b""))
+
+    def _journal_size(self):
+        try:
+            return self.journal_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def lookup(self):
+        # 持久化的查找索引，每次只回放新增的日志，不需要把全部地点读入内存
+        if self._lookup is None:
+            self._lookup = JournalLookup(self)
+        return self._lookup
+
+    def append(self, places):
+        """将地点追加到日志（不读取现有数据）"""
+        lines = "".join(
+            json.dumps({"op": "put", "place": place}, ensure_ascii=False) + "\n"
+            for place in places
+        )
+        with file_lock(self.lock_path):
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _read_snapshot(self):
+        if self.json_path.exists():
+            with open(self.json_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get("places", [])
+        return []
+
+    def _read_journal(self):
+        """读取日志中的操作，忽略末尾写了一半的行"""
+        return self._read_journal_from(0)[0]
+
+    def _read_journal_from(self, offset):
+        """从字节位置 offset 开始读取日志中的操作
+
+        Returns:
+            (操作列表, 已读取到的字节位置)，末尾写了一半的行不计入
+        """
+        if not self.journal_path.exists():
+            return [], 0
+        ops = []
+        with open(self.journal_path, 'rb') as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                offset += len(raw)
+                line = raw.decode('utf-8').strip()
+                if not line:
+                    continue
+                try:
+                    ops.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"⚠️  忽略损坏的日志行: {line[:80]}")
+        return ops, offset
+
+    @staticmethod
+    def _apply(places, ops):
+        index = {place.get("id"): i for i, place in enumerate(places)}
+        for op in ops:
+            if op.get("op") != "put":
+                continue
+            place = op["place"]
+            position = index.get(place.get("id"))
+            if position is None:
+                index[place.get("id")] = len(places)
+                places.append(place)
+            else:
+                places[position] = place
+        return places
+
+    def load(self):
+        """读取全部地点（快照 + 尚未合并的日志）"""
+        with file_lock(self.lock_path):
+            return self._apply(self._read_snapshot(), self._read_journal())
+
+    def iter_places(self):
+        """逐个产出地点：流式读取 places.json，并按日志替换或追加
+
+        持锁时读取日志并打开 places.json，之后的 compact 会原子替换文件而不影响已打开的句柄，
+        因此读取的是同一时刻的一致快照。只有尚未合并的日志操作保存在内存中
+        """
+        with file_lock(self.lock_path):
+            updates = {}
+            for op in self._read_journal():
+                if op.get("op") == "put":
+                    updates[op["place"].get("id")] = op["place"]
+            f = open(self.json_path, 'r', encoding='utf-8') if self.json_path.exists() else None
+        if f is not None:
+            with f:
+                for place in read_places(f):
+                    yield updates.pop(place.get("id"), place)
+        yield from updates.values()
+
+    def compact(self):
+        """将日志合并进 places.json 并清空日志
+
+        Returns:
+            合并后的全部地点
+        """
+        with file_lock(self.lock_path):
+            json_mtime, journal_size = self._json_mtime() or 0, self._journal_size()
+            ops = self._read_journal()
+            places = self._read_snapshot()
+            if ops or not self.json_path.exists():
+                places = self._apply(places, ops)
+                atomic_write_json(self.json_path, {"places": places})
+            if self.journal_path.exists():
+                os.unlink(self.journal_path)
+            compacted_mtime = self._json_mtime() or 0
+        # 查找索引持有自己的锁后才获取文件锁，这里必须在释放文件锁之后更新
+        self.lookup().rebase(json_mtime, journal_size, compacted_mtime)
+        return places
+
+    def close(self):
+        if self._lookup is not None:
+            self._lookup.close()
+
+
+class SqliteStore(PlaceStore):
+    """SQLite 地点存储（适合数万到数十万个地点）
+
+    第一次打开时如果数据库为空，会导入已有的 places.json 和数据日志；
+    places.json 在上次导出后被手动修改过时，以 places.json 为准重新导入。
+    但数据库中有尚未导出的写入时不重新导入（否则这些写入会丢失），而是保留数据库，
+    下次 compact 覆盖 places.json 前先把被修改的文件备份为 places.conflict-<时间>.json。
+    compact 只在有新写入或 places.json 不存在时重新导出。
+
+    Args:
+        json_path: 导出的 places.json 路径
+        db_path: 数据库路径，默认与 places.json 同目录的 places.sqlite
+    """
+
+    def __init__(self, json_path, db_path=None):
+        super().__init__(json_path)
+        self.db_path = Path(db_path) if db_path else self.json_path.with_suffix('.sqlite')
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def write_path(self):
+        return self.db_path
+
+    def _connect(self):
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS places (
+                    id TEXT PRIMARY KEY,
+                    seq INTEGER NOT NULL,
+                    video_url TEXT,
+                    name_key TEXT,
+                    city TEXT,
+                    province TEXT,
+                    added_date TEXT,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_places_seq ON places (seq);
+                CREATE INDEX IF NOT EXISTS idx_places_video_url ON places (video_url);
+                CREATE INDEX IF NOT EXISTS idx_places_name_key ON places (name_key);
+                CREATE INDEX IF NOT EXISTS idx_places_city ON places (city);
+                CREATE INDEX IF NOT EXISTS idx_places_province ON places (province);
+                CREATE INDEX IF NOT EXISTS idx_places_added_date ON places (added_date);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+                """
+            )
+            conn.commit()
+            self._conn = conn
+            if conn.execute("SELECT COUNT(*) FROM places").fetchone()[0] == 0:
+                self._import_json()
+            elif self._json_modified():
+                if self._meta("version") != self._meta("exported"):
+                    print(f"❗ {self.json_path.name} 在上次导出后被修改，但 {self.db_path.name} 中有尚未导出的写入，"
+                          f"不重新导入（保留数据库中的数据）")
+                    print(f"❗ 下次 compact 会先把当前的 {self.json_path.name} 备份为 "
+                          f"{self.json_path.stem}.conflict-<时间>{self.json_path.suffix}，"
+                          f"再用数据库内容覆盖；需要手动合并这两份数据")
+                else:
+                    print(f"⚠️  {self.json_path.name} 在上次导出后被修改，重新导入")
+                    conn.execute("DELETE FROM places")
+                    self._import_json()
+        return self._conn
+
+    def _json_modified(self):
+        """places.json 在上次导出后是否被其他程序修改过"""
+        exported_mtime = self._meta("exported_mtime")
+        return bool(exported_mtime) and self._json_mtime() not in (None, exported_mtime)
+
+    def _conflict_path(self):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        return self.json_path.with_name(f"{self.json_path.stem}.conflict-{stamp}{self.json_path.suffix}")
+
+    def _import_json(self):
+        """把已有的 places.json + 数据日志导入空数据库"""
+        journal = JournalStore(self.json_path)
+        if not self.json_path.exists() and not journal.journal_path.exists():
+            return
+        places = journal.load()
+        if places:
+            self._write(places)
+            print(f"✓ 已从 {self.json_path.name} 导入 {len(places)} 个地点到 {self.db_path.name}")
+        if not journal.journal_path.exists():
+            # 数据日志中的地点还没有合并进 places.json，保留为待导出
+            self._set_meta("exported", self._meta("version"))
+        self._set_meta("exported_mtime", self._json_mtime() or 0)
+
+    @staticmethod
+    def _name_key(place):
+        key = PlaceIndex._name_key(place.get("name"), place.get("city"))
+        return "\x1f".join(key) if key else None
+
+    def _write(self, places):
+        conn = self._conn
+        seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM places").fetchone()[0]
+        for place in places:
+            seq += 1
+            conn.execute(
+                "INSERT INTO places (id, seq, video_url, name_key, city, province, added_date, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET video_url = excluded.video_url, name_key = excluded.name_key, "
+                "city = excluded.city, province = excluded.province, added_date = excluded.added_date, "
+                "data = excluded.data",
+                (place.get("id"), seq, place.get("videoUrl") or None, self._name_key(place),
+                 place.get("city"), place.get("province"), place.get("addedDate"),
+                 json.dumps(place, ensure_ascii=False))
+            )
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('version', 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+        )
+        conn.commit()
+
+    def _meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def _set_meta(self, key, value):
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+        self._conn.commit()
+
+    def append(self, places):
+        with self._lock:
+            self._connect()
+            self._write(places)
+
+    def load(self):
+        with self._lock:
+            rows = self._connect().execute("SELECT data FROM places ORDER BY seq").fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def iter_places(self, page_size=500):
+        """按 seq 分页读取，每次只持有一页地点"""
+        last_seq = 0
+        while True:
+            with self._lock:
+                rows = self._connect().execute(
+                    "SELECT seq, data FROM places WHERE seq > ? ORDER BY seq LIMIT ?", (last_seq, page_size)
+                ).fetchall()
+            if not rows:
+                return
+            for seq, data in rows:
+                yield json.loads(data)
+            last_seq = rows[-1][0]
+
+    def lookup(self):
+        # 直接查询数据库索引，不需要把全部地点读入内存
+        return self
+
+    def add(self, place):
+        """append 时已写入索引，无需额外处理"""
+
+    def find(self, video_url=None, name=None, city=None):
+        """优先按 videoUrl 匹配，其次按 (名称, 城市) 匹配"""
+        with self._lock:
+            conn = self._connect()
+            row = None
+            if video_url:
+                row = conn.execute(
+                    "SELECT data FROM places WHERE video_url = ? ORDER BY seq DESC LIMIT 1", (video_url,)
+                ).fetchone()
+            key = self._name_key({"name": name, "city": city})
+            if row is None and key:
+                row = conn.execute(
+                    "SELECT data FROM places WHERE name_key = ? ORDER BY seq DESC LIMIT 1", (key,)
+                ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(self, city=None, province=None, added_since=None, limit=None):
+        conditions, values = [], []
+        for column, value in (("city", city), ("province", province)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                values.append(value)
+        if added_since is not None:
+            conditions.append("added_date >= ?")
+            values.append(added_since)
+        sql = "SELECT data FROM places"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY seq"
+        if limit is not None:
+            sql += " LIMIT ?"
+            values.append(limit)
+        with self._lock:
+            rows = self._connect().execute(sql, values).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def count(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM places").fetchone()[0]
+
+    def has_pending(self):
+        with self._lock:
+            self._connect()
+            return self._meta("version") != self._meta("exported") or not self.json_path.exists()
+
+    def pending_count(self):
+        with self._lock:
+            self._connect()
+            return self._meta("version") - self._meta("exported")
+
+    def compact(self):
+        # 首次打开时的导入会读取数据日志（持有文件锁），必须在下面获取文件锁之前完成
+        with self._lock:
+            self._connect()
+        with file_lock(self.lock_path):
+            with self._lock:
+                version = self._meta("version")
+                exported = self._meta("exported")
+            places = self.load()
+            if version != exported or not self.json_path.exists():
+                with self._lock:
+                    modified = self._json_modified()
+                if modified:
+                    backup = self._conflict_path()
+                    shutil.copy2(self.json_path, backup)
+                    print(f"❗ {self.json_path.name} 在上次导出后被修改，已备份为 {backup.name}，"
+                          f"请手动合并其中的改动")
+                atomic_write_json(self.json_path, {"places": places})
+                # 导入时已合并的数据日志
+                JournalStore(self.json_path).journal_path.unlink(missing_ok=True)
+                with self._lock:
+                    self._set_meta("exported", version)
+                    self._set_meta("exported_mtime", self._json_mtime())
+            return places
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class JournalLookup:
+    """JournalStore 的持久化查找索引（与 places.json 同目录的 places.lookup.sqlite）
+
+    记录 videoUrl / (名称, 城市) 到地点的映射，以及索引已覆盖的 places.json 修改时间和日志位置。
+    每次查找前只回放日志中新增的部分（包括其他进程追加的），places.json 被其他程序修改时才流式重建；
+    compact 时如果索引已覆盖全部日志则直接沿用，不需要重建
+
+    Args:
+        store: JournalStore 实例
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.db_path = store.json_path.with_suffix('.lookup.sqlite')
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS places (
+                    id TEXT PRIMARY KEY,
+                    seq INTEGER NOT NULL,
+                    video_url TEXT,
+                    name_key TEXT,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_lookup_video_url ON places (video_url);
+                CREATE INDEX IF NOT EXISTS idx_lookup_name_key ON places (name_key);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _meta(conn, key):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _set_meta(conn, key, value):
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+    @staticmethod
+    def _put(conn, places):
+        seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM places").fetchone()[0]
+        for place in places:
+            seq += 1
+            conn.execute(
+                "INSERT INTO places (id, seq, video_url, name_key, data) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET seq = excluded.seq, video_url = excluded.video_url, "
+                "name_key = excluded.name_key, data = excluded.data",
+                (place.get("id"), seq, place.get("videoUrl") or None, SqliteStore._name_key(place),
+                 json.dumps(place, ensure_ascii=False))
+            )
+
+    def _sync(self, conn):
+        """回放新增的日志；places.json 已被替换时从快照重建"""
+        store = self.store
+        snapshot = None
+        with file_lock(store.lock_path):
+            json_mtime = store._json_mtime() or 0
+            offset = self._meta(conn, "journal_offset")
+            rebuild = self._meta(conn, "json_mtime") != json_mtime or offset > store._journal_size()
+            if rebuild:
+                offset = 0
+                if store.json_path.exists():
+                    snapshot = open(store.json_path, 'r', encoding='utf-8')
+            elif offset == store._journal_size():
+                return
+            ops, offset = store._read_journal_from(offset)
+        with conn:
+            if rebuild:
+                conn.execute("DELETE FROM places")
+                if snapshot is not None:
+                    with snapshot:
+                        self._put(conn, read_places(snapshot))
+            self._put(conn, (op["place"] for op in ops if op.get("op") == "put"))
+            self._set_meta(conn, "json_mtime", json_mtime)
+            self._set_meta(conn, "journal_offset", offset)
+
+    def add(self, place):
+        """追加到日志的地点在下次查找前回放，无需额外处理"""
+
+    def find(self, video_url=None, name=None, city=None):
+        """优先按 videoUrl 匹配，其次按 (名称, 城市) 匹配"""
+        with self._lock:
+            conn = self._connect()
+            self._sync(conn)
+            row = None
+            if video_url:
+                row = conn.execute(
+                    "SELECT data FROM places WHERE video_url = ? ORDER BY seq DESC LIMIT 1", (video_url,)
+                ).fetchone()
+            key = SqliteStore._name_key({"name": name, "city": city})
+            if row is None and key:
+                row = conn.execute(
+                    "SELECT data FROM places WHERE name_key = ? ORDER BY seq DESC LIMIT 1", (key,)
+                ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def rebase(self, json_mtime, journal_size, compacted_mtime):
+        """compact 之后调用：索引已覆盖合并前的 places.json 和全部日志时，改为对应合并后的 places.json"""
+        if not self.db_path.exists():
+            return
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                if (self._meta(conn, "json_mtime") == json_mtime
+                        and self._meta(conn, "journal_offset") == journal_size):
+                    self._set_meta(conn, "json_mtime", compacted_mtime)
+                    self._set_meta(conn, "journal_offset", 0)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# 可选的存储实现（环境变量 PLACE_STORE 选择）
+STORE_BACKENDS = {
+    "journal": JournalStore,
+    "sqlite": SqliteStore,
+}
+
+
+def open_store(json_path, backend="journal"):
+    """按名称创建地点存储"""
+    if backend not in STORE_BACKENDS:
+        raise ValueError(f"未知的存储类型: {backend}（可选: {', '.join(STORE_BACKENDS)}）")
+    return STORE_BACKENDS[backend](json_path)
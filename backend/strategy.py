@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提取策略
+在多个模型服务之间调度地点信息提取：每个服务有独立的截止时间，
+可以依次尝试、对冲（主服务慢时并行启动备选服务）、同时竞速或合并所有结果
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+# sequential: 按优先级依次尝试（默认，与原有流程一致）
+# hedge:      先启动第一个服务，hedge_delay 秒内没有结果再并行启动其余服务，取最先返回的有效结果
+# race:       同时启动所有服务，取最先返回的有效结果
+# merge:      同时启动所有服务，在截止时间内收集全部结果，按置信度合并
+STRATEGIES = ("sequential", "hedge", "race", "merge")
+
+# 置信度评分权重
+SCORE_WEIGHTS = {"place_name": 3, "city": 2, "province": 1, "address": 1}
+
+
+def score(extracted):
+    """结果置信度：字段越完整分数越高，无效结果为 0"""
+    if not extracted:
+        return 0
+    total = sum(weight for key, weight in SCORE_WEIGHTS.items() if extracted.get(key))
+    return total + min(len(extracted.get("foods") or []), 3)
+
+
+def merge_results(results):
+    """以置信度最高的结果为基础，用其他结果补全空字段"""
+    ranked = sorted(results, key=score, reverse=True)
+    merged = dict(ranked[0])
+    for other in ranked[1:]:
+        for key, value in other.items():
+            if value and not merged.get(key):
+                merged[key] = value
+    return merged
+
+
+class Cancelled(Exception):
+    """候选服务已被取消（其他服务已返回结果、超过截止时间或程序退出）"""
+
+
+class Candidate:
+    """一个提取服务
+
+    Args:
+        name: 服务名称（用于日志）
+        fn: 调用函数，接收 timeout 和 cancel（threading.Event）关键字参数，返回提取结果或 None；
+            cancel 被设置后应尽快停止（关闭流式连接、不再发起新请求）
+        deadline: 截止时间（秒），超时视为失败
+    """
+
+    def __init__(self, name, fn, deadline):
+        self.name = name
+        self.fn = fn
+        self.deadline = deadline
+
+
+class ExtractionStrategy:
+    """按配置的策略运行一组候选服务
+
+    Args:
+        mode: STRATEGIES 之一
+        hedge_delay: hedge 模式下等待主服务的秒数
+        max_workers: 同时运行的调用数上限
+
+    每次调用在单独的守护线程中运行：被放弃的调用收到 cancel 信号后自行结束，
+    没有响应取消的调用（例如阻塞中的非流式请求）也不会阻止进程退出
+    """
+
+    def __init__(self, mode="sequential", hedge_delay=5.0, max_workers=8):
+        if mode not in STRATEGIES:
+            raise ValueError(f"未知的提取策略: {mode}（可选: {', '.join(STRATEGIES)}）")
+        self.mode = mode
+        self.hedge_delay = hedge_delay
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._active = set()  # 尚未结束的调用的取消信号
+        self._active_lock = threading.Lock()
+
+    def run(self, candidates):
+        """运行候选服务，返回最终结果（全部失败时返回 None）"""
+        if not candidates:
+            return None
+        if self.mode == "sequential" or len(candidates) == 1:
+            return self._run_sequential(candidates)
+        if self.mode == "hedge":
+            return self._run_parallel(candidates[:1], candidates[1:], self.hedge_delay)
+        if self.mode == "race":
+            return self._run_parallel(candidates, [], None)
+        return self._run_parallel(candidates, [], None, collect_all=True)
+
+    def _submit(self, candidate):
+        """在守护线程中启动候选服务，返回 (future, 截止时刻, 取消信号)"""
+        future = Future()
+        cancel = threading.Event()
+        with self._active_lock:
+            self._active.add(cancel)
+
+        def run():
+            try:
+                with self._slots:
+                    if cancel.is_set():
+                        raise Cancelled(f"{candidate.name} 已取消")
+                    result = candidate.fn(timeout=candidate.deadline, cancel=cancel)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finally:
+                with self._active_lock:
+                    self._active.discard(cancel)
+
+        future.set_running_or_notify_cancel()
+        threading.Thread(target=run, name=f"extract-{candidate.name}", daemon=True).start()
+        return future, time.monotonic() + candidate.deadline, cancel
+
+    def _run_sequential(self, candidates):
+        for candidate in candidates:
+            future, deadline, cancel = self._submit(candidate)
+            try:
+                result = future.result(timeout=max(0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                cancel.set()
+                print(f"  ⏱  {candidate.name} 超过 {candidate.deadline}s 截止时间，尝试下一个服务")
+                continue
+            except Exception as e:
+                print(f"  {candidate.name} 调用失败: {e}")
+                continue
+            if score(result):
+                return result
+        return None
+
+    def _run_parallel(self, started, backups, hedge_delay, collect_all=False):
+        """并行运行；hedge_delay 不为 None 时，到时仍无有效结果再启动 backups"""
+        running = {}  # future -> (candidate, deadline, cancel)
+        for candidate in started:
+            future, deadline, cancel = self._submit(candidate)
+            running[future] = (candidate, deadline, cancel)
+
+        hedge_at = time.monotonic() + hedge_delay if hedge_delay is not None else None
+        results = []
+
+        while running or backups:
+            now = time.monotonic()
+
+            if backups and (hedge_at is None or now >= hedge_at or not running):
+                names = ", ".join(c.name for c in backups)
+                print(f"  ⚡ 并行启动备选服务: {names}")
+                for candidate in backups:
+                    future, deadline, cancel = self._submit(candidate)
+                    running[future] = (candidate, deadline, cancel)
+                backups = []
+                continue
+
+            # 取消超过截止时间的服务（结果被忽略）
+            for future, (candidate, deadline, cancel) in list(running.items()):
+                if now >= deadline:
+                    print(f"  ⏱  {candidate.name} 超过 {candidate.deadline}s 截止时间，放弃其结果")
+                    cancel.set()
+                    del running[future]
+            if not running and not backups:
+                break
+
+            wake_at = min([deadline for _, deadline, _ in running.values()] +
+                          ([hedge_at] if backups and hedge_at else []))
+            done, _ = wait(list(running), timeout=max(0, wake_at - now), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                candidate, _, _ = running.pop(future)
+                try:
+                    result = future.result()
+                except Cancelled:
+                    continue
+                except Exception as e:
+                    print(f"  {candidate.name} 调用失败: {e}")
+                    continue
+                if not score(result):
+                    continue
+                if not collect_all:
+                    if running:
+                        names = ", ".join(c.name for c, _, _ in running.values())
+                        print(f"  ✓ {candidate.name} 最先返回有效结果，取消: {names}")
+                    for _, _, cancel in running.values():
+                        cancel.set()
+                    return result
+                results.append(result)
+
+        if results:
+            if len(results) > 1:
+                print(f"  ✓ 合并 {len(results)} 个服务的结果")
+            return merge_results(results)
+        return None
+
+    def shutdown(self):
+        """取消所有尚未结束的调用"""
+        with self._active_lock:
+            for cancel in self._active:
+                cancel.set()
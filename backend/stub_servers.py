@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟服务（用于离线基准测试）
+在一个 HTTP 服务中模拟 OpenAI 兼容的 /chat/completions、高德地理编码接口和封面图床，
+延迟和失败率可配置，返回合成数据或录制的模型回复
+"""
+
+import hashlib
+import io
+import json
+import math
+import multiprocessing
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# 合成数据使用的城市
+CITIES = (
+    ("成都", "四川省"), ("重庆", "重庆市"), ("西安", "陕西省"), ("广州", "广东省"),
+    ("长沙", "湖南省"), ("杭州", "浙江省"), ("北京", "北京市"), ("上海", "上海市"),
+    ("昆明", "云南省"), ("武汉", "湖北省"), ("贵阳", "贵州省"), ("厦门", "福建省"),
+)
+FOODS = ("火锅", "串串", "米粉", "烤鱼", "肉夹馍", "肠粉", "小笼包", "热干面", "酸汤鱼", "沙茶面")
+
+# 默认配置：每类服务的延迟中位数（秒）和失败率
+DEFAULT_CONFIG = {
+    "llm": {"latency": 0.5, "failure_rate": 0.0},
+    "amap": {"latency": 0.05, "failure_rate": 0.0},
+    "image": {"latency": 0.1, "failure_rate": 0.0},
+    "distinct_images": 64,  # 不同封面图片的数量（相同内容的封面会复用缩略图）
+    "llm_fixtures": [],  # 录制的模型回复内容，为空时生成合成数据
+    "seed": 0,
+}
+
+# 延迟按对数正态分布抖动（sigma 越大长尾越明显）
+LATENCY_SIGMA = 0.5
+
+# 批量提取的提示词中每条视频以单独一行的 [id] 开头
+BATCH_ID_LINE = re.compile(r"^\[(\w+)\]$", re.MULTILINE)
+
+# 流式回复：首个片段前等待延迟的 STREAM_FIRST_TOKEN_SHARE，其余延迟均匀分布在每 STREAM_CHUNK_CHARS 个字符之间
+STREAM_FIRST_TOKEN_SHARE = 0.3
+STREAM_CHUNK_CHARS = 8
+
+
+def _hash(text):
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:12], 16)
+
+
+def synthetic_place(key):
+    """根据请求内容生成稳定的提取结果"""
+    h = _hash(key)
+    city, province = CITIES[h % len(CITIES)]
+    foods = [
+        {"name": FOODS[(h >> shift) % len(FOODS)], "description": "基准测试合成数据", "tags": ["测试"]}
+        for shift in range(0, 8 * (1 + h % 3), 8)
+    ]
+    return {
+        "place_name": f"基准测试餐厅{h % 100000}",
+        "address": f"测试路{h % 1000}号",
+        "city": city,
+        "province": province,
+        "foods": foods,
+    }
+
+
+def synthetic_location(address):
+    """地址对应的稳定坐标（中国范围内）"""
+    h = _hash(address)
+    return f"{100 + (h % 20000) / 1000:.6f},{22 + (h // 20000 % 18000) / 1000:.6f}"
+
+
+class StubState:
+    """模拟服务的配置和预生成的图片"""
+
+    def __init__(self, config):
+        self.config = {**DEFAULT_CONFIG, **config}
+        self.random = random.Random(self.config["seed"])
+        self.random_lock = threading.Lock()
+        self.images = {}
+        self.images_lock = threading.Lock()
+        self.requests = {"llm": 0, "amap": 0, "image": 0}
+
+    def draw(self, kind):
+        """按配置抽取一次请求的 (延迟, 错误状态码)，无错误时状态码为 None"""
+        settings = self.config[kind]
+        with self.random_lock:
+            self.requests[kind] += 1
+            latency = 0.0
+            if settings["latency"] > 0:
+                latency = self.random.lognormvariate(math.log(settings["latency"]), LATENCY_SIGMA)
+            fail = self.random.random() < settings["failure_rate"]
+            status = self.random.choice((429, 500, 503)) if fail else None
+        return latency, status
+
+    def delay_and_fail(self, kind):
+        """按配置等待，返回要模拟的错误状态码（无错误时为 None）"""
+        latency, status = self.draw(kind)
+        time.sleep(latency)
+        return status
+
+    def image(self, number):
+        """第 number % distinct_images 张图片（JPEG，第一次请求时生成）"""
+        index = number % max(1, self.config["distinct_images"])
+        with self.images_lock:
+            if index not in self.images:
+                self.images[index] = _make_image(index)
+            return self.images[index]
+
+
+def _make_image(index):
+    try:
+        from PIL import Image
+    except ImportError:
+        # 没有 Pillow 时返回无法解码的数据（提取器会保留原图）
+        return hashlib.sha256(str(index).encode()).digest() * 2048
+    img = Image.new("RGB", (720, 960), ((index * 37) % 256, (index * 91) % 256, (index * 53) % 256))
+    for y in range(0, 960, 24):
+        img.paste(((y + index) % 256, 128, 200), (0, y, 720, y + 8))
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def _batch_ids(request):
+    """批量提取请求中的视频 id（普通请求返回空列表）"""
+    messages = request.get("messages") or []
+    content = messages[-1].get("content") if messages else ""
+    return BATCH_ID_LINE.findall(content) if isinstance(content, str) else []
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 支持 keep-alive，与真实服务的连接复用一致
+    state = None  # 由 make_stub_server 设置
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        payload = body if isinstance(body, bytes) else json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_error(self, status):
+        headers = {"Retry-After": "1"} if status == 429 else None
+        self._send(status, {"error": {"message": f"模拟错误 {status}", "type": "stub"}}, headers=headers)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        if not urlparse(self.path).path.endswith("/chat/completions"):
+            self._send(404, {"error": "not found"})
+            return
+
+        request = json.loads(body or b"{}")
+        latency, status = self.state.draw("llm")
+        streaming = bool(request.get("stream")) and not status
+        time.sleep(latency * STREAM_FIRST_TOKEN_SHARE if streaming else latency)
+        if status:
+            self._send_error(status)
+            return
+
+        key = json.dumps(request.get("messages"), ensure_ascii=False, sort_keys=True)
+        fixtures = self.state.config["llm_fixtures"]
+        if fixtures:
+            content = fixtures[_hash(key) % len(fixtures)]
+        elif _batch_ids(request):
+            places = [{"id": id_, **synthetic_place(f"{key}#{id_}")} for id_ in _batch_ids(request)]
+            content = json.dumps({"places": places}, ensure_ascii=False)
+        elif request.get("response_format"):
+            # JSON 模式下只返回 JSON
+            content = json.dumps(synthetic_place(key), ensure_ascii=False)
+        else:
+            content = "```json\n" + json.dumps(synthetic_place(key), ensure_ascii=False) + "\n```"
+        usage = {
+            "prompt_tokens": len(key) // 2,
+            "completion_tokens": len(content) // 2,
+            "total_tokens": (len(key) + len(content)) // 2,
+        }
+        if streaming:
+            self._stream(request, key, content, usage, latency * (1 - STREAM_FIRST_TOKEN_SHARE))
+            return
+        self._send(200, {
+            "id": f"chatcmpl-stub-{_hash(key)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        })
+
+    def _stream(self, request, key, content, usage, latency):
+        """以 SSE 分片返回回复（客户端提前断开时停止）"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        base = {
+            "id": f"chatcmpl-stub-{_hash(key)}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+        }
+        pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+        events = [
+            {**base, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+            for piece in pieces
+        ]
+        events.append({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (request.get("stream_options") or {}).get("include_usage"):
+            events.append({**base, "choices": [], "usage": usage})
+        delay = latency / max(1, len(pieces))
+        try:
+            for index, event in enumerate(events):
+                if index < len(pieces):
+                    time.sleep(delay)
+                self.wfile.write(b"data: " + json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n\n")
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/v3/geocode/geo":
+            self._geocode(parse_qs(url.query))
+        elif url.path.startswith("/images/"):
+            status = self.state.delay_and_fail("image")
+            if status:
+                self._send_error(status)
+                return
+            number = _hash(url.path)
+            self._send(200, self.state.image(number), content_type="image/jpeg")
+        elif url.path == "/stats":
+            self._send(200, self.state.requests)
+        else:
+            self._send(404, {"error": "not found"})
+
+    def _geocode(self, query):
+        status = self.state.delay_and_fail("amap")
+        if status:
+            self._send_error(status)
+            return
+        addresses = (query.get("address") or [""])[0]
+        batch = (query.get("batch") or ["false"])[0] == "true"
+        addresses = addresses.split("|") if batch else [addresses]
+        self._send(200, {
+            "status": "1",
+            "info": "OK",
+            "count": str(len(addresses)),
+            "geocodes": [
+                {"formatted_address": address, "location": synthetic_location(address)}
+                for address in addresses
+            ],
+        })
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # 高并发压测时避免连接被拒绝
+
+
+def make_stub_server(config=None, host="127.0.0.1", port=0):
+    """创建模拟服务（port 为 0 时自动选择端口）"""
+    handler = type("Handler", (StubHandler,), {"state": StubState(config or {})})
+    return _StubServer((host, port), handler)
+
+
+def _serve(config, conn):
+    server = make_stub_server(config)
+    conn.send(server.server_address[1])
+    conn.close()
+    server.serve_forever()
+
+
+def start_stub_process(config=None):
+    """在独立进程中启动模拟服务（不占用被测进程的 CPU 和内存）
+
+    Returns:
+        (进程, 服务根地址)
+    """
+    context = multiprocessing.get_context("spawn")
+    parent, child = context.Pipe()
+    process = context.Process(target=_serve, args=(config or {}, child), daemon=True)
+    process.start()
+    port = parent.recv()
+    return process, f"http://127.0.0.1:{port}"
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+磁盘缓存测试
+过期时间、按条数上限的 LRU 淘汰、--refresh 跳过读取，以及多个实例同时写入同一个文件
+"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import cache as cache_module
+from cache import MISS, DiskCache, make_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可手动拨动的时钟"""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_make_key_is_stable():
+    assert make_key("qwen", {"b": 1, "a": 2}) == make_key("qwen", {"a": 2, "b": 1})
+    assert make_key("qwen", "x") != make_key("deepseek", "x")
+
+
+def test_ttl_expiry(tmp_path, clock):
+    cache = DiskCache(tmp_path / "c.sqlite", ttl=60)
+    cache.set("default", {"place": "老码头"})
+    cache.set("short", 1, ttl=10)
+    cache.set("none", None)
+
+    clock[0] += 30
+    assert cache.get("default") == {"place": "老码头"}
+    assert cache.get("short") is MISS
+    assert cache.get("none") is None
+
+    clock[0] += 31
+    assert cache.get("default") is MISS
+    assert (cache.hits, cache.misses) == (2, 2)
+    cache.close()
+
+
+def test_lru_eviction_at_max_entries(tmp_path, clock):
+    cache = DiskCache(tmp_path / "c.sqlite", max_entries=3)
+    for key in ("a", "b", "c"):
+        clock[0] += 1
+        cache.set(key, key)
+
+    # 读取 a 使其成为最近访问的条目，写入 d 时淘汰最久未访问的 b
+    clock[0] += 1
+    assert cache.get("a") == "a"
+    clock[0] += 1
+    cache.set("d", "d")
+
+    assert cache.get("b") is MISS
+    assert [cache.get(key) for key in ("a", "c", "d")] == ["a", "c", "d"]
+    cache.close()
+
+
+def test_refresh_skips_reads_but_writes(tmp_path):
+    path = tmp_path / "c.sqlite"
+    cache = DiskCache(path)
+    cache.set("k", "old")
+    cache.close()
+
+    refreshing = DiskCache(path, refresh=True)
+    assert refreshing.get("k") is MISS
+    refreshing.set("k", "new")
+    refreshing.close()
+
+    cache = DiskCache(path)
+    assert cache.get("k") == "new"
+    cache.close()
+
+    disabled = DiskCache(path, enabled=False)
+    disabled.set("other", 1)
+    assert disabled.get("k") is MISS
+    assert not disabled.hits and not disabled.misses
+
+
+def test_concurrent_writers_share_one_file(tmp_path):
+    path = tmp_path / "c.sqlite"
+    caches = [DiskCache(path), DiskCache(path)]
+    errors = []
+
+    def write(cache, prefix):
+        try:
+            for i in range(200):
+                cache.set(f"{prefix}-{i}", i)
+                cache.set("shared", prefix)
+        except Exception as e:  # sqlite3.OperationalError: database is locked 等
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(cache, name)) for cache, name in zip(caches, "ab")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+    reader = DiskCache(path)
+    assert all(reader.get(f"{prefix}-{i}") == i for prefix in "ab" for i in range(200))
+    assert reader.get("shared") in ("a", "b")
+    for cache in caches + [reader]:
+        cache.close()
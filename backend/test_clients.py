@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP 客户端测试
+高德的重试策略按配置的 AMAP_BASE_URL 挂载；模型客户端只把 SDK 实际安排的重试计入 http_retries_total
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from clients import HOST_RETRY_POLICIES, create_openai_client, create_session, sdk_will_retry
+from metrics import Metrics
+
+
+def test_amap_policy_follows_configured_base_url():
+    session = create_session({"amap": "http://127.0.0.1:8080"})
+    amap = session.get_adapter("http://127.0.0.1:8080/v3/geocode/geo").max_retries
+    other = session.get_adapter("http://127.0.0.1:9090/cover.jpg").max_retries
+    assert amap.total == HOST_RETRY_POLICIES["amap"]["total"]
+    assert other.total == HOST_RETRY_POLICIES["default"]["total"]
+    session.close()
+
+
+def response(status, retry_count, **headers):
+    request = httpx.Request("POST", "http://model/chat/completions",
+                            headers={"x-stainless-retry-count": str(retry_count)})
+    return httpx.Response(status, request=request, headers=headers)
+
+
+def test_sdk_will_retry():
+    assert sdk_will_retry(response(429, 0), max_retries=2)
+    assert sdk_will_retry(response(503, 1), max_retries=2)
+    assert not sdk_will_retry(response(503, 2), max_retries=2)  # 最后一次尝试
+    assert not sdk_will_retry(response(400, 0), max_retries=2)
+    assert not sdk_will_retry(response(200, 0), max_retries=2)
+    assert not sdk_will_retry(response(429, 0, **{"Retry-After": "600"}), max_retries=2)
+    assert not sdk_will_retry(response(500, 0, **{"x-should-retry": "false"}), max_retries=2)
+    assert sdk_will_retry(response(400, 0, **{"x-should-retry": "true"}), max_retries=2)
+
+
+class AlwaysFailing(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.server.attempts += 1
+        body = b'{"error": {"message": "overloaded"}}'
+        self.send_response(503)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("retry-after-ms", "10")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def failing_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), AlwaysFailing)
+    server.attempts = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_final_attempt_is_not_counted_as_retry(failing_server):
+    from openai import APIStatusError
+
+    metrics = Metrics()
+    base_url = f"http://127.0.0.1:{failing_server.server_address[1]}/v1"
+    client = create_openai_client("deepseek", "test-key", base_url, metrics=metrics)
+    with pytest.raises(APIStatusError):
+        client.chat.completions.create(model="deepseek-chat", messages=[{"role": "user", "content": "hi"}])
+    assert failing_server.attempts == 3
+    assert metrics.counter_totals("http_retries_total") == {"deepseek": 2}
+    client.close()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线行政区划表测试
+城市/省份简称统一为全称、同名区划的选择，以及城市中心近似坐标的 approximate 标记
+"""
+
+import pytest
+
+from extractor import reenrich_stages
+from gazetteer import Gazetteer, approximate_location, gazetteer, normalize_region
+
+CHENGDU = {"lng": 104.07, "lat": 30.57, "approximate": True}
+
+
+@pytest.mark.parametrize("city, province, expected", [
+    ("成都", "四川", ("成都市", "四川省")),
+    ("成都市", "四川省", ("成都市", "四川省")),
+    ("成都", "", ("成都市", "四川省")),              # 按城市补全省份
+    ("成都", "浙江省", ("成都市", "四川省")),        # 与城市矛盾的省份以城市为准
+    ("四川成都", "", ("成都市", "四川省")),          # 写在城市开头的省份
+    ("中国四川省成都市", "", ("成都市", "四川省")),
+    ("延吉", "", ("延边朝鲜族自治州", "吉林省")),    # 别名
+    ("", "四川", ("", "四川省")),
+    ("未知城", "火星", ("未知城", "火星")),          # 无法识别时保持原样
+])
+def test_normalize_suffixes(city, province, expected):
+    assert gazetteer().normalize(city, province) == expected
+
+
+def test_city_from_address_when_city_missing():
+    assert gazetteer().normalize("", "", "四川成都武侯区科华北路") == ("成都市", "四川省")
+
+
+def test_province_and_city_with_same_name():
+    # 吉林既是省份也是地级市
+    assert gazetteer().normalize("吉林", "") == ("吉林市", "吉林省")
+    assert gazetteer().normalize("", "吉林") == ("", "吉林省")
+    assert gazetteer().normalize("吉林省长春", "") == ("长春市", "吉林省")
+
+
+def test_short_name_followed_by_district_is_not_a_city():
+    # "朝阳区"是北京的区，不是辽宁的朝阳市
+    assert gazetteer().normalize("朝阳区", "北京") == ("朝阳区", "北京市")
+    assert gazetteer().normalize("朝阳", "") == ("朝阳市", "辽宁省")
+
+
+def test_ambiguous_city_prefers_matching_province(tmp_path):
+    path = tmp_path / "gazetteer.tsv"
+    path.write_text(
+        "province\t甲省\t甲\t甲省\t100.00\t30.00\t\n"
+        "province\t乙省\t乙\t乙省\t110.00\t35.00\t\n"
+        "city\t新城市\t新城\t甲省\t101.00\t31.00\t\n"
+        "city\t新城市\t新城\t乙省\t111.00\t36.00\t\n",
+        encoding="utf-8",
+    )
+    table = Gazetteer(path)
+    assert table.normalize("新城", "乙省") == ("新城市", "乙省")
+    assert table.centroid("新城", "乙省") == {"lng": 111.0, "lat": 36.0, "approximate": True}
+    # 没有省份时取表中的第一个
+    assert table.normalize("新城", "") == ("新城市", "甲省")
+
+
+def test_normalize_region_returns_same_dict_when_unchanged():
+    extracted = {"place_name": "老码头", "city": "成都市", "province": "四川省", "address": ""}
+    assert normalize_region(extracted) is extracted
+    changed = normalize_region({**extracted, "city": "成都", "province": ""})
+    assert (changed["city"], changed["province"]) == ("成都市", "四川省")
+
+
+def test_approximate_location():
+    assert approximate_location("", "成都") == CHENGDU
+    assert approximate_location("四川成都武侯区", "") == CHENGDU
+    assert approximate_location("", "", "四川") == CHENGDU  # 只有省份时使用省会
+    assert approximate_location("某某路 1 号", "未知城") is None
+
+
+def test_approximate_flag_triggers_regeocode():
+    place = {"name": "老码头", "city": "成都市", "address": "锦里古街", "location": CHENGDU}
+    assert "geocode" in reenrich_stages(place, checks=("location",))
+    # 没有具体地址时城市中心已经是能得到的最好结果
+    assert not reenrich_stages({**place, "address": ""}, checks=("location",))
+    exact = {**place, "location": {"lng": 104.05, "lat": 30.65}}
+    assert not reenrich_stages(exact, checks=("location",))
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务队列测试
+中断后重新运行时从每个已完成的阶段继续，不重复已完成的阶段；
+封面下载失败的任务停在坐标阶段，下次运行时重试
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import extractor as extractor_module
+from extractor import DouyinExtractor
+from jobs import STAGES, JobQueue
+
+URL = "https://v.douyin.com/abc/"
+VIDEO_INFO = {"title": "老码头火锅", "description": "", "cover_url": "https://img/cover.jpg"}
+EXTRACTED = {"place_name": "老码头", "city": "成都市", "address": "锦里", "foods": ["火锅"]}
+LOCATION = {"lng": 104.05, "lat": 30.65}
+COVER = {"thumbnail": "images/abc.webp", "thumbnails": []}
+
+
+class FakeExtractor(SimpleNamespace):
+    """只记录 process_batch 调用了哪些阶段"""
+
+    def __init__(self, cover=COVER):
+        super().__init__(refresh=False, calls=[], saved=[], cover=cover)
+
+    def _skip_existing(self, url, manual_data=None):
+        return False
+
+    def extract(self, url, manual_data=None, video_info=None):
+        self.calls.append("extract")
+        return VIDEO_INFO, EXTRACTED
+
+    def get_coordinates_batch(self, queries):
+        self.calls.append("geocode")
+        return [LOCATION for _ in queries]
+
+    def download_cover(self, cover_url):
+        self.calls.append("cover")
+        return self.cover
+
+    def assemble_place(self, video_info, extracted, location, cover):
+        return {"name": extracted["place_name"], "location": location,
+                "thumbnail": cover["thumbnail"] if cover else None}
+
+    def save_many(self, places):
+        self.saved.extend(places)
+
+
+def run(fake, queue):
+    return DouyinExtractor.process_batch(fake, [{"url": URL}], workers=2, queue=queue, text_batch=1)
+
+
+def seed(queue, stage):
+    """模拟上次运行在 stage 阶段完成后中断"""
+    queue.enqueue([{"url": URL}])
+    results = {"extracted": {"video_info": VIDEO_INFO, "extracted": EXTRACTED},
+               "geocoded": {"location": LOCATION},
+               "cover": {"cover": COVER}}
+    for done in STAGES[1:STAGES.index(stage) + 1]:
+        queue.advance(URL, done, **results[done])
+
+
+@pytest.mark.parametrize("stage, expected_calls", [
+    ("pending", ["extract", "geocode", "cover"]),
+    ("extracted", ["geocode", "cover"]),
+    ("geocoded", ["cover"]),
+    ("cover", []),
+])
+def test_resume_from_each_stage(tmp_path, stage, expected_calls):
+    path = tmp_path / "jobs.sqlite"
+    seed(JobQueue(path), stage)
+
+    fake = FakeExtractor()
+    queue = JobQueue(path)  # 新进程重新打开队列
+    places, failures = run(fake, queue)
+
+    assert fake.calls == expected_calls
+    assert not failures
+    assert places == fake.saved == [{"name": "老码头", "location": LOCATION, "thumbnail": COVER["thumbnail"]}]
+    job = queue.get([URL])[URL]
+    assert job["stage"] == "saved" and job["place"] == places[0]
+
+
+def test_saved_job_restarts_when_enqueued_again(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite")
+    seed(queue, "cover")
+    queue.advance(URL, "saved")
+    queue.enqueue([{"url": URL}])
+    assert queue.get([URL])[URL]["stage"] == "pending"
+
+
+def test_failed_cover_is_retried_on_resume(tmp_path, monkeypatch):
+    monkeypatch.setattr(extractor_module, "COVER_MAX_ATTEMPTS", 3)
+    path = tmp_path / "jobs.sqlite"
+
+    places, failures = run(FakeExtractor(cover=None), JobQueue(path))
+    assert not places and [url for url, _ in failures] == [URL]
+    job = JobQueue(path).get([URL])[URL]
+    assert (job["stage"], job["attempts"]) == ("geocoded", 1)
+    assert job["error"]
+
+    fake = FakeExtractor()
+    places, failures = run(fake, JobQueue(path))
+    assert fake.calls == ["cover"]  # 只重试封面，不重复提取和获取坐标
+    assert not failures and places[0]["thumbnail"] == COVER["thumbnail"]
+
+
+def test_cover_gives_up_after_max_attempts(tmp_path, monkeypatch):
+    monkeypatch.setattr(extractor_module, "COVER_MAX_ATTEMPTS", 2)
+    path = tmp_path / "jobs.sqlite"
+
+    run(FakeExtractor(cover=None), JobQueue(path))
+    places, failures = run(FakeExtractor(cover=None), JobQueue(path))
+    assert not failures
+    assert places == [{"name": "老码头", "location": LOCATION, "thumbnail": None}]
+    assert JobQueue(path).get([URL])[URL]["stage"] == "saved"
+
+
+def test_missing_cover_url_is_not_a_failure(tmp_path):
+    fake = FakeExtractor(cover=None)
+    fake.extract = lambda url, manual_data=None, video_info=None: ({**VIDEO_INFO, "cover_url": ""}, EXTRACTED)
+    places, failures = run(fake, JobQueue(tmp_path / "jobs.sqlite"))
+    assert not failures and places[0]["thumbnail"] is None
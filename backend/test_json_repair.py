@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+容错 JSON 解析测试
+代码块和说明文字、多余的逗号、单引号、回复被截断，以及流式输出时按任意分块 feed
+"""
+
+import pytest
+
+from json_repair import JsonRepairParser, parse_json_reply
+
+REPLY = '{"place_name": "老码头", "city": "成都市", "foods": [{"name": "火锅", "tags": ["麻辣"]}, {"name": "串串"}]}'
+EXPECTED = {"place_name": "老码头", "city": "成都市",
+            "foods": [{"name": "火锅", "tags": ["麻辣"]}, {"name": "串串"}]}
+
+
+def test_valid_json_needs_no_repair():
+    assert parse_json_reply(REPLY) == (EXPECTED, 0)
+
+
+def test_fenced_reply_with_surrounding_text():
+    text = f"好的，提取结果如下：\n```json\n{REPLY}\n```\n如有需要请告诉我 {{不是 JSON}}"
+    assert parse_json_reply(text) == (EXPECTED, 0)
+
+
+def test_trailing_and_missing_commas():
+    data, repairs = parse_json_reply('{"a": 1, "b": [1, 2,], }')
+    assert data == {"a": 1, "b": [1, 2]} and repairs == 2
+    data, repairs = parse_json_reply('{"a": 1 "b": 2}')
+    assert data == {"a": 1, "b": 2} and repairs == 1
+
+
+def test_single_quotes_unquoted_keys_and_python_literals():
+    data, repairs = parse_json_reply("{'name': 'it\\'s \"老\"', ok: True, missing: None, n: 1.5}")
+    assert data == {"name": 'it\'s "老"', "ok": True, "missing": None, "n": 1.5}
+    assert repairs > 0
+
+
+def test_control_characters_in_strings():
+    assert parse_json_reply('{"a": "第一行\n第二行"}') == ({"a": "第一行\n第二行"}, 1)
+
+
+@pytest.mark.parametrize("cut, expected", [
+    ('{"place_name": "老码头", "ci', {"place_name": "老码头"}),
+    ('{"place_name": "老码头", "city": "成都', {"place_name": "老码头"}),
+    ('{"place_name": "老码头", "foods": [{"name": "火锅"}, {"name": "串', {"place_name": "老码头", "foods": [{"name": "火锅"}, {}]}),
+    ('[1, 2', [1, 2]),
+])
+def test_truncated_reply_keeps_complete_pairs(cut, expected):
+    assert parse_json_reply(cut)[0] == expected
+
+
+def test_no_json_raises():
+    with pytest.raises(ValueError):
+        parse_json_reply("抱歉，无法识别视频中的地点")
+    with pytest.raises(ValueError):
+        parse_json_reply('["只有数组"]', roots="{")
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16, 1000])
+def test_partial_stream_chunks(size):
+    """任意分块 feed 的结果与一次性解析相同，中间结果总是最终结果的前缀部分"""
+    text = "```json\n" + REPLY + "\n```"
+    parser = JsonRepairParser("{")
+    completed = -1
+    previous = None
+    for start in range(0, len(text), size):
+        parser.feed(text[start:start + size])
+        if not parser.started:
+            continue
+        value = parser.value()
+        if parser.completed == completed:
+            assert value == previous  # 已完整部分不变时结果也不变
+        completed, previous = parser.completed, value
+        assert set(value) <= set(EXPECTED)
+        assert all(value[key] == EXPECTED[key] for key in value if key != "foods")
+    assert parser.done
+    assert parser.finish().value() == EXPECTED
+
+
+def test_number_at_chunk_boundary_waits_for_end():
+    parser = JsonRepairParser().feed('{"n": 12')
+    assert parser.value() == {}
+    assert parser.feed('3, "m": 4}').value() == {"n": 123, "m": 4}
+
+
+def test_text_after_root_is_ignored():
+    parser = JsonRepairParser().feed('{"a": 1} 还有 {"b": 2}')
+    assert parser.done and parser.value() == {"a": 1}
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务商限流测试
+429 时速率减半（AIMD），成功后逐步恢复；Retry-After 期间暂停；
+每日配额用完后拒绝，多个进程共用同一个配额文件时计数不会丢失
+"""
+
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from cache import DiskCache
+from metrics import Metrics
+from ratelimit import (
+    MIN_RATE_RATIO, RECOVERY_RATIO, ProviderLimiter, RateLimited, RateLimiter, parse_retry_after,
+)
+
+
+def test_429_halves_rate_down_to_floor():
+    limiter = ProviderLimiter("qwen", rate=8, burst=8)
+    limiter.on_response(429, retry_after=0)
+    assert limiter.rate == 4
+    limiter.on_response(429, retry_after=0)
+    assert limiter.rate == 2
+    for _ in range(10):
+        limiter.on_response(429, retry_after=0)
+    assert limiter.rate == pytest.approx(8 * MIN_RATE_RATIO)
+
+
+def test_success_recovers_rate_additively():
+    limiter = ProviderLimiter("qwen", rate=10, burst=10)
+    limiter.on_response(429, retry_after=0)
+    assert limiter.rate == 5
+    limiter.on_response(200)
+    assert limiter.rate == pytest.approx(5 + 10 * RECOVERY_RATIO)
+    for _ in range(20):
+        limiter.on_response(200)
+    assert limiter.rate == 10
+    # 4xx（非 429）不影响速率
+    limiter.on_response(404)
+    assert limiter.rate == 10
+
+
+def test_retry_after_cooldown():
+    limiter = ProviderLimiter("qwen", rate=100, burst=100)
+    assert limiter.healthy()
+    limiter.on_response(429, retry_after=5)
+    assert 4 < limiter.expected_wait() <= 5
+    assert not limiter.healthy()
+    with pytest.raises(RateLimited):
+        limiter.acquire(max_wait=1)
+
+
+def test_backoff_without_retry_after_doubles():
+    limiter = ProviderLimiter("qwen", rate=100, burst=100)
+    limiter.on_response(429)
+    first = limiter.expected_wait()
+    limiter.on_response(429)
+    assert 1.5 < limiter.expected_wait() <= 2 and first <= 1
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3
+    assert parse_retry_after("") is None
+    assert parse_retry_after("soon") is None
+    later = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < parse_retry_after(format_datetime(later, usegmt=True)) <= 30
+
+
+def test_quota_exhaustion_in_process():
+    limiter = ProviderLimiter("amap", rate=100, burst=100, daily_quota=2)
+    limiter.acquire()
+    limiter.acquire()
+    assert limiter.quota_left() == 0
+    assert not limiter.healthy()
+    with pytest.raises(RateLimited):
+        limiter.acquire()
+
+
+def test_quota_is_shared_and_atomic_across_stores(tmp_path):
+    """两个 DiskCache 实例（相当于两个进程）同时计数，总数准确且不会超出配额"""
+    path = tmp_path / "quota.sqlite"
+    stores = [DiskCache(path, max_entries=None), DiskCache(path, max_entries=None)]
+    limiters = [ProviderLimiter("qwen", rate=1e6, burst=1e6, daily_quota=150, quota_store=store)
+                for store in stores]
+    granted = []
+    refused = []
+
+    def run(limiter):
+        for _ in range(100):
+            try:
+                limiter.acquire()
+                granted.append(1)
+            except RateLimited:
+                refused.append(1)
+
+    threads = [threading.Thread(target=run, args=(limiter,)) for limiter in limiters]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(granted) == 150 and len(refused) == 50
+    # 配额用完后的申请最多各多计一次（先计数再比较），之后直接拒绝
+    assert 150 <= limiters[0]._quota_used() <= 152
+    for store in stores:
+        store.close()
+
+
+def test_rate_limiter_counts_metrics(tmp_path, monkeypatch):
+    monkeypatch.setenv("AMAP_DAILY_QUOTA", "1")
+    metrics = Metrics()
+    limits = RateLimiter(tmp_path / "quota.sqlite", metrics=metrics)
+    limits.acquire("amap")
+    with pytest.raises(RateLimited):
+        limits.acquire("amap")
+    limits.observe("amap", 429, {"Retry-After": "1"})
+    assert not limits.healthy("amap")
+    assert metrics.counter_totals("rate_limited_total") == {"amap": 1}
+    limits.close()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+限流时推迟修复测试
+视觉分析和 Qwen VL 一样把 RateLimited 当作暂不可用；所有提取方法都失败且有服务商被限流时，
+extract 抛出 RateLimited，reenrich 把地点记为推迟而不是失败
+"""
+
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from cache import MISS
+from extractor import DouyinExtractor
+from metrics import Metrics
+from ratelimit import RateLimited
+
+
+def test_vision_treats_rate_limit_as_unavailable(capsys):
+    @contextmanager
+    def limited_slot(provider, cancel=None):
+        raise RateLimited("openai 今日配额已用完 (10)")
+        yield
+
+    fake = SimpleNamespace(
+        metrics=Metrics(),
+        openai_key="key",
+        _openai_client=lambda provider, timeout: None,
+        _llm_cache_key=lambda *args: "key",
+        llm_cache=SimpleNamespace(get=lambda key: MISS),
+        _slot=limited_slot,
+    )
+    assert DouyinExtractor._analyze_with_vision(fake, "https://img/cover.jpg", "", "") is None
+    output = capsys.readouterr().out
+    assert "视觉AI暂不可用" in output and "视觉分析失败" not in output
+
+
+def extractor_with(healthy):
+    return SimpleNamespace(
+        metrics=Metrics(), non_interactive=True, qwen_key="", openai_key="key", deepseek_key="key",
+        strategy=SimpleNamespace(run=lambda candidates: None),
+        _extraction_candidates=lambda url, video_info, on_partial=None: [],
+        limits=SimpleNamespace(healthy=lambda provider: provider in healthy),
+    )
+
+
+def test_extract_raises_rate_limited_when_provider_is_throttled():
+    with pytest.raises(RateLimited, match="openai"):
+        DouyinExtractor.extract(extractor_with(healthy={"deepseek"}), "https://v.douyin.com/abc/")
+    with pytest.raises(ValueError) as error:
+        DouyinExtractor.extract(extractor_with(healthy={"openai", "deepseek"}), "https://v.douyin.com/abc/")
+    assert not isinstance(error.value, RateLimited)
+
+
+def test_reenrich_defers_rate_limited_places():
+    def extract(url, video_info=None):
+        if url.endswith("limited/"):
+            raise RateLimited("openai 被限流，需要等待 120s")
+        raise ValueError("所有自动提取方法均失败")
+
+    saved = []
+    fake = SimpleNamespace(extract=extract, save_many=saved.extend)
+    places = [
+        {"id": "a", "name": "老码头", "videoUrl": "https://v.douyin.com/limited/", "foods": []},
+        {"id": "b", "name": "串串香", "videoUrl": "https://v.douyin.com/broken/", "foods": []},
+    ]
+    patched, failures, deferred = DouyinExtractor.reenrich(fake, places, checks=("foods",), workers=2)
+    assert not patched and not saved
+    assert deferred == [("老码头", "openai 被限流，需要等待 120s")]
+    assert [name for name, _ in failures] == ["串串香"]
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+response_format 退回测试
+只有错误信息提到 response_format 的 400 才去掉该参数重试，其他 400 直接抛出；
+连续被拒绝多次后才在本进程内停止附带
+"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from extractor import RESPONSE_FORMAT_MAX_REJECTIONS, DouyinExtractor
+from metrics import Metrics
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.body = {"error": {"message": message}}
+
+
+class FakeClient:
+    """按顺序抛出 errors 中的异常（None 表示成功），记录每次请求是否带 response_format"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls.append("response_format" in kwargs)
+        error = self.errors.pop(0) if self.errors else None
+        if error:
+            raise error
+        return "ok"
+
+
+def make_extractor():
+    return SimpleNamespace(
+        _plain_json_providers=set(),
+        _format_rejections={},
+        _format_lock=threading.Lock(),
+        metrics=Metrics(),
+    )
+
+
+def complete(extractor, client):
+    return DouyinExtractor._create_completion(extractor, "qwen", client, model="qwen-vl")
+
+
+def test_other_bad_request_is_not_retried():
+    extractor = make_extractor()
+    client = FakeClient([BadRequest("The video_url could not be downloaded")])
+    with pytest.raises(BadRequest):
+        complete(extractor, client)
+    assert client.calls == [True]
+    assert "qwen" not in extractor._plain_json_providers
+
+
+def test_response_format_rejection_retries_without_it():
+    extractor = make_extractor()
+    client = FakeClient([BadRequest("'response_format' is not supported by this model"), None])
+    assert complete(extractor, client) == "ok"
+    assert client.calls == [True, False]
+    assert "qwen" not in extractor._plain_json_providers
+
+    # 下一次请求仍然先尝试 response_format，成功后清零
+    client = FakeClient([None])
+    complete(extractor, client)
+    assert client.calls == [True]
+    assert extractor._format_rejections == {}
+
+
+def test_repeated_rejections_disable_response_format():
+    extractor = make_extractor()
+    for _ in range(RESPONSE_FORMAT_MAX_REJECTIONS):
+        complete(extractor, FakeClient([BadRequest("json_schema is not supported"), None]))
+    assert "qwen" in extractor._plain_json_providers
+    client = FakeClient([None])
+    complete(extractor, client)
+    assert client.calls == [False]
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提取结果校验测试
+各服务商回复中的类型偏差统一转换成 PLACE_SCHEMA 的结构，批量回复按 id 拆分
+"""
+
+import pytest
+
+from schema import (
+    PLACE_SCHEMA, SchemaError, parse_place_reply, parse_places_reply, response_format, to_json_schema,
+    validate_place,
+)
+
+
+def test_coerces_field_types():
+    place = validate_place({
+        "place_name": " 老码头 ", "address": 12, "city": ["成都市", "武侯区"], "province": None,
+        "unknown": "丢弃",
+    })
+    assert place == {"place_name": "老码头", "address": "12", "city": "成都市、武侯区", "province": "", "foods": []}
+    assert validate_place({"place_name": True})["place_name"] == ""
+
+
+def test_coerces_foods():
+    place = validate_place({"place_name": "老码头", "foods": [
+        "火锅",
+        {"name": "串串", "tags": "麻辣，鲜香、 下饭", "price": 30},
+        {"description": "没有名称"},
+        None,
+    ]})
+    assert place["foods"] == [
+        {"name": "火锅", "description": "", "tags": []},
+        {"name": "串串", "description": "", "tags": ["麻辣", "鲜香", "下饭"]},
+    ]
+    # 只有一道美食时直接返回对象或字符串
+    for foods in ({"name": "面"}, "面"):
+        assert validate_place({"foods": foods})["foods"] == [{"name": "面", "description": "", "tags": []}]
+
+
+def test_non_object_is_rejected():
+    with pytest.raises(SchemaError):
+        validate_place(["老码头"])
+    with pytest.raises(ValueError):
+        parse_place_reply('["老码头"]')
+
+
+def test_parse_place_reply_repairs_and_validates():
+    place, repairs = parse_place_reply("```json\n{'place_name': '老码头', 'foods': ['火锅',],}\n```")
+    assert place["place_name"] == "老码头" and place["foods"][0]["name"] == "火锅"
+    assert repairs > 0
+
+
+@pytest.mark.parametrize("reply", [
+    '{"places": [{"id": "v1", "place_name": "甲"}, {"id": 2, "place_name": "乙"}, {"place_name": "没有 id"}]}',
+    '[{"id": "v1", "place_name": "甲"}, {"id": 2, "place_name": "乙"}]',
+    '{"v1": {"place_name": "甲"}, "2": {"place_name": "乙"}}',
+])
+def test_parse_places_reply_shapes(reply):
+    places, _ = parse_places_reply(reply)
+    assert {key: place["place_name"] for key, place in places.items()} == {"v1": "甲", "2": "乙"}
+
+
+def test_json_schema_is_strict():
+    schema = to_json_schema(PLACE_SCHEMA)
+    assert schema["required"] == list(PLACE_SCHEMA) and schema["additionalProperties"] is False
+    food = schema["properties"]["foods"]["items"]
+    assert food["properties"]["tags"] == {"type": "array", "items": {"type": "string"}}
+    assert response_format("json_schema")["json_schema"]["strict"] is True
+    assert response_format("json_object") == {"type": "json_object"}
+    assert response_format("none") is None
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜索索引测试
+切分规则、英文/数字前缀匹配，以及前端 frontend/src/utils/search.js 与后端的切分和搜索结果一致
+"""
+
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from search_index import SearchIndex, SearchIndexBuilder, tokenize
+
+SEARCH_JS = Path(__file__).resolve().parent.parent / "frontend" / "src" / "utils" / "search.js"
+
+PLACES = [
+    {"id": "p1", "name": "老码头火锅", "city": "成都市", "address": "锦里古街",
+     "foods": [{"name": "毛肚", "tags": ["麻辣", "hotpot"]}], "location": {"lng": 104.05, "lat": 30.65}},
+    {"id": "p2", "name": "Hot Dog 小站", "city": "上海市", "address": "南京路 100 号",
+     "foods": [{"name": "热狗", "tags": ["snack"]}], "location": {"lng": 121.47, "lat": 31.23}},
+    {"id": "p3", "name": "兰州拉面", "city": "兰州市", "address": "", "foods": [{"name": "牛肉面"}]},
+    {"id": "p4", "name": "ＨＯＴＥＬ餐厅", "city": "北京市", "address": "朝阳路 1001 号",
+     "foods": [], "location": {"lng": 116.4, "lat": 39.9}},
+]
+
+QUERIES = ["hot", "hotpot", "HOT", "ho 麻辣", "10", "100", "snack 热", "火锅", "兰州", "面", "锦里古街",
+           "xyz", "老码头 hot", "！？", ""]
+
+
+@pytest.fixture
+def index_data():
+    builder = SearchIndexBuilder()
+    for place in PLACES:
+        builder.add(place)
+    return builder.index()
+
+
+def test_tokenize():
+    assert tokenize("老码头") == {"老", "码", "头", "老码", "码头"}
+    assert tokenize("老码头", query=True) == {"老码", "码头"}
+    assert tokenize("面", query=True) == {"面"}
+    # NFKC 规范化全角字符并转小写，英文/数字按整个单词
+    assert tokenize("ＨＯＴＥＬ餐厅 No.1") == {"hotel", "餐", "厅", "餐厅", "no", "1"}
+    assert tokenize("！？ ...", query=True) == set()
+
+
+def test_ascii_terms_match_by_prefix(index_data):
+    index = SearchIndex(index_data)
+    assert index.search("hot") == ["p1", "p2", "p4"]
+    assert index.search("hotpot") == ["p1"]
+    assert index.search("hot 麻辣") == ["p1"]
+    assert index.search("100") == ["p2", "p4"]
+    assert index.search("pot") == []  # 只匹配前缀
+    assert index.search("火锅") == ["p1"]
+    assert index.search("！？") is None
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="需要 node")
+def test_frontend_matches_backend(index_data):
+    script = f"""
+        import {{ readFileSync }} from "node:fs"
+        import {{ createSearchIndex, tokenizeQuery }} from {json.dumps(SEARCH_JS.as_uri())}
+        const input = JSON.parse(readFileSync(0, "utf8"))
+        const index = createSearchIndex(input.index)
+        console.log(JSON.stringify(input.queries.map(query => {{
+          const matches = index.search(query)
+          return [tokenizeQuery(query).sort(), matches && matches.map(match => match.id)]
+        }})))
+    """
+    payload = json.dumps({"index": index_data, "queries": QUERIES}, ensure_ascii=False)
+    output = subprocess.run(["node", "--input-type=module", "-e", script], input=payload,
+                            capture_output=True, text=True, timeout=30, check=True).stdout
+
+    index = SearchIndex(index_data)
+    expected = [[sorted(tokenize(query, query=True)), index.search(query)] for query in QUERIES]
+    assert json.loads(output) == expected
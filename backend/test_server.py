@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地提取服务测试
+同一链接在排队或处理中时重复提交会合并为同一个任务（按链接哈希），
+时间窗口内提交的链接合并为一批交给 process_batch
+"""
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+from extractor import parse_batch_record
+from jobs import JobQueue
+from server import ExtractionService, job_id, make_server
+
+URL = "https://v.douyin.com/abc/"
+OTHER_URL = "https://v.douyin.com/xyz/"
+
+
+class FakeExtractor:
+    """记录每批的链接；release 之前 process_batch 一直阻塞"""
+
+    def __init__(self):
+        self.batches = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.index = SimpleNamespace(find=lambda video_url: None)
+
+    def process_batch(self, items, workers=8, queue=None):
+        self.batches.append([item['url'] for item in items])
+        self.started.set()
+        assert self.release.wait(10)
+        return [{"id": job_id(item['url']), "videoUrl": item['url']} for item in items], []
+
+
+@pytest.fixture
+def service():
+    extractor = FakeExtractor()
+    service = ExtractionService(extractor, JobQueue(), parse_batch_record, batch_window=1.0)
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    service.start()
+    thread.start()
+    yield SimpleNamespace(service=service, extractor=extractor,
+                          base=f"http://127.0.0.1:{server.server_address[1]}")
+    extractor.release.set()
+    server.shutdown()
+    server.server_close()
+    service.stop()
+
+
+def post(base, body):
+    request = urllib.request.Request(f"{base}/jobs", data=json.dumps(body).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.status, json.load(response)["jobs"]
+
+
+def wait_done(service, key):
+    for _ in range(500):
+        job = service.status(key)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("任务没有完成")
+
+
+def test_duplicate_submission_is_coalesced(service):
+    status, first = post(service.base, {"url": URL})
+    assert status == 202 and not first[0]["coalesced"]
+    # 第一个任务还在排队（批次窗口内）时再次提交同一链接，以及同一批中重复的链接
+    _, second = post(service.base, {"urls": [URL, OTHER_URL, URL]})
+    assert [job["coalesced"] for job in second] == [True, False, True]
+    assert {job["id"] for job in first + second} == {job_id(URL), job_id(OTHER_URL)}
+
+    assert service.extractor.started.wait(5)
+    # 处理中再次提交也合并
+    _, third = post(service.base, {"url": URL})
+    assert third[0]["coalesced"] and third[0]["status"] == "running"
+
+    service.extractor.release.set()
+    assert wait_done(service.service, job_id(URL))["place"]["videoUrl"] == URL
+    wait_done(service.service, job_id(OTHER_URL))
+    # 两个链接在同一个批次窗口内提交，只处理一批，每个链接只处理一次
+    assert service.extractor.batches == [[URL, OTHER_URL]]
+    assert len(service.service.jobs()) == 2
+
+
+def test_finished_url_can_be_submitted_again(service):
+    service.extractor.release.set()
+    post(service.base, {"url": URL})
+    wait_done(service.service, job_id(URL))
+    _, again = post(service.base, {"url": URL})
+    assert not again[0]["coalesced"]
+    wait_done(service.service, job_id(URL))
+    assert service.extractor.batches == [[URL], [URL]]
+
+
+def test_invalid_record_is_rejected(service):
+    request = urllib.request.Request(f"{service.base}/jobs", data=b'{"title": "no url"}', method="POST")
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(request, timeout=10)
+    assert error.value.code == 400
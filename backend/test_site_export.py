@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+部署数据导出测试
+导出的 places.json、分片、manifest.json 和搜索索引都来自校验过的记录；
+有任何不合法的记录时导出失败，不写出（也不覆盖已有的）文件
+"""
+
+import json
+
+import pytest
+
+from place_stream import PlaceRecordError, iter_places
+from search_index import build_search_index
+from shards import build_shards
+from site_export import export_site
+
+VALID = {"id": "a", "name": "老码头", "city": "成都市", "province": "四川省",
+         "location": {"lng": 104.06, "lat": 30.67}, "foods": [{"name": "兔头", "tags": ["麻辣"]}]}
+UNLOCATED = {"id": "c", "name": "无名小馆", "foods": []}
+INVALID = {"id": "b", "name": "新店", "foods": [{"tags": []}]}
+
+
+def write_places(path, places):
+    path.write_text(json.dumps({"places": places}, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
+
+
+def read_json(path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def test_export_matches_compacted_data(tmp_path):
+    places = [VALID, UNLOCATED]
+    source = write_places(tmp_path / "places.json", places)
+    out = tmp_path / "export"
+    (out / "shards").mkdir(parents=True)
+    (out / "shards" / "zz.json").write_text("{}", encoding="utf-8")
+
+    stats = export_site(iter_places(source), out)
+    assert stats["places"] == 2 and stats["shards"] == 2
+
+    # 与 compact 生成的数据内容一致，只是格式紧凑
+    build_shards(places, tmp_path)
+    build_search_index(places, tmp_path)
+    for name in ("places.json", "manifest.json", "search-index.json"):
+        assert read_json(out / name) == read_json(tmp_path / name)
+        assert b"\n" not in (out / name).read_bytes()
+    assert sorted(p.name for p in (out / "shards").iterdir()) == sorted(p.name for p in (tmp_path / "shards").iterdir())
+    for path in (tmp_path / "shards").iterdir():
+        assert read_json(out / "shards" / path.name) == read_json(path)
+
+
+def test_invalid_record_fails_export(tmp_path):
+    source = write_places(tmp_path / "places.json", [VALID, INVALID, UNLOCATED])
+    out = tmp_path / "export"
+    out.mkdir()
+    (out / "places.json").write_text("旧的导出", encoding="utf-8")
+
+    with pytest.raises(PlaceRecordError) as e:
+        export_site(iter_places(source), out)
+    assert e.value.invalid == 1
+    assert e.value.errors == [(2, "b", ["foods[0] 缺少名称"])]
+    assert (out / "places.json").read_text(encoding="utf-8") == "旧的导出"
+    assert sorted(p.name for p in out.rglob("*")) == ["places.json", "shards"]
+    assert not list((out / "shards").iterdir())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+地点存储测试
+SQLite 存储：places.json 在导出后被修改时，只有数据库中没有未导出的写入才重新导入，
+否则保留数据库并在下次 compact 前备份被修改的 places.json。
+追加日志存储：查找索引只回放新增的日志，compact 后直接沿用，places.json 被修改后才重建
+"""
+
+import json
+import os
+
+import pytest
+
+import store as store_module
+from store import JournalStore, PlaceStore, SqliteStore
+
+PLACE = {"id": "a", "name": "老码头", "city": "成都市", "foods": []}
+
+
+def edit_json(path, name):
+    data = json.loads(path.read_text(encoding="utf-8"))
+    data["places"][0]["name"] = name
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+@pytest.fixture
+def json_path(tmp_path):
+    path = tmp_path / "places.json"
+    path.write_text(json.dumps({"places": [PLACE]}, ensure_ascii=False), encoding="utf-8")
+    store = SqliteStore(path)
+    store.compact()
+    store.close()
+    return path
+
+
+def test_place_store_is_abstract():
+    with pytest.raises(TypeError):
+        PlaceStore("places.json")
+
+
+def test_reimports_edited_json_without_pending_writes(json_path):
+    edit_json(json_path, "手动修改")
+    store = SqliteStore(json_path)
+    assert [p["name"] for p in store.load()] == ["手动修改"]
+    store.close()
+
+
+def test_keeps_unexported_writes_and_backs_up_edited_json(json_path):
+    store = SqliteStore(json_path)
+    store.append([{"id": "b", "name": "新店", "foods": []}])
+    store.close()
+    edit_json(json_path, "手动修改")
+
+    store = SqliteStore(json_path)
+    assert [p["name"] for p in store.load()] == ["老码头", "新店"]
+    store.compact()
+    store.close()
+
+    backups = list(json_path.parent.glob("places.conflict-*.json"))
+    assert len(backups) == 1
+    assert json.loads(backups[0].read_text(encoding="utf-8"))["places"][0]["name"] == "手动修改"
+    assert [p["name"] for p in json.loads(json_path.read_text(encoding="utf-8"))["places"]] == ["老码头", "新店"]
+
+
+def test_sqlite_pending_count(json_path):
+    store = SqliteStore(json_path)
+    assert store.pending_count() == 0
+    store.append([{"id": "b", "name": "新店", "foods": []}])
+    assert store.pending_count() == 1
+    store.compact()
+    assert store.pending_count() == 0
+    store.close()
+
+
+@pytest.fixture
+def journal_store(tmp_path):
+    path = tmp_path / "places.json"
+    path.write_text(json.dumps({"places": [dict(PLACE, videoUrl="https://v/a")]}, ensure_ascii=False),
+                    encoding="utf-8")
+    store = JournalStore(path)
+    yield store
+    store.close()
+
+
+def test_journal_lookup_replays_appends_from_other_writers(journal_store):
+    lookup = journal_store.lookup()
+    assert lookup.find(video_url="https://v/a")["id"] == "a"
+
+    other = JournalStore(journal_store.json_path)
+    other.append([{"id": "b", "name": "新店", "city": "成都市", "videoUrl": "https://v/b", "foods": []}])
+    assert other.pending_count() == 1
+    assert lookup.find(video_url="https://v/b")["id"] == "b"
+    assert lookup.find(name=" 新店", city="成都市")["id"] == "b"
+    assert lookup.find(video_url="https://v/missing") is None
+
+
+def test_journal_lookup_survives_compact_without_rebuild(journal_store, monkeypatch):
+    lookup = journal_store.lookup()
+    journal_store.append([{"id": "b", "name": "新店", "videoUrl": "https://v/b", "foods": []}])
+    assert lookup.find(video_url="https://v/b")
+    journal_store.compact()
+    assert journal_store.pending_count() == 0
+
+    def no_rebuild(f):
+        raise AssertionError("compact 后不应重新读取 places.json")
+    monkeypatch.setattr(store_module, "read_places", no_rebuild)
+    journal_store.append([{"id": "c", "name": "又一家", "videoUrl": "https://v/c", "foods": []}])
+    assert lookup.find(video_url="https://v/c")["id"] == "c"
+    assert lookup.find(video_url="https://v/b")["id"] == "b"
+
+
+def test_journal_lookup_rebuilds_after_manual_edit(journal_store):
+    lookup = journal_store.lookup()
+    assert lookup.find(video_url="https://v/a")["name"] == "老码头"
+    edit_json(journal_store.json_path, "手动修改")
+    assert lookup.find(video_url="https://v/a")["name"] == "手动修改"
+
+    # 索引是持久化的，新进程沿用同一份
+    journal_store.close()
+    reopened = JournalStore(journal_store.json_path)
+    assert reopened.lookup().find(name="手动修改", city="成都市")["id"] == "a"
+    reopened.close()
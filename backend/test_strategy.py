@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提取策略取消测试
+对冲/竞速中落败的调用和超过截止时间的调用必须收到取消信号并停止，
+不能继续占用服务商名额，也不能拖住进程退出
+"""
+
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from metrics import Metrics
+from strategy import Candidate, Cancelled, ExtractionStrategy
+
+RESULT = {"place_name": "老码头", "city": "成都市", "province": "四川省", "address": "", "foods": []}
+
+
+def slow_candidate(name, seconds, stopped):
+    """模拟流式调用：每 10ms 检查一次取消信号，被取消时记录停止时刻"""
+    def fn(timeout, cancel):
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            if cancel.wait(0.01):
+                stopped.append(time.monotonic())
+                raise Cancelled(name)
+        return RESULT
+    return Candidate(name, fn, 10)
+
+
+@pytest.mark.parametrize("mode", ["race", "hedge"])
+def test_loser_is_cancelled(mode):
+    stopped = []
+    fast = Candidate("fast", lambda timeout, cancel: RESULT, 10)
+    slow = slow_candidate("slow", 6, stopped)
+    strategy = ExtractionStrategy(mode, hedge_delay=0)
+    start = time.monotonic()
+    assert strategy.run([slow, fast] if mode == "hedge" else [fast, slow]) == RESULT
+    deadline = time.monotonic() + 1
+    while not stopped and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert stopped, "落败的调用没有停止"
+    assert stopped[0] - start < 1
+
+
+def test_deadline_cancels_call():
+    stopped = []
+    slow = slow_candidate("slow", 6, stopped)
+    slow.deadline = 0.1
+    strategy = ExtractionStrategy("sequential")
+    assert strategy.run([slow]) is None
+    time.sleep(0.2)
+    assert stopped
+
+
+def test_shutdown_cancels_running_calls():
+    stopped = []
+    strategy = ExtractionStrategy("race")
+    thread = threading.Thread(target=strategy.run, args=([slow_candidate("slow", 6, stopped)],))
+    thread.start()
+    time.sleep(0.1)
+    strategy.shutdown()
+    thread.join(1)
+    assert stopped
+
+
+def test_complete_closes_stream_when_cancelled():
+    from extractor import DouyinExtractor
+
+    cancel = threading.Event()
+    closed = []
+
+    class Stream:
+        def __iter__(self):
+            for piece in ('{"place_name": "老', '码头", ', '"city": "成都"}'):
+                yield SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+                cancel.set()
+
+        def close(self):
+            closed.append(True)
+
+    fake = SimpleNamespace(_create_completion=lambda *args, **kwargs: Stream(), metrics=Metrics())
+    with pytest.raises(Cancelled):
+        DouyinExtractor._complete(fake, "deepseek", None, cancel=cancel)
+    assert closed
+
+
+def test_blocked_loser_does_not_delay_exit():
+    """没有响应取消的调用（例如阻塞中的请求）也不会让进程等到它结束"""
+    script = (
+        "import time\n"
+        "from strategy import Candidate, ExtractionStrategy\n"
+        "result = {'place_name': 'x', 'city': 'y'}\n"
+        "fast = Candidate('fast', lambda timeout, cancel: result, 10)\n"
+        "slow = Candidate('slow', lambda timeout, cancel: time.sleep(6), 10)\n"
+        "assert ExtractionStrategy('race').run([fast, slow]) == result\n"
+    )
+    start = time.monotonic()
+    subprocess.run([sys.executable, "-c", script], check=True, cwd=Path(__file__).parent)
+    assert time.monotonic() - start < 3
@@ -0,0 +1,18 @@
+// 缩略图工具：后端为每张封面生成多种宽度的 WebP/AVIF 缩略图（place.thumbnails）
+
+// 生成某种格式的 srcset，例如 "/images/a-160.webp 160w, /images/a-480.webp 480w"
+export const thumbnailSrcset = (place, format = 'webp') => {
+  return (place.thumbnails || [])
+    .filter(t => t.format === format)
+    .map(t => `${t.url} ${t.width}w`)
+    .join(', ')
+}
+
+// 选出不小于目标宽度的最小 WebP 缩略图，没有缩略图时使用 place.thumbnail
+export const thumbnailUrl = (place, width) => {
+  const candidates = (place.thumbnails || [])
+    .filter(t => t.format === 'webp')
+    .sort((a, b) => a.width - b.width)
+  const match = candidates.find(t => t.width >= width) || candidates[candidates.length - 1]
+  return match ? match.url : place.thumbnail
+}
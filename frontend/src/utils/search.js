@@ -0,0 +1,90 @@
+// 搜索索引工具：后端生成的 data/search-index.json（见 backend/search_index.py）
+// 切分规则需要与后端的 tokenize 保持一致
+
+const TOKEN_RE = /[\u3400-\u9fff\uf900-\ufaff]+|[a-z0-9]+/g
+
+// 查询词切分：中文片段取二元组（单字片段取单字），英文/数字取整个单词（搜索时按前缀匹配）
+export const tokenizeQuery = (text) => {
+  const tokens = new Set()
+  const runs = (text || '').normalize('NFKC').toLowerCase().match(TOKEN_RE) || []
+  for (const run of runs) {
+    if (/^[a-z0-9]+$/.test(run) || run.length === 1) {
+      tokens.add(run)
+      continue
+    }
+    for (let i = 0; i < run.length - 1; i++) {
+      tokens.add(run.slice(i, i + 2))
+    }
+  }
+  return [...tokens]
+}
+
+// 加载索引（只在第一次搜索时请求，失败时返回 null，调用方退回到子串匹配）
+let indexPromise = null
+export const loadSearchIndex = () => {
+  if (!indexPromise) {
+    indexPromise = fetch('/data/search-index.json')
+      .then(response => (response.ok ? response.json() : null))
+      .then(data => (data ? createSearchIndex(data) : null))
+      .catch(() => null)
+  }
+  return indexPromise
+}
+
+export const createSearchIndex = ({ docs, terms }) => {
+  // 倒排表为差分编码，按需解码并缓存
+  const decoded = new Map()
+  const postings = (token) => {
+    if (!decoded.has(token)) {
+      const ids = []
+      let current = 0
+      for (const delta of terms[token] || []) {
+        current += delta
+        ids.push(current)
+      }
+      decoded.set(token, ids)
+    }
+    return decoded.get(token)
+  }
+
+  // 英文/数字词按前缀匹配（"hot" 也能找到 "hotpot"）：在排好序的词表中二分查找前缀范围
+  const asciiTerms = Object.keys(terms).filter(term => /^[a-z0-9]+$/.test(term)).sort()
+  const prefixPostings = (prefix) => {
+    const key = `${prefix}*`
+    if (!decoded.has(key)) {
+      let low = 0
+      let high = asciiTerms.length
+      while (low < high) {
+        const mid = (low + high) >> 1
+        if (asciiTerms[mid] < prefix) low = mid + 1
+        else high = mid
+      }
+      const ids = new Set()
+      for (let i = low; i < asciiTerms.length && asciiTerms[i].startsWith(prefix); i++) {
+        for (const id of postings(asciiTerms[i])) ids.add(id)
+      }
+      decoded.set(key, [...ids].sort((a, b) => a - b))
+    }
+    return decoded.get(key)
+  }
+
+  // 返回同时包含所有查询词的 [{ id, shard }]（英文/数字词匹配以它开头的单词），
+  // 查询中没有可索引的词时返回 null
+  const search = (query) => {
+    const tokens = tokenizeQuery(query)
+    if (tokens.length === 0) return null
+
+    const lists = tokens
+      .map(token => (/^[a-z0-9]+$/.test(token) ? prefixPostings(token) : postings(token)))
+      .sort((a, b) => a.length - b.length)
+    let matched = lists[0]
+    for (const list of lists.slice(1)) {
+      if (matched.length === 0) break
+      const set = new Set(list)
+      matched = matched.filter(id => set.has(id))
+    }
+    return matched.map(id => ({ id: docs[id][0], shard: docs[id][1] }))
+  }
+
+  return { search }
+}
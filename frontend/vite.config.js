@@ -1,7 +1,73 @@
 import { defineConfig, loadEnv } from 'vite'
 import vue from '@vitejs/plugin-vue'
 import { resolve } from 'path'
-import { copyFileSync, mkdirSync, existsSync, watch } from 'fs'
+import { copyFileSync, cpSync, mkdirSync, existsSync, rmSync, statSync, watch } from 'fs'
+
+// extractor.py export 生成的经过校验的紧凑数据（places.json、manifest.json、shards/ 和搜索索引）
+// 导出结果不比 data/ 中的 places.json 和 manifest.json 旧时，整体使用导出目录
+const exportIsFresh = (sourceDir) => {
+  const exported = resolve(sourceDir, 'export', 'places.json')
+  if (!existsSync(exported)) return false
+  return ['places.json', 'manifest.json'].every((file) => {
+    const source = resolve(sourceDir, file)
+    return !existsSync(source) || statSync(exported).mtimeMs >= statSync(source).mtimeMs
+  })
+}
+
+// 复制数据文件：places.json，按视野加载使用的 manifest.json 和 shards/，以及搜索索引
+const copyData = (sourceDir, targetDir) => {
+  const dataDir = exportIsFresh(sourceDir) ? resolve(sourceDir, 'export') : sourceDir
+  mkdirSync(targetDir, { recursive: true })
+  for (const file of ['places.json', 'manifest.json', 'search-index.json']) {
+    if (existsSync(resolve(dataDir, file))) {
+      copyFileSync(resolve(dataDir, file), resolve(targetDir, file))
+    }
+  }
+  const shardDir = resolve(dataDir, 'shards')
+  if (existsSync(shardDir)) {
+    rmSync(resolve(targetDir, 'shards'), { recursive: true, force: true })
+    cpSync(shardDir, resolve(targetDir, 'shards'), { recursive: true })
+  }
+}
+
+// 开发服务器监听的数据文件（相对 data/ 的路径）和所在目录（目录可能在第一次合并或导出时才创建）
+const DATA_FILE_RE = /^(export\/)?(places\.json|manifest\.json|search-index\.json|shards\/[^/]+\.json)$/
+const DATA_DIRS = ['', 'shards', 'export', 'export/shards']
+
+// 监听数据文件变化，一次合并会写出大量分片，变化停止 300ms 后才调用 onChange
+const watchData = (sourceDir, onChange) => {
+  const watchers = new Map()
+  const changed = new Set()
+  let timer = null
+
+  const watchDir = (relative) => {
+    watchers.get(relative)?.close()
+    watchers.delete(relative)
+    const dir = resolve(sourceDir, relative)
+    if (!existsSync(dir)) return
+    try {
+      watchers.set(relative, watch(dir, (eventType, filename) => {
+        if (!filename) return
+        const path = relative ? `${relative}/${filename}` : filename
+        // 子目录被创建或替换时重新监听（连同其中已有的子目录）
+        if (DATA_DIRS.includes(path) && eventType === 'rename') {
+          DATA_DIRS.filter(sub => sub === path || sub.startsWith(`${path}/`)).forEach(watchDir)
+        }
+        if (!DATA_FILE_RE.test(path)) return
+        changed.add(path)
+        clearTimeout(timer)
+        timer = setTimeout(() => {
+          onChange([...changed])
+          changed.clear()
+        }, 300)
+      }))
+    } catch (e) {
+      // 忽略监听错误
+    }
+  }
+
+  DATA_DIRS.forEach(watchDir)
+}
 
 export default defineConfig(({ mode }) => {
   // 加载环境变量（优先从系统环境变量读取，兼容 GitHub Actions）
@@ -28,36 +94,21 @@ export default defineConfig(({ mode }) => {
         configureServer(server) {
           // 开发环境：将 data 文件夹内容复制到 public/data
           const publicDataDir = resolve(__dirname, 'public/data')
-          const sourceDataFile = resolve(__dirname, '../data/places.json')
-          
-          if (!existsSync(publicDataDir)) {
-            mkdirSync(publicDataDir, { recursive: true })
-          }
+          const sourceDataDir = resolve(__dirname, '../data')
           
           // 初始复制
-          if (existsSync(sourceDataFile)) {
-            copyFileSync(sourceDataFile, resolve(publicDataDir, 'places.json'))
-          }
+          copyData(sourceDataDir, publicDataDir)
           
-          // 监听文件变化
-          try {
-            watch(resolve(__dirname, '../data'), (eventType, filename) => {
-              if (filename === 'places.json') {
-                copyFileSync(sourceDataFile, resolve(publicDataDir, 'places.json'))
-                console.log('✓ places.json 已更新')
-              }
-            })
-          } catch (e) {
-            // 忽略监听错误（可能是目录不存在）
-          }
+          // 监听文件变化（places.json、manifest.json、分片和搜索索引，包括 export/ 中的导出结果）
+          watchData(sourceDataDir, (files) => {
+            copyData(sourceDataDir, publicDataDir)
+            const names = files.length > 3 ? `${files.slice(0, 3).join('、')} 等 ${files.length} 个文件` : files.join('、')
+            console.log(`✓ ${names} 已更新`)
+          })
         },
         closeBundle() {
           // 构建环境：复制到 dist/data
-          mkdirSync(resolve(__dirname, 'dist/data'), { recursive: true })
-          copyFileSync(
-            resolve(__dirname, '../data/places.json'),
-            resolve(__dirname, 'dist/data/places.json')
-          )
+          copyData(resolve(__dirname, '../data'), resolve(__dirname, 'dist/data'))
         }
       }
     ],
@@ -25,39 +25,67 @@ if [ ${#urls[@]} -eq 0 ]; then
     exit 1
 fi
 
-total=${#urls[@]}
-success=0
-failed=0
-
-for i in "${!urls[@]}"; do
-    url="${urls[$i]}"
-    num=$((i + 1))
-    
-    echo "[$num/$total] 处理: $url"
-    echo ""
-    
-    cd backend
-    python extractor.py --url "$url"
-    
-    if [ $? -eq 0 ]; then
-        ((success++))
-        echo "✅ 成功"
-    else
-        ((failed++))
-        echo "❌ 失败"
-    fi
-    
-    cd ..
-    echo ""
-    echo "---"
+# 只有一个链接或设置 INTERACTIVE=1 时逐个处理：AI 提取失败时可以手动输入地点信息
+if [ ${#urls[@]} -eq 1 ] || [ "${INTERACTIVE:-0}" = "1" ]; then
+    total=${#urls[@]}
+    success=0
+    failed=0
+
+    for i in "${!urls[@]}"; do
+        url="${urls[$i]}"
+        num=$((i + 1))
+
+        echo "[$num/$total] 处理: $url"
+        echo ""
+
+        cd backend
+        python extractor.py --url "$url" --no-compact
+
+        if [ $? -eq 0 ]; then
+            ((success++))
+            echo "✅ 成功"
+        else
+            ((failed++))
+            echo "❌ 失败"
+        fi
+
+        cd ..
+        echo ""
+        echo "---"
+        echo ""
+    done
+
+    # 全部处理完后合并一次，生成前端使用的 places.json、分片和搜索索引
+    (cd backend && python extractor.py compact)
+
+    echo "================================"
+    echo "批量处理完成！"
+    echo "================================"
+    echo "总计: $total"
+    echo "成功: $success"
+    echo "失败: $failed"
     echo ""
-done
+    [ $failed -eq 0 ]
+    exit $?
+fi
 
-echo "================================"
-echo "批量处理完成！"
-echo "================================"
-echo "总计: $total"
-echo "成功: $success"
-echo "失败: $failed"
+# 多个链接：写入临时任务文件，在同一个进程中并发处理（非交互，失败的链接不会提示手动输入）
+batch_file=$(mktemp)
+trap 'rm -f "$batch_file"' EXIT
+printf '%s\n' "${urls[@]}" > "$batch_file"
+
+echo "共 ${#urls[@]} 个链接（需要手动输入时使用 INTERACTIVE=1 逐个处理）"
 echo ""
 
+cd backend
+python extractor.py --batch "$batch_file" --workers "${WORKERS:-8}" --compact
+status=$?
+cd ..
+
+echo ""
+if [ $status -eq 0 ]; then
+    echo "✅ 全部成功"
+else
+    echo "❌ 部分链接处理失败，请查看上方日志"
+fi
+exit $status